@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks of pymas: timing and peak memory of MAS.run() for generated
+scenarios (see benchmarks.scenarios) and comparison with a saved baseline
+(see benchmarks.run).
+"""
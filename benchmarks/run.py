@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+Runs the benchmarks of pymas and compares them with a baseline.
+
+Usage (from the root of the repository):
+    python -m benchmarks.run --suite quick --output results.json
+    python -m benchmarks.run --suite quick --baseline results.json
+
+The results are written as JSON: the environment ("meta") and one entry per
+case with the wall-clock time of MAS.run() (the best of --repeat runs) and
+the peak memory allocated during a separate run (traced by tracemalloc,
+which includes the NumPy arrays).
+"""
+
+# %% Imports
+# Standard library imports
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Third party imports
+import numpy as np
+import scipy
+
+# Local application imports
+from benchmarks.scenarios import TIME_STEP, ENGINES, caseKey, scenario, suite
+
+# %% Measurements
+def measure(case, repeat=3, memory=True) -> dict:
+    """
+    Runs a case and returns its measurements: "seconds" (the best wall-clock
+    time of MAS.run() in 'repeat' runs) and "peakBytes" (the peak memory
+    allocated while building and running the MAS, or None if memory is
+    False).
+    """
+    end_time = case.steps * TIME_STEP
+    seconds = np.inf
+    for _ in range(repeat):
+        mas = scenario(case.agents, case.ns, case.density, case.dynamics)
+        start = time.perf_counter()
+        mas.run(0, end_time, TIME_STEP, engine=case.engine)
+        seconds = min(seconds, time.perf_counter() - start)
+    peakBytes = None
+    if memory:
+        tracemalloc.start()
+        try:
+            mas = scenario(case.agents, case.ns, case.density, case.dynamics)
+            mas.run(0, end_time, TIME_STEP, engine=case.engine)
+            peakBytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    result = case._asdict()
+    result.update(key=caseKey(case), seconds=seconds, peakBytes=peakBytes, \
+                  edges=mas.network.topology.numOfEdges)
+    return result
+
+def meta() -> dict:
+    # The environment of the results:
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "platform": platform.platform(),
+        "timeStep": TIME_STEP,
+    }
+
+def runSuite(name, engines=None, repeat=3, memory=True, log=print):
+    """
+    Runs all cases of a suite (see benchmarks.scenarios.suite()) with every
+    engine which can simulate them (or with the given engines only) and
+    returns the results as a dict with the keys "meta" and "results".
+    """
+    results = []
+    for case in suite(name):
+        for engine in ENGINES[case.dynamics]:
+            if engines is not None and engine not in engines:
+                continue
+            result = measure(case._replace(engine=engine), repeat, memory)
+            results.append(result)
+            if log is not None:
+                log("{:<80s} {:9.4f} s".format(result["key"], \
+                                               result["seconds"]))
+    return {"meta": meta(), "results": results}
+
+# %% Comparison with a baseline
+def compare(results: dict, baseline: dict, threshold=0.1):
+    """
+    Compares results with a baseline (both as returned by runSuite()).
+    Returns the rows of a comparison table (one per case found in both) and
+    the keys of the regressions, i.e. of the cases which are more than
+    'threshold' (relative) slower than the baseline.
+    """
+    old = {result["key"]: result for result in baseline["results"]}
+    rows, regressions = [], []
+    for result in results["results"]:
+        if result["key"] not in old:
+            continue
+        before = old[result["key"]]
+        ratio = result["seconds"] / before["seconds"]
+        memoryRatio = None
+        if result["peakBytes"] and before["peakBytes"]:
+            memoryRatio = result["peakBytes"] / before["peakBytes"]
+        regression = ratio > 1 + threshold
+        if regression:
+            regressions.append(result["key"])
+        rows.append((result["key"], before["seconds"], result["seconds"], \
+                     ratio, memoryRatio, regression))
+    return rows, regressions
+
+def formatTable(rows) -> str:
+    """
+    Returns the rows of compare() as a text table.
+    """
+    lines = ["{:<80s} {:>10s} {:>10s} {:>7s} {:>7s}".format( \
+        "case", "baseline", "current", "time", "memory")]
+    for key, before, after, ratio, memoryRatio, regression in rows:
+        memory = "-" if memoryRatio is None else "{:.2f}x".format(memoryRatio)
+        lines.append("{:<80s} {:>9.4f}s {:>9.4f}s {:>6.2f}x {:>7s}{}".format( \
+            key, before, after, ratio, memory, \
+            "  REGRESSION" if regression else ""))
+    return "\n".join(lines)
+
+# %% Command line interface
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Runs the pymas " + \
+                                     "benchmarks.")
+    parser.add_argument("--suite", default="quick", \
+                        help="quick (default) or full")
+    parser.add_argument("--engines", nargs="+", default=None, \
+                        help="only run these engines")
+    parser.add_argument("--repeat", type=int, default=3, \
+                        help="runs per case (the best time is kept)")
+    parser.add_argument("--no-memory", action="store_true", \
+                        help="do not measure the peak memory")
+    parser.add_argument("--output", default=None, \
+                        help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=None, \
+                        help="compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1, \
+                        help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = runSuite(args.suite, args.engines, args.repeat, \
+                       not args.no_memory)
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=1)
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        rows, regressions = compare(results, baseline, args.threshold)
+        print(formatTable(rows))
+        if regressions:
+            print("{} regression(s) above {:.0%}.".format(len(regressions), \
+                                                          args.threshold))
+            return 1
+    return 0
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""
+The generated benchmark scenarios.
+"""
+
+# %% Imports
+# Standard library imports
+from collections import namedtuple
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+from pymas.agent import Agent
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.mas import MAS
+
+# The time step of all scenarios (exact in binary, so the number of steps of
+# a horizon is exact):
+TIME_STEP = 0.0625
+
+# A benchmark case: the scenario parameters and the engine name
+Case = namedtuple("Case", ["agents", "steps", "ns", "density", "dynamics", \
+                           "engine"])
+
+# The dynamics types, and the engines which can simulate them:
+DYNAMICS = ("integrator", "lti", "nonlinear")
+ENGINES = {
+    "integrator": ("agent", "monolithic", "batch", "lti", "distributed", \
+                   "jit", "async"),
+    "lti": ("agent", "monolithic", "batch", "lti", "distributed", "jit", \
+            "async"),
+    "nonlinear": ("agent", "monolithic", "batch", "distributed", "jit", \
+                  "async"),
+}
+
+def caseKey(case: Case) -> str:
+    """
+    Returns a unique name of a case, e.g. for comparisons with a baseline.
+    """
+    return ",".join("{}={}".format(name, value) \
+                    for name, value in case._asdict().items())
+
+# %% The nonlinear agent class
+def nonlinearKernel(t, X, U, params):
+    # The compiled dynamics of NonlinearAgent (see Agent.f_kernel):
+    return -np.sin(X) + U
+
+class NonlinearAgent(Agent):
+
+    def __init__(self, ns=1, *, init_states=None, index: int=None):
+        """
+        An agent with the nonlinear dynamics dx/dt = -sin(x) + u (one input
+        per state).
+        """
+        Agent.__init__(self, ns, ns, ns, init_states=init_states, \
+                       index=index)
+
+    def f(self, x, t, u):
+        return -np.sin(x) + np.reshape(u, (self.ns,))
+
+    def f_batch(self, t, X, U):
+        return -np.sin(X) + U
+
+    f_kernel = staticmethod(nonlinearKernel)
+
+    def output(self, x, u):
+        return x
+
+# %% Scenario generation
+def adjacency(numOfAgents: int, density: float, seed=0):
+    """
+    Returns a random undirected graph (as a CSR matrix) in which each pair
+    of agents is connected with probability 'density'. A ring is added, so
+    the graph is connected.
+    """
+    rng = np.random.default_rng(seed)
+    A = sp.random(numOfAgents, numOfAgents, density=density, \
+                  random_state=rng, data_rvs=np.ones, format="csr")
+    ring = sp.diags(np.ones(numOfAgents - 1), 1, \
+                    shape=(numOfAgents, numOfAgents))
+    A = ((A + A.T + ring + ring.T) > 0).astype("float")
+    A.setdiag(0)
+    A.eliminate_zeros()
+    return A.tocsr()
+
+def scenario(numOfAgents: int, ns: int, density: float, dynamics: str, \
+             seed=0) -> MAS:
+    """
+    Returns a MAS of numOfAgents agents with ns states each, connected by
+    adjacency(numOfAgents, density) and controlled by the linear consensus
+    protocol (ConsensusDcontroller).
+
+    Parameters
+    ----------
+    numOfAgents : int
+        The number of agents.
+    ns : int
+        The number of states (and inputs) of each agent.
+    density : float
+        The probability of an edge between two agents.
+    dynamics : str
+        "integrator": dx/dt = u (LTIAgent),
+        "lti": stable oscillators dx/dt = A x + u (LTIAgent),
+        "nonlinear": dx/dt = -sin(x) + u (NonlinearAgent).
+    seed : int, optional
+        The seed of the graph, the dynamics and the initial states. The
+        default is 0.
+
+    Returns
+    -------
+    The MAS instance.
+
+    """
+    if dynamics not in DYNAMICS:
+        raise ValueError("dynamics should be one of: " + ", ".join(DYNAMICS))
+    rng = np.random.default_rng(seed)
+    inits = rng.uniform(-5, 5, size=(numOfAgents, ns))
+    if dynamics == "nonlinear":
+        agents = [NonlinearAgent(ns, init_states=inits[i], index=i) \
+                  for i in range(numOfAgents)]
+    else:
+        A = np.zeros(shape=(ns, ns))
+        if dynamics == "lti":
+            S = rng.normal(size=(ns, ns))
+            A = -0.5 * np.eye(ns) + (S - S.T) / 2
+        agents = [LTIAgent(A, np.eye(ns), init_states=inits[i], index=i) \
+                  for i in range(numOfAgents)]
+    net = Network(adjacency(numOfAgents, density, seed), agents)
+    return MAS(net, ConsensusDcontroller(net))
+
+# %% The benchmark suites
+def _axis(base, name, values):
+    return [base._replace(**{name: value}) for value in values]
+
+def suite(name: str):
+    """
+    Returns the cases of a benchmark suite (without engines). Each suite
+    varies one parameter of a base case at a time: the number of agents,
+    the number of steps, the number of states, the density and the
+    dynamics type.
+    """
+    if name == "quick":
+        base = Case(50, 40, 2, 0.1, "lti", None)
+        axes = {"agents": [10, 50, 200], "steps": [40, 160], "ns": [1, 2, 8], \
+                "density": [0.05, 0.1, 0.5], "dynamics": DYNAMICS}
+    elif name == "full":
+        base = Case(200, 160, 2, 0.05, "lti", None)
+        axes = {"agents": [20, 200, 2000], "steps": [40, 160, 640], \
+                "ns": [1, 2, 8, 32], "density": [0.01, 0.05, 0.2], \
+                "dynamics": DYNAMICS}
+    else:
+        raise ValueError("Unknown suite '{}'. Available suites: quick, full"\
+                         .format(name))
+    cases = []
+    for axis, values in axes.items():
+        for case in _axis(base, axis, values):
+            if case not in cases:
+                cases.append(case)
+    return cases
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("scenarios.py is not an executable module!")
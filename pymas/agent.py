@@ -13,12 +13,14 @@ import numpy as np
 from scipy.integrate import odeint
 
 # Local application imports
+from pymas.trajectory import TrajectoryBuffer, WindowBuffer
 
 # %% The Agent class
 class Agent(ABC):
     
     def __init__(self, ni=1, no=1, ns=2, f=None, *, tStart=0, \
-                 init_states=None, evolve_points=10, index: int=None):
+                 init_states=None, evolve_points=10, index: int=None, \
+                 recording=None):
         """
         Parameters
         ----------
@@ -44,6 +46,9 @@ class Agent(ABC):
         index : TYPE, optional and Keyword-only argument
             DESCRIPTION. The default is None. But it should be set in higher
             level classes.
+        recording : pymas.recording.RecordingPolicy, optional and
+            Keyword-only argument. Defines which samples are recorded (see
+            setRecordingPolicy()). The default is None (all samples).
 
         Returns
         -------
@@ -58,9 +63,19 @@ class Agent(ABC):
         self.ns = ns
         
         # Set simulation parameters and initial states (time is in seconds)
+        # *** The trajectories are kept in preallocated buffers and are
+        # exposed as views through time, stateTrajectHistory and
+        # inputTrajectory. ***
         self.tStart = tStart # tStart is always 0
-        self.time = tStart * np.ones(shape=(1,), dtype="float")
         self.num_evolve_points = evolve_points
+        self._timeBuffer = TrajectoryBuffer()
+        self._stateBuffer = TrajectoryBuffer(self.ns)
+        self._inputBuffer = TrajectoryBuffer(self.ni)
+        self._outputBuffer = None
+        self.recording = None
+        self._recordedSteps = 0
+        self._provisional = False # The last row is kept only until replaced
+        self.time = tStart * np.ones(shape=(1,), dtype="float")
         if type(init_states) == np.ndarray and init_states.shape == (self.ns,):
             self.stateTrajectHistory = init_states.reshape((1, self.ns))
         else:
@@ -75,10 +90,139 @@ class Agent(ABC):
             self.index = index
         else:
             raise RuntimeError("Agent's index argument should not be empty!")
+        
+        if recording is not None:
+            self.setRecordingPolicy(recording)
             
         # # DEBUG
         # print("DEBUG: Agent {} is instantiated.".format(self.index))
     
+    # Trajectories are views into the buffers (no copy is made):
+    @property
+    def time(self) -> np.ndarray:
+        return self._timeBuffer.data
+    
+    @time.setter
+    def time(self, value):
+        self._timeBuffer.reset(value)
+    
+    @property
+    def stateTrajectHistory(self) -> np.ndarray:
+        return self._stateBuffer.data
+    
+    @stateTrajectHistory.setter
+    def stateTrajectHistory(self, value):
+        self._stateBuffer.reset(value)
+    
+    @property
+    def inputTrajectory(self) -> np.ndarray:
+        # Inputs are stored row by row but exposed as a flat vector as before.
+        return self._inputBuffer.data.reshape(-1)
+    
+    @inputTrajectory.setter
+    def inputTrajectory(self, value):
+        self._inputBuffer.reset(value)
+    
+    @property
+    def outputTrajectory(self) -> np.ndarray:
+        # Only recorded if the recording policy selects components or outputs.
+        if self._outputBuffer is None:
+            return None
+        return self._outputBuffer.data
+    
+    def setTrajectoryBuffers(self, timeBuffer, stateBuffer, inputBuffer):
+        """
+        Replaces the buffers behind time, stateTrajectHistory and
+        inputTrajectory, e.g. by the columns of a
+        pymas.recorder.MemmapRecorder. The buffers should have the
+        interface of pymas.trajectory.TrajectoryBuffer.
+        """
+        self._timeBuffer = timeBuffer
+        self._stateBuffer = stateBuffer
+        self._inputBuffer = inputBuffer
+        self._recordedSteps = 0
+        self._provisional = False
+    
+    def setRecordingPolicy(self, policy):
+        """
+        Sets which samples are recorded by record() and rebuilds the
+        trajectory buffers accordingly. The rows recorded so far are kept
+        (the last ones if a window is set), except with a policy which
+        records outputTrajectory: then the recording starts over from the
+        latest sample.
+
+        Parameters
+        ----------
+        policy : pymas.recording.RecordingPolicy or None
+            The recording policy. None records all samples.
+
+        Returns
+        -------
+        None.
+
+        """
+        if policy is self.recording:
+            return
+        time = self.time.copy()
+        states = self.stateTrajectHistory.copy()
+        inputs = self._inputBuffer.data.copy()
+        self.recording = policy
+        self._recordedSteps = 0
+        self._provisional = False
+        self._timeBuffer = self._newBuffer(None)
+        self._stateBuffer = self._newBuffer(self.ns)
+        self._inputBuffer = self._newBuffer(self.ni)
+        self._outputBuffer = None
+        if policy is not None and policy.reduced:
+            # Only the latest state is kept, since controllers read it:
+            self._stateBuffer = WindowBuffer(self.ns, 1)
+            samples = self._samples(states[-1:], inputs[-1])
+            self._outputBuffer = self._newBuffer(samples.shape[1])
+            self._outputBuffer.append(samples)
+            time = time[-1:]
+        self._timeBuffer.append(time)
+        self._stateBuffer.append(states)
+        self._inputBuffer.append(inputs)
+    
+    def _newBuffer(self, width):
+        if self.recording is not None and self.recording.window is not None:
+            return WindowBuffer(width, self.recording.window)
+        return TrajectoryBuffer(width)
+    
+    def _samples(self, states, u):
+        # The recorded rows of outputTrajectory for the given states.
+        if self.recording.outputs:
+            return np.array([np.reshape(self.output(x, u), (-1,)) \
+                             for x in states])
+        return states[:, self.recording.components]
+    
+    def reserve(self, steps: int):
+        """
+        Preallocates the trajectory buffers for 'steps' more evolve calls.
+        It is called by MAS.run() where the horizon is known. Without it,
+        the buffers grow in amortized chunks.
+
+        Parameters
+        ----------
+        steps : int
+            Number of upcoming evolve calls.
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.recording is None:
+            points = steps * (self.num_evolve_points - 1)
+        else:
+            points, steps = self.recording.rows(steps, self.num_evolve_points)
+        self._timeBuffer.reserve(points)
+        self._inputBuffer.reserve(steps)
+        if self._outputBuffer is None:
+            self._stateBuffer.reserve(points)
+        else:
+            self._outputBuffer.reserve(points)
+    
     @abstractmethod
     def f(self, x, t, u): # -> output type
         """
@@ -107,6 +251,54 @@ class Agent(ABC):
         A = np.random.rand(self.ns, self.ns)
         B = np.zeros(self.ns)
         return np.dot(A, x) + np.dot(B, u)
+    
+    # Optional batched dynamics. A class which evaluates its dynamics for many
+    # agents at once should implement:
+    #     def f_batch(self, t, X, U):
+    #         return dX/dt
+    # where X has shape (N, ns), U has shape (N, ni) and dX/dt has shape
+    # (N, ns). It is used by pymas.engines.BatchEngine, which calls it on
+    # one agent of the class for all agents of that class (so they should
+    # share the same parameters).
+    f_batch = None
+
+    # Optional compiled dynamics. A class whose batched dynamics only use
+    # NumPy array operations can provide a plain function of arrays:
+    #     f_kernel = staticmethod(kernel)   # kernel(t, X, U, params)
+    #     def kernelParams(self):
+    #         return (arrays...)            # the tuple passed as params
+    # It is compiled by pymas.engines.JITEngine with Numba (if installed).
+    f_kernel = None
+
+    def kernelParams(self) -> tuple:
+        return ()
+
+    def batchDynamics(self, name="f_batch"):
+        """
+        Returns the batched dynamics 'name' ("f_batch" or "f_kernel") of the
+        agent if they evaluate the f() in use, otherwise None. They do if
+        they are defined by the same class as f() (or both are set on the
+        instance), so a subclass which only overrides f() (e.g. with faulty
+        dynamics) is evaluated by its own f().
+        """
+        if getattr(self, name) is None:
+            return None
+        if self._definer(name) is not self._definer("f"):
+            return None
+        return getattr(self, name)
+
+    def _definer(self, name):
+        # The instance or the class of the MRO which defines the attribute:
+        if name in vars(self):
+            return self
+        for cls in type(self).__mro__:
+            if name in vars(cls):
+                return cls
+        return None
+
+    # The integrator of evolve(), with the calling convention of odeint (it
+    # is replaced during a run by pymas.profiler.Profiler):
+    _integrate = staticmethod(odeint)
 
     def evolve(self, t: float, u):
         """
@@ -132,12 +324,66 @@ class Agent(ABC):
         else:
             x0 = self.stateTrajectHistory[-1]
             
-        sol = odeint(self.f, x0.reshape((self.ns,)), t_list, args=(u,))
+        sol = self._integrate(self.f, x0.reshape((self.ns,)), t_list, \
+                              args=(u,))
+        
+        self.record(t_list[1:], sol[1:], u)
+    
+    def record(self, t_list, states, u):
+        """
+        Appends an evolved segment to the trajectories of the agent. It is
+        used by evolve() and by the engines which integrate the agents
+        outside of evolve() (e.g. the monolithic engine).
+
+        Arguments
+        ---------
+        t_list : The new time points (without the current time).
+        states : The states at t_list with shape (len(t_list), ns).
+        u : The (piecewise constant) input applied over the segment.
         
-        self.time = np.append(self.time, t_list[1:], axis=0)
-        self.stateTrajectHistory = np.append(self.stateTrajectHistory, \
-                                             sol[1:], axis=0)
-        self.inputTrajectory = np.append(self.inputTrajectory, u)
+        Returns
+        -------
+        None.
+
+        """
+        policy = self.recording
+        if policy is None:
+            self._timeBuffer.append(t_list)
+            self._stateBuffer.append(states)
+            self._inputBuffer.append(u)
+            return
+        if policy.endpoints:
+            t_list = t_list[-1:]
+            states = states[-1:]
+        if self._outputBuffer is None:
+            sampleBuffer = self._stateBuffer
+            samples = states
+        else:
+            self._stateBuffer.append(states[-1])
+            sampleBuffer = self._outputBuffer
+            samples = self._samples(states, u)
+        buffers = (self._timeBuffer, sampleBuffer, self._inputBuffer)
+        self._recordedSteps += 1
+        if self._recordedSteps % policy.every == 0:
+            # A recorded step replaces the provisional row (if any):
+            rows = (t_list, samples, [u])
+            if self._provisional:
+                for buffer, row in zip(buffers, rows):
+                    buffer.replaceLast(row[0])
+                rows = (t_list[1:], samples[1:], [])
+            for buffer, row in zip(buffers, rows):
+                if len(row):
+                    buffer.append(row)
+            self._provisional = False
+        else:
+            # Only the latest sample is kept until the next recorded step:
+            rows = (t_list[-1], samples[-1], u)
+            for buffer, row in zip(buffers, rows):
+                if self._provisional:
+                    buffer.replaceLast(row)
+                else:
+                    buffer.append(row)
+            self._provisional = True
     
     @abstractmethod
     def output(self, x, u):
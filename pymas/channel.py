@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the Channel class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+from pymas.links import LinkLayer
+
+# %% The communication channel class
+class Channel(LinkLayer):
+
+    def __init__(self, *, seed=None):
+        """
+        A link layer with communication delays and packet losses. The
+        values received over an edge are the states its source sent some
+        time steps earlier:
+            constant delays, or random delays drawn per step and edge
+                (uniformly in [delay, delay + jitter]),
+        and lost packets are replaced by the last value received over the
+        edge (zero-order hold):
+            Bernoulli losses with probability p per step, or
+            Gilbert-Elliott (bursty) losses: each edge is in a good or a bad
+                state, which is switched with the probabilities goodToBad and
+                badToGood per step, and packets are lost with probability p
+                (good) or pBad (bad).
+        The attacks of LinkLayer (see LinkLayer.add()) are applied to the
+        received values.
+
+        The sent states are kept in one ring with a sample per time step,
+        sized to the longest delay, and the delayed values are gathered with
+        one index per edge, so a step costs O(numOfEdges) with bounded
+        memory. The delays are rounded to whole time steps.
+
+        Example:
+            channel = Channel(seed=1)
+            channel.setDelay(delay=0.1, jitter=0.2)     # all edges
+            channel.setLoss([(0, 1)], p=0.05, goodToBad=0.1, badToGood=0.3)
+            net = Network(Adj, agents, links=channel)
+
+        Parameters
+        ----------
+        seed : int, optional and Keyword-only argument
+            The seed of the random delays and losses. Every run starts from
+            this seed, so runs are reproducible. The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        LinkLayer.__init__(self)
+        self.seed = seed
+        self._delays = []
+        self._losses = []
+
+    def setDelay(self, edges=None, delay=0.0, *, jitter=0.0):
+        """
+        Sets the delay (in seconds) of some edges (all edges if edges is
+        None). If jitter is positive, the delay of each step is drawn
+        uniformly from [delay, delay + jitter].
+        """
+        self._delays.append((self._edgeArray(edges), float(delay), \
+                             float(jitter)))
+        self._compiled = {}
+
+    def setLoss(self, edges=None, p=0.0, *, goodToBad=0.0, badToGood=1.0, \
+                pBad=1.0):
+        """
+        Sets the packet losses of some edges (all edges if edges is None):
+        Bernoulli losses with probability p, or Gilbert-Elliott losses if
+        goodToBad is positive (see Channel).
+        """
+        self._losses.append((self._edgeArray(edges), float(p), \
+                             float(goodToBad), float(badToGood), float(pBad)))
+        self._compiled = {}
+
+    def _edgeArray(self, edges):
+        if edges is None:
+            return None
+        return np.asarray(edges, dtype="int64").reshape(-1, 2)
+
+    def start(self, mas):
+        self._rng = np.random.default_rng(self.seed)
+        LinkLayer.start(self, mas)
+
+    # The per-edge channel state in the compiled arrays of each topology:
+    _CHANNEL = ("currentLags", "bad", "lost", "last")
+
+    def getState(self):
+        state = LinkLayer.getState(self)
+        state["rng"] = self._rng.bit_generator.state
+        edges = []
+        for topology in self.net.topologies():
+            if id(topology) in self._compiled:
+                arrays = self._compiled[id(topology)][1]
+                edges.append({key: None if arrays[key] is None else \
+                              arrays[key].copy() for key in self._CHANNEL})
+            else:
+                edges.append(None)
+        state["edges"] = edges
+        return state
+
+    def setState(self, state):
+        LinkLayer.setState(self, state)
+        self._rng.bit_generator.state = state["rng"]
+        for topology, edges in zip(self.net.topologies(), state["edges"]):
+            if edges is not None:
+                arrays = self._compile(topology)
+                arrays.update({key: None if value is None else value.copy() \
+                               for key, value in edges.items()})
+
+    def _history(self):
+        delays = [delay + jitter for _, delay, jitter in self._delays]
+        history = LinkLayer._history(self)
+        if history is not None:
+            delays.append(history)
+        return max(delays) if delays else None
+
+    def _compile(self, topology):
+        arrays = LinkLayer._compile(self, topology)
+        E = topology.numOfEdges
+        h = self._interval
+        lags = np.zeros(shape=(E,), dtype="int64")
+        spreads = np.zeros(shape=(E,), dtype="int64")
+        for edges, delay, jitter in self._delays:
+            ids, _ = self._edgeIds(topology, edges)
+            lags[ids] = int(round(delay / h))
+            spreads[ids] = int(round((delay + jitter) / h)) - lags[ids]
+        loss = np.zeros(shape=(E,))
+        goodToBad = np.zeros(shape=(E,))
+        badToGood = np.ones(shape=(E,))
+        lossBad = np.ones(shape=(E,))
+        for edges, p, pGB, pBG, pBad in self._losses:
+            ids, _ = self._edgeIds(topology, edges)
+            loss[ids], goodToBad[ids], badToGood[ids], lossBad[ids] = \
+                p, pGB, pBG, pBad
+        arrays.update({
+            "lags": lags,
+            "spreads": spreads,
+            "delayed": bool(lags.any() or spreads.any()),
+            "lossy": bool(loss.any() or goodToBad.any()),
+            "loss": loss,
+            "goodToBad": goodToBad,
+            "badToGood": badToGood,
+            "lossBad": lossBad,
+            # The channel state of each edge:
+            "currentLags": lags.copy(),
+            "bad": np.zeros(shape=(E,), dtype="bool"),
+            "lost": np.zeros(shape=(E,), dtype="bool"),
+            "last": None, # The last received values
+        })
+        return arrays
+
+    def _draw(self, arrays):
+        # The random delays and losses of a step:
+        E = arrays["lags"].shape[0]
+        if arrays["spreads"].any():
+            arrays["currentLags"] = arrays["lags"] + \
+                self._rng.integers(0, arrays["spreads"] + 1)
+        if arrays["lossy"]:
+            u = self._rng.random(E)
+            arrays["bad"] = np.where(arrays["bad"], u >= arrays["badToGood"], \
+                                     u < arrays["goodToBad"])
+            arrays["lost"] = self._rng.random(E) < \
+                np.where(arrays["bad"], arrays["lossBad"], arrays["loss"])
+
+    def _send(self, t, X, topology, arrays, newStep):
+        if newStep:
+            self._draw(arrays)
+        if arrays["delayed"]:
+            V = self._ring.lagged(arrays["currentLags"], topology.edgeSources)
+        else:
+            V = X[topology.edgeSources]
+        if arrays["lossy"]:
+            if arrays["last"] is not None:
+                lost = arrays["lost"]
+                V[lost] = arrays["last"][lost]
+            arrays["last"] = V.copy()
+        return V
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("channel.py is not an executable module!")
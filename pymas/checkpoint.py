@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the Checkpointer class.
+"""
+
+# %% Imports
+# Standard library imports
+import os
+import glob
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+from pymas.trajectory import TrajectoryBuffer
+from pymas.engines import DistributedEngine, AsyncEngine
+
+# The trajectories of the agents in the chunk files:
+TRAJECTORIES = ("time", "states", "inputs", "outputs")
+VERSION = 1
+
+def _buffers(agent):
+    # The trajectory buffers of an agent in the order of TRAJECTORIES:
+    return (agent._timeBuffer, agent._stateBuffer, agent._inputBuffer, \
+            agent._outputBuffer)
+
+# %% The checkpointer class
+class Checkpointer:
+
+    def __init__(self, path: str, *, every=None, compress=False):
+        """
+        Writes checkpoints of a MAS to the directory path, from which
+        MAS.resume() continues the run, e.g. after the process was killed.
+        A checkpoint holds the step and time of the run, the latest states
+        and the trajectories of the agents, and the internal state of the
+        network schedule, the Dcontroller, the link layer or channel, the
+        observers, the metrics and the termination criterion (see their
+        getState() methods), so a resumed run gives the same results as an
+        uninterrupted one.
+
+        The checkpoints are incremental: each one writes the trajectory rows
+        recorded since the previous checkpoint to a chunk file
+        (chunk-000001.npz, ...) and the rest (which is small) to a state
+        file (state-000001.pkl), which replaces the previous one. The data
+        is copied at the checkpoint and written by a background thread, so
+        the run continues while the files are written. The files are
+        written under temporary names and renamed, so an interrupted write
+        leaves the previous checkpoint intact.
+
+        Example:
+            mas.run(0, 3600, 0.01, checkpoint=Checkpointer("ckpt", every=1000))
+            # ... after a restart, with the same MAS set-up:
+            mas.resume("ckpt", checkpoint=Checkpointer("ckpt", every=1000))
+
+        *** Trajectories recorded by a pymas.recorder.MemmapRecorder are not
+        checkpointed, nor the states of stateful controllers or links in a
+        run with pymas.engines.DistributedEngine (they are kept in its
+        workers), nor runs with pymas.engines.AsyncEngine. The FaultInjector
+        only depends on the time, so it has no state to save. ***
+
+        Parameters
+        ----------
+        path : str
+            The directory of the checkpoint files. It is created if needed.
+        every : int, optional and Keyword-only argument
+            The number of steps between two checkpoints in MAS.run(). A
+            checkpoint is also written after the last step. The default is
+            None (only after the last step).
+        compress : bool, optional and Keyword-only argument
+            If True, the chunk files are compressed. The default is False.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.path = path
+        self.every = None if every is None else max(int(every), 1)
+        self.compress = compress
+        self._executor = None
+        self._futures = []
+        self.begin()
+
+    def begin(self, sequence=0, saved=None):
+        """
+        Starts the checkpoints of a run. With the default arguments the
+        checkpoint files in path are replaced by the first checkpoint,
+        otherwise the checkpoints continue the chunks of a loaded
+        checkpoint (see load()).
+        """
+        self.sequence = sequence
+        self._saved = saved
+        self._fresh = sequence == 0
+
+    def due(self, k: int, last: bool) -> bool:
+        """
+        Returns True if a checkpoint is written after step k in MAS.run().
+        """
+        return last or (self.every is not None and k % self.every == 0)
+
+    # %% Writing
+    @staticmethod
+    def check(mas):
+        """
+        Raises a ValueError if a run of mas with its engine cannot be
+        checkpointed. It is called by MAS.run() before the first step, so
+        the run fails before any work is done, and by write().
+        """
+        if mas.recorder is not None:
+            raise ValueError("Checkpoints of a MAS with a MemmapRecorder " \
+                             "are not supported.")
+        if isinstance(mas.engine, DistributedEngine) and \
+                (mas.dcontroller.getState() or mas.network.links is not None):
+            # The workers calculate the inputs with their own copies:
+            raise ValueError("The states of the Dcontroller and the links " \
+                             "of a run with a DistributedEngine are kept " \
+                             "in its workers and cannot be checkpointed.")
+        if isinstance(mas.engine, AsyncEngine):
+            raise ValueError("The event queue of an AsyncEngine cannot be " \
+                             "checkpointed.")
+
+    def write(self, mas):
+        """
+        Writes a checkpoint of mas (after its latest step) in the
+        background. Returns a concurrent.futures.Future of the write.
+        """
+        if getattr(mas, "_run", None) is None:
+            raise RuntimeError("The MAS has not been run.")
+        Checkpointer.check(mas)
+        controllerState = mas.dcontroller.getState()
+        agents = mas.network.agents
+        if self._saved is None:
+            self._saved = np.zeros(shape=(len(agents), len(TRAJECTORIES)), \
+                                   dtype="int64")
+        chunk, tails = self._capture(agents)
+        state = {
+            "version": VERSION,
+            "run": dict(mas._run),
+            "agents": tails,
+            "saved": self._saved.copy(),
+            "network": mas.network.getState(),
+            "dcontroller": controllerState,
+            "links": None if mas.network.links is None else \
+                mas.network.links.getState(),
+            "termination": None if mas._termination is None else \
+                mas._termination.getState(),
+            "observers": None if mas.observers is None else \
+                mas.observers.getState(),
+            "metrics": None if mas._metrics is None else \
+                mas._metrics.getState(),
+        }
+        self.sequence += 1
+        fresh, self._fresh = self._fresh, False
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        future = self._executor.submit(self._write, self.sequence, chunk, \
+                                       state, fresh)
+        self._futures = [f for f in self._futures if not f.done()] + [future]
+        return future
+
+    def _capture(self, agents):
+        # Copies the new (final) trajectory rows into a chunk, and returns
+        # the rest of the state of the agents. The last row of a decimated
+        # recording is provisional (it is replaced later), so it is kept in
+        # the state, as well as rolling windows (see
+        # pymas.recording.RecordingPolicy).
+        rows = {name: [] for name in TRAJECTORIES}
+        counts = np.zeros(shape=self._saved.shape, dtype="int64")
+        tails = []
+        for i, agent in enumerate(agents):
+            tail = {"recordedSteps": agent._recordedSteps, \
+                    "provisional": agent._provisional}
+            for b, (name, buffer) in enumerate(zip(TRAJECTORIES, \
+                                                   _buffers(agent))):
+                if buffer is None:
+                    continue
+                data = buffer.data
+                if type(buffer) is not TrajectoryBuffer:
+                    tail[name] = data.copy()
+                    continue
+                final = len(data) - int(agent._provisional)
+                start = self._saved[i, b]
+                if final < start:
+                    raise RuntimeError("The trajectories of agent {} are " \
+                                       "shorter than at the previous " \
+                                       "checkpoint.".format(i))
+                rows[name].append(data[start:final].copy())
+                counts[i, b] = final - start
+                tail[name] = data[final:].copy()
+            tails.append(tail)
+        self._saved += counts
+        chunk = {"counts": counts}
+        for name, blocks in rows.items():
+            if blocks:
+                chunk[name] = np.concatenate(blocks)
+        return chunk, tails
+
+    def _write(self, sequence, chunk, state, fresh):
+        # Runs in the background thread:
+        os.makedirs(self.path, exist_ok=True)
+        if fresh:
+            for name in self._files("chunk", "npz") + \
+                    self._files("state", "pkl"):
+                os.remove(name)
+        name = os.path.join(self.path, "chunk-{:06d}.npz".format(sequence))
+        with open(name + ".tmp", "wb") as file:
+            (np.savez_compressed if self.compress else np.savez)(file, **chunk)
+        os.replace(name + ".tmp", name)
+        name = os.path.join(self.path, "state-{:06d}.pkl".format(sequence))
+        with open(name + ".tmp", "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(name + ".tmp", name)
+        # Only the latest state file is needed:
+        for old in self._files("state", "pkl"):
+            if old != name:
+                os.remove(old)
+
+    def _files(self, prefix, extension):
+        return sorted(glob.glob(os.path.join(self.path, "{}-[0-9]*.{}"\
+                                             .format(prefix, extension))))
+
+    def wait(self):
+        """
+        Waits until all checkpoints are written (and raises the errors of
+        the writes).
+        """
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        """
+        Waits for the writes and stops the background thread.
+        """
+        try:
+            self.wait()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    # %% Reading
+    @staticmethod
+    def load(path: str) -> dict:
+        """
+        Reads the latest checkpoint in path. Returns its state, where the
+        trajectories of each agent (in state["agents"]) are complete, and
+        state["sequence"] is the number of the checkpoint.
+        """
+        states = sorted(glob.glob(os.path.join(path, "state-[0-9]*.pkl")))
+        if not states:
+            raise FileNotFoundError("No checkpoint in '{}'.".format(path))
+        with open(states[-1], "rb") as file:
+            state = pickle.load(file)
+        if state.get("version") != VERSION:
+            raise ValueError("Unknown checkpoint version.")
+        sequence = int(os.path.basename(states[-1])[6:-4])
+        tails = state["agents"]
+        blocks = [{name: [] for name in TRAJECTORIES} for _ in tails]
+        for n in range(1, sequence + 1):
+            name = os.path.join(path, "chunk-{:06d}.npz".format(n))
+            with np.load(name) as chunk:
+                counts = chunk["counts"]
+                for b, trajectory in enumerate(TRAJECTORIES):
+                    if trajectory not in chunk.files:
+                        continue
+                    rows = chunk[trajectory]
+                    ends = np.cumsum(counts[:, b])
+                    for i in range(len(tails)):
+                        blocks[i][trajectory].append( \
+                            rows[ends[i] - counts[i, b]:ends[i]])
+        for tail, agentBlocks in zip(tails, blocks):
+            for trajectory, rows in agentBlocks.items():
+                if trajectory in tail and rows:
+                    tail[trajectory] = np.concatenate(rows + \
+                                                      [tail[trajectory]])
+        state["sequence"] = sequence
+        return state
+
+    @staticmethod
+    def restore(mas, state: dict, termination=None, metrics=None) -> int:
+        """
+        Restores a loaded state (see load()) into mas, termination and
+        metrics. It is called by MAS.resume() after the objects of the run
+        have been reset and started. Returns the step of the checkpoint.
+        """
+        agents = mas.network.agents
+        if len(agents) != len(state["agents"]):
+            raise ValueError("The checkpoint has {} agents, the MAS has {}."\
+                             .format(len(state["agents"]), len(agents)))
+        for agent, tail in zip(agents, state["agents"]):
+            for name, buffer in zip(TRAJECTORIES, _buffers(agent)):
+                if (buffer is None) != (name not in tail):
+                    raise ValueError("The recording policy of agent {} " \
+                                     "differs from the checkpoint."\
+                                     .format(agent.index))
+                if buffer is not None:
+                    buffer.reset(tail[name])
+            agent._recordedSteps = tail["recordedSteps"]
+            agent._provisional = tail["provisional"]
+        mas.network.setState(state["network"])
+        mas.dcontroller.setState(state["dcontroller"])
+        if state["links"] is not None:
+            mas.network.links.setState(state["links"])
+        if termination is not None and state["termination"] is not None:
+            termination.setState(state["termination"])
+        if mas.observers is not None and state.get("observers") is not None:
+            mas.observers.setState(state["observers"])
+        if metrics is not None and state.get("metrics") is not None:
+            metrics.setState(state["metrics"])
+        return state["run"]["step"]
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("checkpoint.py is not an executable module!")
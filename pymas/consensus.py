@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the ConsensusDcontroller class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+from pymas.dcontroller import Dcontroller
+from pymas.network import Network
+
+# %% The linear consensus controller class
+class ConsensusDcontroller(Dcontroller):
+
+    def __init__(self, net: Network, K=None):
+        """
+        A built-in linear consensus protocol:
+            u_i = K * sum_j a_ji (x_j - x_i)
+        where a_ji is the weight of the edge from agent j to agent i. For
+        all agents this is u = -(L kron K) x, where L is the Laplacian
+        matrix of the network.
+
+        Parameters
+        ----------
+        net : Network
+            The network instance.
+        K : numpy 2D array, optional
+            The gain matrix with shape (ni, ns). The default is an identity
+            matrix with shape (ni, ns), i.e. the first ni states are used.
+
+        """
+        Dcontroller.__init__(self, net)
+        self.ns = self.net.agents[0].ns
+        if K is None:
+            K = np.eye(self.ni, self.ns)
+        self.K = np.asarray(K, dtype="float").reshape(self.ni, self.ns)
+        # (L kron K) is cached for each Laplacian (by id, with a reference
+        # to L so that the id is not reused):
+        self._gains = {}
+        self._laplacian = None
+        self._laplacianGain = None
+        self._rows = None
+        self._rowsGain = None
+
+    def rule(self, agent, neighbour):
+        return np.dot(self.K, neighbour.stateTrajectHistory[-1] - \
+                      agent.stateTrajectHistory[-1])
+
+    def controlProtocol(self, agentIndex: int, t) -> np.ndarray:
+        agent = self.net.agents[agentIndex]
+        u = np.zeros(shape=(self.ni, ))
+        for a_ji, neighbour in self.inNeighbours(agentIndex, t):
+            u += a_ji * self.rule(agent, neighbour)
+        return u
+
+    def controlProtocolAll(self, X: np.ndarray, t, rows=None) -> np.ndarray:
+        """
+        Calculates u = -(L kron K) x for all agents (or for the agents in
+        rows) by one sparse matrix-vector product. With a link layer (see
+        pymas.links.LinkLayer) the received values are summed per edge:
+            u_i = K * sum_j a_ji (v_ji - x_i)
+        """
+        if self.net.links is not None:
+            X = np.reshape(X, (-1, self.ns))
+            topology = self.net.topology
+            V, delivered = self.net.links.transmit(t, X)
+            D = (V - X[topology.edgeTargets]) * \
+                (topology.edgeWeights * delivered)[:, None]
+            U = (topology.incidence() @ D) @ self.K.T
+            return U if rows is None else U[rows]
+        x = np.reshape(X, (-1,))
+        return -(self.laplacianGain(rows) @ x).reshape(-1, self.ni)
+
+    def laplacian(self):
+        """
+        Returns the (cached) sparse Laplacian matrix of the network.
+        """
+        return self.net.laplacian()
+
+    def laplacianGain(self, rows=None):
+        """
+        Returns the sparse matrix (L kron K). It is computed once per
+        Laplacian and cached. If rows (agent indices) is given, only the
+        rows of these agents are returned (also cached for the same rows
+        object). Row slicing keeps the order of the entries in each row, so
+        the products are the same as with the whole matrix.
+        """
+        L = self.laplacian()
+        if self._laplacian is not L:
+            # One product per Laplacian, so switching topologies (see
+            # pymas.schedule) does not recompute it:
+            if id(L) not in self._gains:
+                self._gains[id(L)] = (L, sp.kron(L, self.K, format="csr"))
+            self._laplacian = L
+            self._laplacianGain = self._gains[id(L)][1]
+            self._rows = None
+        if rows is None:
+            return self._laplacianGain
+        if self._rows is not rows:
+            index = np.asarray(rows)[:, None] * self.ni + np.arange(self.ni)
+            self._rows = rows
+            self._rowsGain = self._laplacianGain[index.reshape(-1)]
+        return self._rowsGain
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("consensus.py is not an executable module!")
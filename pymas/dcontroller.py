@@ -73,12 +73,97 @@ class Dcontroller(ABC):
                 raise("Error: t in controlProtocol should not be repeated!")
             latest_t = t
             u = np.zeros(shape=(self.no, 1))
-            for a in self.net.agents:
-                if self.net.areNeighbours(a.index, agentIndex):
-                    u += self.rule(self.net.agents[agentIndex], a)
+            for j in self.net.in_neighbours(agentIndex):
+                u += self.rule(self.net.agents[agentIndex], self.net.agents[j])
             return u
         """
         pass
+    
+    def controlProtocolAll(self, X: np.ndarray, t, rows=None) -> np.ndarray:
+        """
+        This function calculates the distributed controller's outputs for
+        all agents at time t at once. Controllers which can calculate them
+        in a vectorized way should override it (see
+        pymas.consensus.ConsensusDcontroller).
+        
+        The default implementation calls controlProtocol() for each agent,
+        which reads the latest states from the agents themselves (so X is
+        not used).
+        
+        Parameters
+        ----------
+        X : The latest states of all agents with shape (numOfAgents, ns).
+                Type: numpy 2D array
+        t : The time for calculating the control outputs
+                Type: float
+        rows : The indices of the agents whose outputs are calculated, e.g.
+                the agents of one worker of pymas.engines.DistributedEngine.
+                The default is None (all agents).
+                Type: numpy 1D array of int
+
+        Returns
+        -------
+        The outputs of distributed controller with shape (numOfAgents, ni),
+        or (len(rows), ni) if rows is given.
+        """
+        if rows is None:
+            rows = range(len(self.net.agents))
+        if self.net.links is not None:
+            # The states are sent once for all agents:
+            states = np.array([agent.stateTrajectHistory[-1] \
+                               for agent in self.net.agents])
+            self.net.links.transmit(t, states)
+        U = np.empty(shape=(len(rows), self.ni))
+        for k, i in enumerate(rows):
+            agent = self.net.agents[i]
+            U[k] = np.reshape(self.controlProtocol(agent.index, t), (self.ni,))
+        return U
+    
+    def inNeighbours(self, agentIndex: int, t):
+        """
+        Returns the in-neighbours of agent agentIndex at time t as a list of
+        (weight, neighbour) pairs, e.g. for rule(agent, neighbour). If the
+        network has a link layer (see pymas.links.LinkLayer), the latest
+        state of each neighbour is the value received over its link and
+        jammed links are left out.
+        """
+        if self.net.links is not None:
+            return self.net.links.neighbours(t, agentIndex)
+        topology = self.net.topology
+        return [(a_ji, self.net.agents[j]) for j, a_ji in \
+                zip(topology.inNeighbours(agentIndex), \
+                    topology.inNeighbourWeights(agentIndex))]
+    
+    def reset(self):
+        """
+        Called by MAS.run() before the first step. Controllers with an
+        internal state (e.g. the last broadcast states of
+        pymas.eventtriggered.EventTriggeredConsensus) should reset it here.
+        """
+        pass
+    
+    def getState(self) -> dict:
+        """
+        Returns the internal state of the controller for a checkpoint (see
+        MAS.checkpoint()). Controllers which keep a state between the steps
+        should override it together with setState().
+        """
+        return {}
+    
+    def setState(self, state: dict):
+        """
+        Restores a state returned by getState(). It is called by
+        MAS.resume() after reset().
+        """
+        pass
+    
+    def hasBulkProtocol(self) -> bool:
+        """
+        Returns True if controlProtocolAll() is overridden, i.e. the
+        controller calculates all outputs from X at once.
+        """
+        return type(self).controlProtocolAll is not \
+            Dcontroller.controlProtocolAll
 
 # %% Handle direct executions
 if __name__ == "__main__":
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""
+Simulation engines used by pymas.mas.MAS.run().
+"""
+
+# %% Imports
+# Local application imports
+from pymas.engines.engine import Engine
+from pymas.engines.agentengine import AgentEngine
+from pymas.engines.monolithic import MonolithicEngine
+from pymas.engines.batch import BatchEngine
+from pymas.engines.lti import LTIEngine
+from pymas.engines.distributed import DistributedEngine
+from pymas.engines.jit import JITEngine
+from pymas.engines.asynchronous import AsyncEngine
+
+# Engines which can be selected by name in MAS.run():
+ENGINES = {
+    "agent": AgentEngine,
+    "monolithic": MonolithicEngine,
+    "batch": BatchEngine,
+    "lti": LTIEngine,
+    "distributed": DistributedEngine,
+    "jit": JITEngine,
+    "async": AsyncEngine,
+}
+
+def getEngine(engine=None) -> Engine:
+    """
+    Returns an Engine instance for 'engine', which can be None (the default
+    AgentEngine), a name from ENGINES or an Engine instance.
+    """
+    if engine is None:
+        return AgentEngine()
+    if isinstance(engine, Engine):
+        return engine
+    if engine in ENGINES:
+        return ENGINES[engine]()
+    raise ValueError("Unknown engine '{}'. Available engines: {}"\
+                     .format(engine, ", ".join(ENGINES)))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the AgentEngine class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+from pymas.engines.engine import Engine
+
+# %% The agent-by-agent engine class
+class AgentEngine(Engine):
+
+    def __init__(self):
+        """
+        The default engine. Every agent is evolved on its own by
+        pymas.agent.Agent.evolve(), i.e. one odeint call per agent per step.
+
+        If the Dcontroller provides controlProtocolAll(), the inputs of all
+        agents are calculated at once at the beginning of each step.
+        Otherwise controlProtocol() is called for each agent and, since
+        agents are evolved one after the other, the control input of an
+        agent is calculated after its preceding agents have already been
+        evolved to t. With faults (MAS(..., faults=...)) the inputs of all
+        agents are also calculated at the beginning of each step. With a
+        link layer (Network(..., links=...)) the states are sent once per
+        step: by controlProtocolAll(), or else when the first agent reads
+        its neighbours (see pymas.links.LinkLayer.received()), which is
+        before any agent is evolved, so the sent states are those at the
+        beginning of the step in both cases.
+
+        """
+        Engine.__init__(self)
+
+    def step(self, t_prev, t):
+        if self.dcontroller.hasBulkProtocol() or self.mas.faults is not None:
+            U = self.inputs(t_prev)
+            for i, agent in enumerate(self.agents):
+                agent.evolve(t, U[i])
+        else:
+            U = np.empty(shape=(self.numOfAgents, self.ni))
+            for i, agent in enumerate(self.agents):
+                u = self.dcontroller.controlProtocol(agent.index, t_prev)
+                agent.evolve(t, u)
+                U[i] = np.reshape(u, (self.ni,))
+        self.U = U
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("agentengine.py is not an executable module!")
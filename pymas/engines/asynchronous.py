@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the AsyncEngine class.
+"""
+
+# %% Imports
+# Standard library imports
+import heapq
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+from pymas.engines.engine import Engine
+from pymas.engines.batch import BatchEngine
+from pymas.integrators import getIntegrator
+
+# The kinds of events (samples are handled before controls at equal times):
+SAMPLE = 0
+CONTROL = 1
+
+def _perAgent(spec, agents, default):
+    # The value of spec (None, a number, a sequence with one value per
+    # agent, or a dict of agent classes) for each agent, where the values
+    # of the other agents are taken from default (one per agent):
+    N = len(agents)
+    if spec is None:
+        return np.array(default, dtype="float")
+    if isinstance(spec, dict):
+        values = np.array(default, dtype="float")
+        for i, agent in enumerate(agents):
+            for cls, value in spec.items():
+                if isinstance(agent, cls):
+                    values[i] = value
+                    break
+        return values
+    values = np.asarray(spec, dtype="float")
+    if values.ndim == 0:
+        return np.full(shape=(N,), fill_value=float(values))
+    if values.shape != (N,):
+        raise ValueError("Expected one value per agent ({}).".format(N))
+    return values
+
+# %% The asynchronous engine class
+class AsyncEngine(Engine):
+
+    def __init__(self, periods=None, control_periods=None, *, offsets=None, \
+                 evolve_points=None, method="odeint", cache=256):
+        """
+        Multi-rate, asynchronous agents. Each agent has its own sampling
+        period, at which it publishes its (measured) state to its
+        neighbours, and its own control period, at which its input is
+        recalculated from the latest published states of its neighbours
+        (sample-and-hold) and then held until its next control time. The
+        next event times of all agents are kept in a priority queue, and
+        only the agents which are due are evolved to the time of an event,
+        so slow agents cost less than fast ones. The agents' trajectories
+        are recorded on their own time grids (their event times).
+
+        The time step of MAS.run() only sets how often the network is
+        updated and the termination criterion and metrics are evaluated
+        (states() returns the latest state of each agent, at its last
+        event). Agents with equal periods are evolved together, as in
+        pymas.engines.BatchEngine (with f_batch() if available). With the
+        default periods (the time step of the run) the engine gives the
+        same results as a synchronous run.
+
+        Example:
+            # Fast followers (0.01 s) and slow leaders (0.1 s, control
+            # every 0.2 s):
+            engine = AsyncEngine(periods={Leader: 0.1, Follower: 0.01},
+                                 control_periods={Leader: 0.2})
+            mas.run(0, 60, 0.1, engine=engine)
+
+        *** The event queue is not checkpointed, and link layers, observers
+        and a pymas.recorder.MemmapRecorder (which assume a common time
+        grid) are not supported. Agent.reserve() is called for the steps of
+        the run, so the buffers of slower agents are over-allocated. ***
+
+        Parameters
+        ----------
+        periods : float, list or dict, optional
+            The sampling periods: one for all agents, one per agent, or a
+            dict {agent class: period}. The default is None (the time step
+            of the run).
+        control_periods : float, list or dict, optional
+            The control periods (as periods). The default is None (the
+            sampling periods).
+        offsets : float, list or dict, optional and Keyword-only argument
+            The time of the first event of each agent after the start of
+            the run (as periods), e.g. to desynchronize agents with equal
+            periods. Before its first control event, the input of an agent
+            is zero. The default is None (0).
+        evolve_points : int, optional and Keyword-only argument
+            Number of points between two events of an agent (as in Agent).
+            The default is the evolve_points of the first agent.
+        method : str, optional and Keyword-only argument
+            The integrator (see pymas.integrators). The default is "odeint".
+        cache : int, optional and Keyword-only argument
+            The number of groups of due agents whose batched dynamics are
+            cached. The default is 256.
+
+        """
+        Engine.__init__(self)
+        self.periods = periods
+        self.control_periods = control_periods
+        self.offsets = offsets
+        self.num_evolve_points = evolve_points
+        self.method = method
+        self.cache = cache
+        self._integrate = getIntegrator(method)
+
+    def start(self, mas, time_list):
+        Engine.start(self, mas, time_list)
+        if mas.network.links is not None:
+            raise ValueError("AsyncEngine does not support link layers.")
+        if mas.observers is not None:
+            raise ValueError("AsyncEngine does not support observers.")
+        if mas.recorder is not None:
+            raise ValueError("AsyncEngine does not support a MemmapRecorder.")
+        if self.num_evolve_points is None:
+            self.points = self.agents[0].num_evolve_points
+        else:
+            self.points = self.num_evolve_points
+        if len(time_list) > 1:
+            step = time_list[1] - time_list[0]
+        else:
+            step = mas.time_step
+        N = self.numOfAgents
+        periods = _perAgent(self.periods, self.agents, np.full(N, step))
+        controls = _perAgent(self.control_periods, self.agents, periods)
+        offsets = _perAgent(self.offsets, self.agents, np.zeros(N))
+        if np.any(periods <= 0) or np.any(controls <= 0):
+            raise ValueError("The periods should be positive.")
+        # One clock per kind of event and (period, offset), which holds the
+        # agents with these event times:
+        self._clocks = []
+        self._heap = []
+        t0 = time_list[0]
+        for kind, values in ((SAMPLE, periods), (CONTROL, controls)):
+            keys = np.stack((values, offsets), axis=1)
+            unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+            for c, (period, offset) in enumerate(unique):
+                agents = np.flatnonzero(inverse.reshape(-1) == c)
+                self._heap.append((t0 + offset, kind, len(self._clocks), 0))
+                self._clocks.append((t0 + offset, period, agents))
+        heapq.heapify(self._heap)
+        # The latest states and their times, the published (held) states
+        # and the held inputs of all agents:
+        self.X = Engine.states(self)
+        self.T = np.array([agent.time[-1] for agent in self.agents], \
+                          dtype="float")
+        self.P = self.X.copy()
+        self.U = np.zeros(shape=(self.numOfAgents, self.ni))
+        if mas.faults is not None:
+            self.commanded = self.U.copy()
+        self._binders = {}
+        self._rows = {}
+
+    def states(self):
+        return self.X
+
+    def step(self, t_prev, t):
+        # New arrays, since the previous ones may be kept (e.g. by
+        # MAS.iter_run()):
+        self.X = self.X.copy()
+        self.U = self.U.copy()
+        if self.commanded is not None:
+            self.commanded = self.commanded.copy()
+        # Handles the events up to t (with a tolerance for the rounding of
+        # the event times):
+        heap = self._heap
+        horizon = t + 1e-9 * max(abs(t), 1.0)
+        while heap and heap[0][0] <= horizon:
+            tau = heap[0][0]
+            same = tau + 1e-9 * max(abs(tau), 1.0)
+            due = {SAMPLE: [], CONTROL: []}
+            while heap and heap[0][0] <= same:
+                _, kind, c, n = heapq.heappop(heap)
+                start, period, agents = self._clocks[c]
+                due[kind].append(agents)
+                heapq.heappush(heap, \
+                               (start + (n + 1) * period, kind, c, n + 1))
+            sampled = self._merge(due[SAMPLE])
+            controlled = self._merge(due[CONTROL])
+            self._advance(np.union1d(sampled, controlled), tau)
+            if sampled.size:
+                self._publish(tau, sampled)
+            if controlled.size:
+                self._control(tau, controlled)
+
+    def _merge(self, arrays):
+        # The union of the agents of some clocks, as a cached array (the
+        # controllers and faults cache their row selections by identity):
+        if not arrays:
+            return np.empty(shape=(0,), dtype="int64")
+        rows = arrays[0] if len(arrays) == 1 else \
+            np.unique(np.concatenate(arrays))
+        key = rows.tobytes()
+        if key not in self._rows:
+            if len(self._rows) >= self.cache:
+                self._rows = {}
+            self._rows[key] = rows
+        return self._rows[key]
+
+    def _binder(self, rows):
+        # A BatchEngine which evaluates the dynamics of the agents in rows:
+        key = rows.tobytes()
+        if key not in self._binders:
+            if len(self._binders) >= self.cache:
+                self._binders = {}
+            binder = BatchEngine(method=self.method)
+            binder.bind([self.agents[i] for i in rows])
+            self._binders[key] = binder
+        return self._binders[key]
+
+    def _advance(self, due, tau):
+        # Evolves the due agents from their last times to tau with their
+        # held inputs. The agents with the same last time are integrated
+        # together:
+        due = due[self.T[due] < tau]
+        if not due.size:
+            return
+        starts, group = np.unique(self.T[due], return_inverse=True)
+        for g, start in enumerate(starts):
+            rows = due[group.reshape(-1) == g]
+            binder = self._binder(rows)
+            t_list = np.linspace(start, tau, self.points)
+            sol = self._integrate(binder._rhs, self.X[rows].reshape(-1), \
+                                  t_list, args=(self.U[rows],))
+            X = sol[1:].reshape(-1, len(rows), self.ns)
+            for k, i in enumerate(rows):
+                self.agents[i].record(t_list[1:], X[:, k], self.U[i])
+            self.X[rows] = X[-1]
+            self.T[rows] = tau
+
+    def _publish(self, tau, rows):
+        # The neighbours see the (measured) states until the next sample:
+        faults = self.mas.faults
+        X = self.X[rows]
+        self.P[rows] = X if faults is None else faults.measure(tau, X, rows)
+
+    def _control(self, tau, rows):
+        dcontroller = self.dcontroller
+        if dcontroller.hasBulkProtocol():
+            U = dcontroller.controlProtocolAll(self.P, tau, rows)
+        else:
+            # Per-agent protocols read the latest states of the agents, so
+            # the last rows of the agents and their in-neighbours
+            # temporarily hold the published states:
+            topology = self.mas.network.topology
+            shown = set(rows.tolist())
+            for i in rows:
+                shown.update(topology.inNeighbours(i).tolist())
+            saved = {}
+            try:
+                for j in shown:
+                    history = self.agents[j].stateTrajectHistory
+                    saved[j] = history[-1].copy()
+                    history[-1] = self.P[j]
+                U = np.array([np.reshape(dcontroller.controlProtocol( \
+                    self.agents[i].index, tau), (self.ni,)) for i in rows])
+            finally:
+                for j, x in saved.items():
+                    self.agents[j].stateTrajectHistory[-1] = x
+        faults = self.mas.faults
+        if faults is not None:
+            self.commanded[rows] = U
+            U = faults.actuate(tau, U, rows)
+        self.U[rows] = U
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("asynchronous.py is not an executable module!")
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the BatchEngine class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+from pymas.engines.monolithic import MonolithicEngine
+
+# %% The batched (vectorized) engine class
+class BatchEngine(MonolithicEngine):
+
+    def __init__(self, mode="step", evolve_points=None, method="odeint"):
+        """
+        A MonolithicEngine which groups the agents by their class and
+        evaluates the dynamics of each group by one f_batch() call on an
+        (N, ns) state array, instead of calling f() once per agent.
+
+        Agents whose class does not implement f_batch(), or overrides f()
+        without it (see pymas.agent.Agent.batchDynamics()), are still
+        evaluated one by one with f(), so the engine also works for mixed
+        networks.
+
+        *** All agents of a class are evaluated with the f_batch() of the
+        first agent of that class, so they should share their parameters. ***
+
+        Parameters
+        ----------
+        See pymas.engines.MonolithicEngine.
+
+        """
+        MonolithicEngine.__init__(self, mode, evolve_points, method)
+
+    def start(self, mas, time_list):
+        self.bind(mas.network.agents)
+        MonolithicEngine.start(self, mas, time_list)
+
+    def bind(self, agents):
+        """
+        Groups 'agents' by their class for _rhs(). It is called by start()
+        and by the workers of pymas.engines.DistributedEngine, which
+        evaluate the dynamics of a subset of the agents.
+        """
+        self.agents = agents
+        self.numOfAgents = len(agents)
+        self.ns = agents[0].ns
+        groups = {}
+        self._others = []
+        for i, agent in enumerate(agents):
+            if agent.batchDynamics() is None:
+                self._others.append(i)
+            else:
+                groups.setdefault(type(agent), []).append(i)
+        self._groups = []
+        for indices in groups.values():
+            self._groups.append((agents[indices[0]], self._indexer(indices)))
+
+    @staticmethod
+    def _indexer(indices):
+        # A slice avoids copies when the group is a contiguous range:
+        if indices == list(range(indices[0], indices[-1] + 1)):
+            return slice(indices[0], indices[-1] + 1)
+        return np.array(indices)
+
+    def _rhs(self, x, t, U):
+        X = x.reshape(self.numOfAgents, self.ns)
+        dX = np.empty_like(X)
+        for agent, idx in self._groups:
+            dX[idx] = agent.f_batch(t, X[idx], U[idx])
+        for i in self._others:
+            dX[i] = np.reshape(self.agents[i].f(X[i], t, U[i]), (self.ns,))
+        return dX.reshape(-1)
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("batch.py is not an executable module!")
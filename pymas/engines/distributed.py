@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the DistributedEngine class.
+"""
+
+# %% Imports
+# Standard library imports
+import queue
+import traceback
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from threading import BrokenBarrierError
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+# Local application imports
+from pymas.engines.engine import Engine
+from pymas.engines.batch import BatchEngine
+from pymas.trajectory import TrajectoryBuffer
+
+# %% Partitioning
+def partition(A, parts: int):
+    """
+    Splits the agents of a network with adjacency matrix A into 'parts'
+    groups of (almost) equal size with few edges between the groups. The
+    agents are ordered by the reverse Cuthill-McKee algorithm, which places
+    connected agents close to each other (it minimizes the bandwidth of A),
+    and the ordering is cut into contiguous chunks.
+
+    Parameters
+    ----------
+    A : numpy 2D array or scipy sparse matrix
+        The adjacency matrix.
+    parts : int
+        The number of groups.
+
+    Returns
+    -------
+    A list of sorted numpy arrays with the agent indices of each group.
+
+    """
+    A = sp.csr_matrix(A)
+    pattern = (abs(A) + abs(A.T)).tocsr()
+    order = reverse_cuthill_mckee(pattern, symmetric_mode=True)
+    return [np.sort(chunk) for chunk in np.array_split(order, parts)]
+
+def cutEdges(A, groups) -> int:
+    """
+    Returns the number of edges of A between different groups.
+    """
+    A = sp.coo_matrix(A)
+    label = np.empty(shape=(A.shape[0],), dtype="int64")
+    for k, rows in enumerate(groups):
+        label[rows] = k
+    offDiagonal = A.row != A.col
+    return int(np.count_nonzero((label[A.row] != label[A.col]) & \
+                                offDiagonal & (A.data != 0)))
+
+# %% Shared memory helpers
+def _sharedArray(shape):
+    block = shared_memory.SharedMemory(create=True, \
+                                       size=max(int(np.prod(shape)) * 8, 1))
+    return block, np.ndarray(shape, dtype="float", buffer=block.buf)
+
+def _attach(spec):
+    blocks, arrays = [], []
+    for name, shape in spec:
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        arrays.append(np.ndarray(shape, dtype="float", buffer=block.buf))
+    return blocks, arrays
+
+# %% The worker process
+def _worker(mas, spec, rows, time_list, points, method, barrier, errors):
+    # Evolves the agents in 'rows' over time_list. In step k the states of
+    # step k-1 are read from segments[(k-1) % 2] (the other workers only
+    # write segments[k % 2] in step k), and one barrier per step keeps the
+    # workers and the engine in the parent process in lockstep.
+    blocks = []
+    try:
+        blocks, (X0, segments, inputs, commanded) = _attach(spec)
+        agents = mas.network.agents
+        dcontroller = mas.dcontroller
+        faults = mas.faults
+        bulk = dcontroller.hasBulkProtocol()
+        if not bulk:
+            # Per-agent protocols read the latest states of the agents
+            # themselves, so the own agents and their in-neighbours (the
+            # halo, in any mode of the network) are updated from the shared
+            # states in each step:
+            halo = set(rows.tolist())
+            for topology in mas.network.topologies():
+                for i in rows:
+                    halo.update(topology.inNeighbours(i).tolist())
+            halo = np.array(sorted(halo), dtype="int64")
+            # Private buffers, so the (e.g. memory-mapped) trajectories of
+            # the parent process are not written:
+            for j in halo:
+                agent = agents[j]
+                agent.setTrajectoryBuffers(TrajectoryBuffer(), \
+                                           TrajectoryBuffer(agent.ns), \
+                                           TrajectoryBuffer(agent.ni))
+        local = BatchEngine(method=method)
+        local.bind([agents[i] for i in rows])
+        ns = local.ns
+        for k in range(1, len(time_list)):
+            X = X0 if k == 1 else segments[(k - 1) % 2, -1]
+            # The same (deterministic) switching as in the parent process:
+            mas.network.update(time_list[k-1])
+            # The controllers use the measured states:
+            Xm = X if faults is None else faults.measure(time_list[k-1], X)
+            if bulk:
+                U = dcontroller.controlProtocolAll(Xm, time_list[k-1], rows)
+            else:
+                for j in halo:
+                    agents[j].time = time_list[k-1]
+                    agents[j].stateTrajectHistory = Xm[j:j+1]
+                U = dcontroller.controlProtocolAll(None, time_list[k-1], rows)
+            if faults is not None:
+                # The inputs before the actuator faults (see
+                # pymas.observers):
+                commanded[k % 2][rows] = U
+                U = faults.actuate(time_list[k-1], U, rows)
+            t_list = np.linspace(time_list[k-1], time_list[k], points)
+            sol = local._integrate(local._rhs, X[rows].reshape(-1), t_list, \
+                                   args=(U,))
+            segments[k % 2][:, rows] = sol[1:].reshape(-1, len(rows), ns)
+            inputs[k % 2][rows] = U
+            barrier.wait()
+    except BrokenBarrierError:
+        pass # The run was stopped (or another worker failed)
+    except Exception:
+        errors.put(traceback.format_exc())
+        barrier.abort()
+    finally:
+        for block in blocks:
+            block.close()
+
+# %% The distributed engine class
+class DistributedEngine(Engine):
+
+    def __init__(self, workers=2, *, groups=None, evolve_points=None, \
+                 method="rk4"):
+        """
+        Partitions the network and evolves each part of the agents in its
+        own worker process (see partition()). The states are exchanged
+        through shared memory: in each step a worker writes the states of
+        its own agents and only reads the states of the agents which its
+        agents depend on (its boundary/halo agents) when the inputs are
+        calculated. The process in which MAS.run() is called records the
+        trajectories as with the other engines.
+
+        With the fixed-step "rk4" method, the results are bit-for-bit the
+        same as with BatchEngine(method="rk4") (the integration of each
+        agent only depends on its own states and inputs, and the inputs of
+        a subset of the agents are calculated with the same arithmetic,
+        see Dcontroller.controlProtocolAll()).
+
+        *** The workers are started with the "fork" method where it is
+        available, so they inherit the agents and the Dcontroller. Otherwise
+        these are pickled and must be picklable. ***
+
+        Parameters
+        ----------
+        workers : int, optional
+            The number of worker processes (and parts). The default is 2.
+        groups : list of numpy 1D arrays, optional and Keyword-only argument
+            The agent indices of each worker, instead of partition(). The
+            default is None.
+        evolve_points : int, optional and Keyword-only argument
+            Number of points in each step (as in Agent). The default is the
+            evolve_points of the first agent.
+        method : str, optional and Keyword-only argument
+            The integrator of the workers (see pymas.integrators). The
+            default is "rk4".
+
+        """
+        Engine.__init__(self)
+        self.workers = max(int(workers), 1)
+        self.groups = groups
+        self.num_evolve_points = evolve_points
+        self.method = method
+        self._processes = []
+        self._blocks = []
+        self._barrier = None
+
+    def start(self, mas, time_list):
+        Engine.start(self, mas, time_list)
+        if self.num_evolve_points is None:
+            self.points = self.agents[0].num_evolve_points
+        else:
+            self.points = self.num_evolve_points
+        self._groups = self.groups
+        if self._groups is None:
+            parts = min(self.workers, self.numOfAgents)
+            self._groups = partition(mas.network.topology.laplacian(), parts)
+        self.X = Engine.states(self)
+        blockX0, X0 = _sharedArray(self.X.shape)
+        blockSegments, self._segments = _sharedArray( \
+            (2, self.points - 1, self.numOfAgents, self.ns))
+        blockInputs, self._inputs = _sharedArray( \
+            (2, self.numOfAgents, self.ni))
+        blockCommanded, self._commanded = _sharedArray(self._inputs.shape)
+        X0[...] = self.X
+        self._blocks = [blockX0, blockSegments, blockInputs, blockCommanded]
+        spec = [(block.name, array.shape) for block, array in \
+                zip(self._blocks, (X0, self._segments, self._inputs, \
+                                   self._commanded))]
+        if "fork" in mp.get_all_start_methods():
+            context = mp.get_context("fork")
+        else:
+            context = mp.get_context()
+        self._barrier = context.Barrier(len(self._groups) + 1)
+        self._errors = context.Queue()
+        self._processes = [context.Process(target=_worker, daemon=True, \
+                               args=(mas, spec, rows, time_list, \
+                                     self.points, self.method, \
+                                     self._barrier, self._errors)) \
+                           for rows in self._groups]
+        for process in self._processes:
+            process.start()
+        self._k = 0
+
+    def states(self):
+        return self.X
+
+    def step(self, t_prev, t):
+        try:
+            self._barrier.wait()
+        except BrokenBarrierError:
+            try:
+                message = self._errors.get(timeout=1)
+            except queue.Empty:
+                message = "A worker was stopped."
+            raise RuntimeError("A worker of the DistributedEngine failed:\n" \
+                               + message)
+        self._k += 1
+        X = self._segments[self._k % 2].copy()
+        self.U = self._inputs[self._k % 2].copy()
+        if self.mas.faults is not None:
+            self.commanded = self._commanded[self._k % 2].copy()
+        self.X = X[-1]
+        t_list = np.linspace(t_prev, t, self.points)[1:]
+        self.record(t_list, X, self.U)
+
+    def stop(self):
+        # Releases the workers (e.g. when the run is stopped early):
+        if self._barrier is not None:
+            self._barrier.abort()
+        for process in self._processes:
+            process.join()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._processes = []
+        self._blocks = []
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("distributed.py is not an executable module!")
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the Engine class.
+"""
+
+# %% Imports
+# Standard library imports
+from abc import ABC, abstractmethod
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+
+# %% The simulation engine class
+class Engine(ABC):
+
+    def __init__(self):
+        """
+        An engine advances all agents of a MAS by one time step. MAS.run()
+        builds the time list and calls start(), step() for every time step
+        and stop() at the end.
+
+        NOTE: Agents are assumed to be homogeneous in dynamics and I/O numbers.
+
+        """
+        self.mas = None
+        self.agents = None
+        self.dcontroller = None
+        # The inputs applied in the last step (numOfAgents, ni):
+        self.U = None
+        # The inputs calculated by the Dcontroller in the last step, before
+        # the actuator faults (None without faults, i.e. the same as U):
+        self.commanded = None
+
+    def start(self, mas, time_list: np.ndarray):
+        """
+        Prepares the engine for a run over time_list.
+
+        Parameters
+        ----------
+        mas : pymas.mas.MAS
+            The MAS instance which is simulated.
+        time_list : numpy 1D array
+            The time points of the simulation (including the start time).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.mas = mas
+        self.agents = mas.network.agents
+        self.dcontroller = mas.dcontroller
+        self.numOfAgents = len(self.agents)
+        self.ns = self.agents[0].ns
+        self.ni = self.agents[0].ni
+        self.commanded = None
+
+    @abstractmethod
+    def step(self, t_prev: float, t: float):
+        """
+        Evolves all agents from t_prev to t. The control inputs are
+        calculated at t_prev and held constant over the step.
+        """
+        pass
+
+    def stop(self):
+        """
+        Called after the last step.
+        """
+        pass
+
+    def states(self) -> np.ndarray:
+        """
+        Returns the latest states of all agents stacked in an array with
+        shape (numOfAgents, ns).
+        """
+        X = np.empty(shape=(self.numOfAgents, self.ns))
+        for i, agent in enumerate(self.agents):
+            X[i] = agent.stateTrajectHistory[-1]
+        return X
+
+    def inputs(self, t: float, X: np.ndarray=None) -> np.ndarray:
+        """
+        Returns the control inputs of all agents at time t stacked in an
+        array with shape (numOfAgents, ni). They are calculated by
+        Dcontroller.controlProtocolAll() from the stacked states X (the
+        latest states of the agents if X is None).
+
+        If the MAS has faults (see pymas.faults.FaultInjector), the
+        Dcontroller uses the measured states and the actuator faults are
+        applied to its inputs.
+        """
+        faults = self.mas.faults
+        if faults is None:
+            if X is None and self.dcontroller.hasBulkProtocol():
+                X = self.states()
+            return self.dcontroller.controlProtocolAll(X, t)
+        if X is None:
+            X = self.states()
+        Xm = faults.measure(t, X)
+        if self.dcontroller.hasBulkProtocol():
+            U = self.dcontroller.controlProtocolAll(Xm, t)
+        elif Xm is X:
+            U = self.dcontroller.controlProtocolAll(None, t)
+        else:
+            # Per-agent protocols read the latest states of the agents, so
+            # the last rows of the faulty agents temporarily hold the
+            # measured states:
+            faulty = np.flatnonzero(np.any(Xm != X, axis=1))
+            try:
+                for i in faulty:
+                    self.agents[i].stateTrajectHistory[-1] = Xm[i]
+                U = self.dcontroller.controlProtocolAll(None, t)
+            finally:
+                for i in faulty:
+                    self.agents[i].stateTrajectHistory[-1] = X[i]
+        self.commanded = U
+        return faults.actuate(t, U)
+
+    def record(self, t_list: np.ndarray, X: np.ndarray, U: np.ndarray):
+        """
+        Appends a stacked segment to the trajectories of the agents.
+
+        Parameters
+        ----------
+        t_list : numpy 1D array
+            The new time points (without the current time).
+        X : numpy 3D array
+            The states with shape (len(t_list), numOfAgents, ns).
+        U : numpy 2D array
+            The inputs applied over the segment with shape (numOfAgents, ni).
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.mas.recorder is not None and self.agents[0].recording is None:
+            # One block write for all agents:
+            self.mas.recorder.record(t_list, X, U)
+            return
+        for i, agent in enumerate(self.agents):
+            agent.record(t_list, X[:, i, :], U[i])
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("engine.py is not an executable module!")
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the JITEngine class.
+"""
+
+# %% Imports
+# Standard library imports
+from functools import lru_cache
+
+# Third party imports
+import numpy as np
+# Numba is optional (the kernels then run as plain NumPy code). It is only
+# imported when a JITEngine starts (see _numba()), so importing pymas does
+# not load it.
+
+# Local application imports
+from pymas.engines.engine import Engine
+from pymas.consensus import ConsensusDcontroller
+
+# %% Kernels
+# The kernels only use NumPy array operations and loops, so they can be
+# compiled by numba.njit and also run unchanged in Python.
+def rk4Segment(kernel, params, t_list, X, U, substeps, out):
+    # Fixed-step RK4 from X at t_list[0]; out[k-1] is the state at t_list[k]
+    # (the same arithmetic as pymas.integrators.rk4):
+    y = X.copy()
+    for k in range(1, t_list.shape[0]):
+        h = (t_list[k] - t_list[k-1]) / substeps
+        t = t_list[k-1]
+        for _ in range(substeps):
+            k1 = kernel(t, y, U, params)
+            k2 = kernel(t + h / 2, y + h / 2 * k1, U, params)
+            k3 = kernel(t + h / 2, y + h / 2 * k2, U, params)
+            k4 = kernel(t + h, y + h * k3, U, params)
+            y = y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+            t = t + h
+        out[k-1] = y
+
+def dopri5Segment(kernel, params, t_list, X, U, substeps, out):
+    # Fixed-step Dormand-Prince (see pymas.integrators.dopri5):
+    y = X.copy()
+    for k in range(1, t_list.shape[0]):
+        h = (t_list[k] - t_list[k-1]) / substeps
+        t = t_list[k-1]
+        for _ in range(substeps):
+            k1 = kernel(t, y, U, params)
+            k2 = kernel(t + h / 5, y + h * (k1 / 5), U, params)
+            k3 = kernel(t + h * 3 / 10, y + h * (3 / 40 * k1 + 9 / 40 * k2), \
+                        U, params)
+            k4 = kernel(t + h * 4 / 5, y + h * (44 / 45 * k1 - 56 / 15 * k2 + \
+                        32 / 9 * k3), U, params)
+            k5 = kernel(t + h * 8 / 9, y + h * (19372 / 6561 * k1 - \
+                        25360 / 2187 * k2 + 64448 / 6561 * k3 - \
+                        212 / 729 * k4), U, params)
+            k6 = kernel(t + h, y + h * (9017 / 3168 * k1 - 355 / 33 * k2 + \
+                        46732 / 5247 * k3 + 49 / 176 * k4 - \
+                        5103 / 18656 * k5), U, params)
+            y = y + h * (35 / 384 * k1 + 500 / 1113 * k3 + 125 / 192 * k4 - \
+                         2187 / 6784 * k5 + 11 / 84 * k6)
+            t = t + h
+        out[k-1] = y
+
+def consensusKernel(indptr, indices, data, X, KT):
+    # u = -(L kron K) x for a CSR Laplacian L and KT = K^T:
+    N, ns = X.shape
+    Z = np.zeros((N, ns))
+    for i in range(N):
+        for k in range(indptr[i], indptr[i+1]):
+            j = indices[k]
+            w = data[k]
+            for m in range(ns):
+                Z[i, m] -= w * X[j, m]
+    return Z @ KT
+
+# Fixed-step integrators which can be selected by name in JITEngine:
+SEGMENTS = {
+    "rk4": rk4Segment,
+    "dopri5": dopri5Segment,
+}
+
+# The compiled functions (one compilation per function and process):
+_compiled = {}
+
+@lru_cache(maxsize=None)
+def _numba():
+    # The numba module, or None if it is not installed:
+    try:
+        import numba
+    except ImportError:
+        return None
+    return numba
+
+def jit(function):
+    """
+    Returns function compiled by numba.njit, or function itself if Numba is
+    not installed.
+    """
+    numba = _numba()
+    if numba is None:
+        return function
+    if function not in _compiled:
+        _compiled[function] = numba.njit(function)
+    return _compiled[function]
+
+# %% The compiled engine class
+class JITEngine(Engine):
+
+    def __init__(self, method="rk4", evolve_points=None, substeps=1):
+        """
+        Integrates the stacked state (numOfAgents, ns) of the whole network
+        by a fixed-step integrator in one compiled function per step. The
+        dynamics are the f_kernel() of the agents' class (see
+        pymas.agent.Agent), and for a plain ConsensusDcontroller the inputs
+        u = -(L kron K) x are also calculated by a compiled CSR loop.
+
+        The functions are compiled with Numba when it is installed (once per
+        process, on the first step). Otherwise the same kernels run as plain
+        NumPy code, with the same results up to rounding. Agents without
+        f_kernel() are evaluated by their f_batch() without compilation, and
+        agents without either (or whose f() is overridden without them, see
+        pymas.agent.Agent.batchDynamics()) by their f(), one by one.
+
+        *** All agents should be of the same class and share the parameters
+        of the first agent (as in pymas.engines.BatchEngine). ***
+
+        Parameters
+        ----------
+        method : str, optional
+            The fixed-step integrator: "rk4" or "dopri5" (Dormand-Prince
+            without step size control). The default is "rk4".
+        evolve_points : int, optional
+            Number of points in each step (as in Agent). The default is the
+            evolve_points of the first agent.
+        substeps : int, optional
+            Number of integration steps between two evolve points. The
+            default is 1.
+
+        """
+        Engine.__init__(self)
+        if method not in SEGMENTS:
+            raise ValueError("Unknown integration method '{}'. Available " \
+                             "methods: {}".format(method, ", ".join(SEGMENTS)))
+        self.method = method
+        self.num_evolve_points = evolve_points
+        self.substeps = int(substeps)
+
+    @staticmethod
+    def isCompiled() -> bool:
+        """
+        Returns True if the kernels are compiled (i.e. Numba is installed).
+        """
+        return _numba() is not None
+
+    def start(self, mas, time_list):
+        Engine.start(self, mas, time_list)
+        agent = self.agents[0]
+        if any(type(other) is not type(agent) for other in self.agents):
+            raise ValueError("JITEngine needs agents of one class.")
+        if self.num_evolve_points is None:
+            self.points = agent.num_evolve_points
+        else:
+            self.points = self.num_evolve_points
+        kernel = agent.batchDynamics("f_kernel")
+        batch = agent.batchDynamics("f_batch")
+        if kernel is not None:
+            self._kernel = jit(kernel)
+            self._segment = jit(SEGMENTS[self.method])
+            self._params = tuple(agent.kernelParams())
+        elif batch is not None:
+            self._kernel = lambda t, X, U, params: batch(t, X, U)
+            self._segment = SEGMENTS[self.method]
+            self._params = ()
+        else:
+            self._kernel = self._perAgent
+            self._segment = SEGMENTS[self.method]
+            self._params = ()
+        # The compiled consensus protocol replaces the sparse product only
+        # if it is compiled, and not with faults or links (see
+        # Engine.inputs()):
+        self._consensus = None
+        if _numba() is not None and \
+                type(self.dcontroller) is ConsensusDcontroller and \
+                mas.faults is None and mas.network.links is None:
+            self._consensus = jit(consensusKernel)
+            self._KT = np.ascontiguousarray(self.dcontroller.K.T)
+        self.X = Engine.states(self)
+
+    def _perAgent(self, t, X, U, params):
+        # The dynamics of agents without batched dynamics:
+        return np.array([np.reshape(agent.f(X[i], t, U[i]), (self.ns,)) \
+                         for i, agent in enumerate(self.agents)])
+
+    def _integrateSegment(self, t_list, U, out):
+        # Integrates the stacked states over t_list into out (it is timed as
+        # the "integrate" phase by pymas.profiler.Profiler):
+        self._segment(self._kernel, self._params, t_list, self.X, U, \
+                      self.substeps, out)
+
+    def states(self):
+        return self.X
+
+    def inputs(self, t, X=None):
+        if self._consensus is None:
+            return Engine.inputs(self, t, X)
+        if X is None:
+            X = self.X
+        L = self.dcontroller.laplacian()
+        return self._consensus(L.indptr, L.indices, L.data, X, self._KT)
+
+    def step(self, t_prev, t):
+        U = np.ascontiguousarray(self.inputs(t_prev, self.X), dtype="float")
+        t_list = np.linspace(t_prev, t, self.points)
+        X = np.empty(shape=(self.points - 1, self.numOfAgents, self.ns))
+        self._integrateSegment(t_list, U, X)
+        self.X = X[-1].copy()
+        self.U = U
+        self.record(t_list[1:], X, U)
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("jit.py is not an executable module!")
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the LTIEngine class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import expm
+from scipy.sparse.linalg import expm_multiply
+
+# Local application imports
+from pymas.engines.engine import Engine
+from pymas.ltiagent import LTIAgent
+from pymas.consensus import ConsensusDcontroller
+
+# %% The exact-discretization engine class
+class LTIEngine(Engine):
+
+    def __init__(self, closed_loop=False, evolve_points=None, \
+                 dense_limit=2000):
+        """
+        Evolves pymas.ltiagent.LTIAgent agents exactly under piecewise
+        constant input:
+            x(t+h) = Phi x(t) + Gamma u(t)
+        The (Phi, Gamma) matrices are computed once per time step and each
+        step is a batched matrix multiplication over all agents.
+
+        Parameters
+        ----------
+        closed_loop : bool, optional
+            If True and the controller is a plain ConsensusDcontroller (not
+            a subclass, e.g. EventTriggeredConsensus), the whole network is
+            evolved with the closed-loop matrix
+                Acl = (I kron A) - (L kron B K)
+            i.e. x(t+h) = expm(Acl h) x(t). The input is then continuous
+            state feedback (as in MonolithicEngine(mode="horizon")) instead
+            of piecewise constant. The default is False.
+        evolve_points : int, optional
+            Number of points in each step (as in Agent). The default is the
+            evolve_points of the first agent. Use 2 to keep only the step
+            endpoints.
+        dense_limit : int, optional
+            In the closed-loop mode, expm(Acl h) is precomputed as a dense
+            matrix if the network has at most dense_limit states in total.
+            Otherwise expm_multiply is applied to the sparse Acl in each
+            step. The default is 2000.
+
+        """
+        Engine.__init__(self)
+        self.closed_loop = closed_loop
+        self.num_evolve_points = evolve_points
+        self.dense_limit = dense_limit
+
+    def start(self, mas, time_list):
+        Engine.start(self, mas, time_list)
+        for agent in self.agents:
+            if not isinstance(agent, LTIAgent):
+                raise TypeError("LTIEngine can only evolve LTIAgent agents.")
+        if self.num_evolve_points is None:
+            self.points = self.agents[0].num_evolve_points
+        else:
+            self.points = self.num_evolve_points
+        # Group the agents which share the same (A, B) matrices:
+        groups = {}
+        for i, agent in enumerate(self.agents):
+            key = (agent.A.tobytes(), agent.B.tobytes())
+            groups.setdefault(key, []).append(i)
+        self._groups = [(self.agents[idx[0]], np.array(idx)) \
+                        for idx in groups.values()]
+        self.X = Engine.states(self)
+        self._cache = {}
+        if self.closed_loop:
+            if type(self.dcontroller) is not ConsensusDcontroller:
+                raise TypeError("The closed-loop mode needs a plain " + \
+                                "ConsensusDcontroller.")
+            if len(self._groups) != 1:
+                raise ValueError("The closed-loop mode needs agents with " + \
+                                 "the same (A, B) matrices.")
+            if self.mas.faults is not None or \
+                    self.mas.network.links is not None:
+                raise ValueError("The closed-loop mode does not support " + \
+                                 "faults or link layers.")
+            self._closedLoops = {}
+
+    def _subSteps(self, h):
+        # The offsets of the points of a step (as np.linspace in Agent.evolve)
+        return np.linspace(0, h, self.points)[1:]
+
+    def _openLoopMatrices(self, h):
+        # For each group: Phi and Gamma for all points of a step, stacked
+        # with shapes (points-1, ns, ns) and (points-1, ns, ni).
+        key = round(float(h), 12)
+        if key not in self._cache:
+            matrices = []
+            for agent, idx in self._groups:
+                zoh = [agent.discretize(tau) for tau in self._subSteps(h)]
+                matrices.append((np.array([z[0] for z in zoh]), \
+                                 np.array([z[1] for z in zoh])))
+            self._cache[key] = matrices
+        return self._cache[key]
+
+    def _closedLoop(self):
+        # The closed-loop matrix and the cache of its transition matrices
+        # for the current Laplacian (one per mode of a switching topology):
+        L = self.dcontroller.laplacian()
+        if id(L) not in self._closedLoops:
+            agent = self.agents[0]
+            Acl = (sp.kron(sp.eye(self.numOfAgents), agent.A) - \
+                   sp.kron(L, agent.B @ self.dcontroller.K)).tocsr()
+            self._closedLoops[id(L)] = (L, Acl, {})
+        return self._closedLoops[id(L)][1:]
+
+    def _closedLoopMatrix(self, Acl, cache, h):
+        # The transition matrix of one sub-step of the closed-loop network:
+        key = round(float(h), 12)
+        if key not in cache:
+            tau = h / (self.points - 1)
+            cache[key] = expm(Acl.toarray() * tau)
+        return cache[key]
+
+    def states(self):
+        return self.X
+
+    def step(self, t_prev, t):
+        U = self.inputs(t_prev, self.X)
+        h = t - t_prev
+        X = np.empty(shape=(self.points - 1, self.numOfAgents, self.ns))
+        if self.closed_loop:
+            x = self.X.reshape(-1)
+            Acl, cache = self._closedLoop()
+            if self.numOfAgents * self.ns <= self.dense_limit:
+                Phi = self._closedLoopMatrix(Acl, cache, h)
+                for j in range(self.points - 1):
+                    x = Phi @ x
+                    X[j] = x.reshape(self.numOfAgents, self.ns)
+            else:
+                sol = expm_multiply(Acl, x, start=0, stop=h, \
+                                    num=self.points, endpoint=True)
+                X[:] = sol[1:].reshape(-1, self.numOfAgents, self.ns)
+        else:
+            for (agent, idx), (Phi, Gamma) in zip(self._groups, \
+                                                  self._openLoopMatrices(h)):
+                X[:, idx] = self.X[idx] @ Phi.transpose(0, 2, 1) + \
+                    U[idx] @ Gamma.transpose(0, 2, 1)
+        self.X = X[-1].copy()
+        self.U = U
+        self.record(np.linspace(t_prev, t, self.points)[1:], X, U)
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("lti.py is not an executable module!")
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the MonolithicEngine class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+from pymas.engines.engine import Engine
+from pymas.integrators import getIntegrator
+
+# %% The whole-network engine class
+class MonolithicEngine(Engine):
+
+    def __init__(self, mode="step", evolve_points=None, method="odeint"):
+        """
+        Stacks the states of all agents into one global state vector and
+        advances the whole network with a single odeint call.
+
+        Parameters
+        ----------
+        mode : str, optional
+            "step": one odeint call per time step. The inputs of all agents
+                are calculated at the beginning of the step and are held
+                constant over the step (as in Agent.evolve()).
+            "horizon": one odeint call for the whole horizon. The
+                Dcontroller is evaluated inside the right-hand side, so the
+                inputs are continuous state feedback instead of piecewise
+                constant.
+                *** The horizon is solved before the first step, at the
+                solver's trial times, so switching topologies, link layers
+                and Dcontrollers with an internal state (see
+                Dcontroller.getState(), e.g.
+                pymas.eventtriggered.EventTriggeredConsensus) are not
+                supported. ***
+            The default is "step".
+        evolve_points : int, optional
+            Number of points in each step (as in Agent). The default is the
+            evolve_points of the first agent.
+        method : str, optional
+            The integrator (see pymas.integrators): "odeint" (adaptive),
+            "rk4" or "dopri5" (fixed step, one step between two evolve
+            points). The default is "odeint".
+
+        """
+        Engine.__init__(self)
+        if mode not in ("step", "horizon"):
+            raise ValueError("mode should be either 'step' or 'horizon'.")
+        self.mode = mode
+        self.num_evolve_points = evolve_points
+        self.method = method
+        self._integrate = getIntegrator(method)
+
+    def start(self, mas, time_list):
+        Engine.start(self, mas, time_list)
+        if self.num_evolve_points is None:
+            self.points = self.agents[0].num_evolve_points
+        else:
+            self.points = self.num_evolve_points
+        self.X = Engine.states(self)
+        self._k = 0
+        if self.mode == "horizon":
+            if mas.network.schedule is not None or \
+                    mas.network.links is not None:
+                raise ValueError("The horizon mode does not support " + \
+                                 "switching topologies or link layers.")
+            if self.dcontroller.getState():
+                raise ValueError("The horizon mode does not support " + \
+                                 "Dcontrollers with an internal state.")
+            self._solveHorizon(time_list)
+
+    def _rhs(self, x, t, U):
+        X = x.reshape(self.numOfAgents, self.ns)
+        dX = np.empty_like(X)
+        for i, agent in enumerate(self.agents):
+            dX[i] = np.reshape(agent.f(X[i], t, U[i]), (self.ns,))
+        return dX.reshape(-1)
+
+    def _feedbackRhs(self, x, t):
+        X = x.reshape(self.numOfAgents, self.ns)
+        if not self.dcontroller.hasBulkProtocol():
+            # Per-agent protocols read the latest states of the agents, so
+            # the last rows of their trajectories temporarily hold the
+            # solver's state.
+            for i, agent in enumerate(self.agents):
+                agent.stateTrajectHistory[-1] = X[i]
+        return self._rhs(x, t, self.inputs(t, X))
+
+    def _solveHorizon(self, time_list):
+        # Same time points as in the step mode:
+        frac = np.linspace(0, 1, self.points)[1:]
+        seg = time_list[:-1, None] + np.diff(time_list)[:, None] * frac
+        seg[:, -1] = time_list[1:]
+        grid = np.concatenate((time_list[:1], seg.reshape(-1)))
+        try:
+            sol = self._integrate(self._feedbackRhs, self.X.reshape(-1), grid)
+        finally:
+            # Restore the latest (actual) states:
+            for i, agent in enumerate(self.agents):
+                agent.stateTrajectHistory[-1] = self.X[i]
+        self._solution = sol.reshape(-1, self.numOfAgents, self.ns)
+        self._grid = grid
+
+    def states(self):
+        return self.X
+
+    def step(self, t_prev, t):
+        U = self.inputs(t_prev, self.X)
+        if self.mode == "horizon":
+            # Record the segment of the horizon solution:
+            n = self.points - 1
+            rows = slice(self._k * n + 1, (self._k + 1) * n + 1)
+            t_list = self._grid[rows]
+            X = self._solution[rows]
+        else:
+            t_list = np.linspace(t_prev, t, self.points)
+            sol = self._integrate(self._rhs, self.X.reshape(-1), t_list, \
+                                  args=(U,))
+            t_list = t_list[1:]
+            X = sol[1:].reshape(-1, self.numOfAgents, self.ns)
+        self._k += 1
+        self.X = X[-1].copy()
+        self.U = U
+        self.record(t_list, X, U)
+
+    def stop(self):
+        self._solution = None
+        self._grid = None
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("monolithic.py is not an executable module!")
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the EventTriggeredConsensus class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+from pymas.consensus import ConsensusDcontroller
+from pymas.network import Network
+
+# %% The event-triggered consensus controller class
+class EventTriggeredConsensus(ConsensusDcontroller):
+
+    def __init__(self, net: Network, K=None, *, sigma=0.5, offset=0.0, \
+                 decay=0.0):
+        """
+        The linear consensus protocol of ConsensusDcontroller with
+        event-triggered communication. Each agent i keeps its last broadcast
+        state xh_i and the controllers only use broadcast states:
+            z_i = sum_j a_ji (xh_j - xh_i),    u_i = K z_i
+        Agent i broadcasts its current state x_i (xh_i = x_i) only when
+            ||x_i - xh_i|| > sigma * ||z_i|| + offset * exp(-decay * t).
+
+        The aggregates z (and the inputs) of all agents are cached. A
+        broadcast of agent j only updates the aggregates of j and of its
+        out-neighbours, so besides checking the trigger conditions, the cost
+        of a step is proportional to the number of events.
+
+        The messages are counted per edge (see transmissionCounts()).
+
+        *** The triggers are checked whenever the inputs are calculated, so
+        this controller should be used with engines which calculate them
+        once per step (not with MonolithicEngine(mode="horizon")). ***
+
+        Parameters
+        ----------
+        net : Network
+            The network instance.
+        K : numpy 2D array, optional
+            The gain matrix with shape (ni, ns). See ConsensusDcontroller.
+        sigma : float, optional and Keyword-only argument
+            The relative threshold of the trigger condition. The default is
+            0.5.
+        offset : float, optional and Keyword-only argument
+            The absolute threshold of the trigger condition (a positive
+            offset excludes infinitely fast triggering). The default is 0.
+        decay : float, optional and Keyword-only argument
+            The decay rate of the absolute threshold. The default is 0 (a
+            constant offset).
+
+        """
+        ConsensusDcontroller.__init__(self, net, K)
+        self.sigma = sigma
+        self.offset = offset
+        self.decay = decay
+        self.reset()
+
+    def reset(self):
+        self._xhat = None
+        self._topology = None
+        self._pastCounts = None # Messages over the edges of past topologies
+        self.steps = 0
+        self.events = 0
+
+    def _start(self, X):
+        # The first states are broadcast by all agents:
+        topology = self.net.topology
+        self._xhat = np.array(X, dtype="float").reshape(-1, self.ns)
+        self.broadcasts = np.ones(shape=(topology.numOfAgents,), dtype="int64")
+        self.edgeTransmissions = np.ones(shape=(topology.numOfEdges,), \
+                                         dtype="int64")
+        self.events = topology.numOfAgents
+        self._aggregate(topology)
+
+    def _aggregate(self, topology):
+        # Recalculates the cached aggregates (e.g. for a new topology):
+        if self._topology is not None:
+            self._pastCounts = self.transmissionCounts()
+            self.edgeTransmissions = np.zeros(shape=(topology.numOfEdges,), \
+                                              dtype="int64")
+        self._topology = topology
+        self._degrees = topology.laplacian().diagonal()
+        self._Z = -(topology.laplacian() @ self._xhat)
+        self._U = self._Z @ self.K.T
+
+    def broadcast(self, j: int, x: np.ndarray):
+        """
+        Agent j broadcasts its state x to its out-neighbours: the cached
+        aggregates and inputs of j and of its out-neighbours are updated.
+        """
+        topology = self._topology
+        delta = x - self._xhat[j]
+        self._xhat[j] = x
+        start, stop = topology.outIndptr[j], topology.outIndptr[j+1]
+        targets = topology.outIndices[start:stop]
+        self._Z[targets] += topology.outWeights[start:stop, None] * delta
+        self._Z[j] -= self._degrees[j] * delta
+        self._U[targets] = self._Z[targets] @ self.K.T
+        self._U[j] = self.K @ self._Z[j]
+        self.edgeTransmissions[start:stop] += 1
+        self.broadcasts[j] += 1
+        self.events += 1
+
+    def threshold(self, t=0.0):
+        """
+        Returns the absolute threshold offset * exp(-decay * t) at time t.
+        """
+        if self.decay == 0:
+            return self.offset
+        return self.offset * np.exp(-self.decay * t)
+
+    def triggered(self, X: np.ndarray, t=0.0) -> np.ndarray:
+        """
+        Returns the indices of the agents whose trigger conditions hold at
+        time t for the states X with shape (numOfAgents, ns).
+        """
+        error = np.linalg.norm(X - self._xhat, axis=1)
+        threshold = self.sigma * np.linalg.norm(self._Z, axis=1) + \
+            self.threshold(t)
+        return np.flatnonzero(error > threshold)
+
+    def controlProtocolAll(self, X: np.ndarray, t, rows=None) -> np.ndarray:
+        """
+        Checks the trigger conditions of all agents with their states X,
+        lets the triggered agents broadcast and returns the (cached) inputs.
+        """
+        X = np.reshape(X, (-1, self.ns))
+        if self._xhat is None:
+            self._start(X)
+        else:
+            if self._topology is not self.net.topology:
+                self._aggregate(self.net.topology)
+            for j in self.triggered(X, t):
+                self.broadcast(j, X[j])
+        self.steps += 1
+        if rows is None:
+            return self._U.copy()
+        return self._U[rows]
+
+    def controlProtocol(self, agentIndex: int, t) -> np.ndarray:
+        # The trigger condition of one agent (the steps are only counted by
+        # controlProtocolAll()):
+        x = self.net.agents[agentIndex].stateTrajectHistory[-1]
+        if self._xhat is None:
+            self._start(np.array([agent.stateTrajectHistory[-1] \
+                                  for agent in self.net.agents]))
+        elif np.linalg.norm(x - self._xhat[agentIndex]) > \
+            self.sigma * np.linalg.norm(self._Z[agentIndex]) + \
+            self.threshold(t):
+            self.broadcast(agentIndex, x)
+        return self._U[agentIndex].copy()
+
+    def getState(self):
+        if self._xhat is None:
+            return {"steps": self.steps, "events": self.events}
+        return {
+            "steps": self.steps,
+            "events": self.events,
+            "xhat": self._xhat.copy(),
+            "Z": self._Z.copy(),
+            "U": self._U.copy(),
+            "topology": self.net.topologyIndex(self._topology),
+            "pastCounts": self._pastCounts,
+            "broadcasts": self.broadcasts.copy(),
+            "edgeTransmissions": self.edgeTransmissions.copy(),
+        }
+
+    def setState(self, state):
+        self.steps = state["steps"]
+        self.events = state["events"]
+        if "xhat" not in state:
+            return
+        # The aggregates are restored, not recalculated, so the rounding is
+        # the same as in an uninterrupted run:
+        self._topology = self.net.topologies()[state["topology"]]
+        self._degrees = self._topology.laplacian().diagonal()
+        self._xhat = state["xhat"].copy()
+        self._Z = state["Z"].copy()
+        self._U = state["U"].copy()
+        self._pastCounts = state["pastCounts"]
+        self.broadcasts = state["broadcasts"].copy()
+        self.edgeTransmissions = state["edgeTransmissions"].copy()
+
+    def transmissionCounts(self):
+        """
+        Returns the number of messages sent over each edge as a sparse
+        matrix C with the layout of the adjacency matrix (C[j, i] is the
+        number of messages from agent j to agent i).
+        """
+        topology = self._topology
+        counts = sp.csr_matrix((self.edgeTransmissions, topology.outIndices, \
+                                topology.outIndptr), \
+                               shape=(topology.numOfAgents,) * 2)
+        if self._pastCounts is not None:
+            counts = counts + self._pastCounts
+        return counts
+
+    def savings(self) -> float:
+        """
+        Returns the fraction of messages which were saved compared with
+        periodic communication (every agent broadcasting in every step).
+        """
+        periodic = self.steps * self.net.topology.numOfAgents
+        if periodic == 0:
+            return 0.0
+        return 1 - self.events / periodic
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("eventtriggered.py is not an executable module!")
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the FaultInjector class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+
+# Codes of the fault kinds in the fault arrays:
+KINDS = {"bias": 0, "drift": 1, "stuck": 2}
+TARGETS = ("actuator", "sensor")
+
+# %% The fault injector class
+class FaultInjector:
+
+    def __init__(self):
+        """
+        Declarative faults of the agents which are applied by the engines
+        to the stacked arrays of all agents, instead of branches in the
+        dynamics of faulty agent classes:
+            actuator faults change the inputs U (numOfAgents, ni) after the
+                Dcontroller has calculated them,
+            sensor faults change the states X (numOfAgents, ns) which the
+                Dcontroller uses (the true states are not changed).
+        The faults are stored as arrays (one row per agent and fault) and
+        are applied with masked NumPy operations, so the dynamics f() or
+        f_batch() stay the same and faulty scenarios run on the same engines
+        as healthy ones.
+
+        Example:
+            faults = FaultInjector()
+            faults.add("actuator", "bias", agents=5, value=0.5, start=10)
+            faults.add("sensor", "stuck", agents=[1, 2], value=0, start=3,
+                       period=2, duty=0.5) # intermittent
+            mas = MAS(net, dcont, faults=faults)
+
+        *** With faults, pymas.engines.AgentEngine calculates the inputs of
+        all agents at the beginning of each step (from the faulty
+        measurements). ***
+
+        Returns
+        -------
+        None.
+
+        """
+        self._faults = {target: [] for target in TARGETS}
+        self._arrays = None
+        self._positions = {}
+
+    def add(self, target: str, kind: str, agents, value, *, start=0.0, \
+            stop=np.inf, period=None, duty=0.5, components=None):
+        """
+        Adds a fault to one or more agents.
+
+        Parameters
+        ----------
+        target : str
+            "actuator" (the inputs) or "sensor" (the measured states).
+        kind : str
+            "bias": value is added,
+            "drift": value * (t - start) is added (value is a rate),
+            "stuck": the signal is replaced by value.
+        agents : int or list of int
+            The indices of the faulty agents.
+        value : float or numpy 1D array
+            The value of the fault (a scalar or one value per component).
+        start : float, optional and Keyword-only argument
+            The time at which the fault starts. The default is 0.
+        stop : float, optional and Keyword-only argument
+            The time at which the fault stops. The default is np.inf.
+        period : float, optional and Keyword-only argument
+            If given, the fault is intermittent: it is active during the
+            first duty * period seconds of every period after start. The
+            default is None.
+        duty : float, optional and Keyword-only argument
+            The active fraction of an intermittent fault. The default is
+            0.5.
+        components : list of int, optional and Keyword-only argument
+            The affected components of the signal. The default is None (all
+            components).
+
+        Returns
+        -------
+        None.
+
+        """
+        if target not in TARGETS:
+            raise ValueError("target should be 'actuator' or 'sensor'.")
+        if kind not in KINDS:
+            raise ValueError("kind should be one of: " + ", ".join(KINDS))
+        for agent in np.atleast_1d(agents):
+            self._faults[target].append((int(agent), KINDS[kind], \
+                float(start), float(stop), \
+                np.inf if period is None else float(period), float(duty), \
+                value, components))
+        self._arrays = None
+
+    def start(self, mas):
+        """
+        Builds the fault arrays for the agents of mas. It is called by
+        MAS.run().
+        """
+        agent = mas.network.agents[0]
+        self._numOfAgents = len(mas.network.agents)
+        widths = {"actuator": agent.ni, "sensor": agent.ns}
+        self._arrays = {}
+        for target, faults in self._faults.items():
+            width = widths[target]
+            F = len(faults)
+            arrays = {
+                "agents": np.array([f[0] for f in faults], dtype="int64"),
+                "kinds": np.array([f[1] for f in faults], dtype="int64"),
+                "starts": np.array([f[2] for f in faults], dtype="float"),
+                "stops": np.array([f[3] for f in faults], dtype="float"),
+                "periods": np.array([f[4] for f in faults], dtype="float"),
+                "duties": np.array([f[5] for f in faults], dtype="float"),
+                "values": np.zeros(shape=(F, width)),
+                "masks": np.ones(shape=(F, width), dtype="bool"),
+            }
+            for k, f in enumerate(faults):
+                arrays["values"][k] = np.broadcast_to( \
+                    np.asarray(f[6], dtype="float").reshape(-1), (width,))
+                if f[7] is not None:
+                    arrays["masks"][k] = False
+                    arrays["masks"][k, f[7]] = True
+            self._arrays[target] = arrays
+        self._positions = {}
+
+    def _active(self, arrays, t):
+        # The faults which are active at time t:
+        phase = t - arrays["starts"]
+        active = (phase >= 0) & (t < arrays["stops"])
+        intermittent = np.isfinite(arrays["periods"])
+        if intermittent.any():
+            periods = arrays["periods"][intermittent]
+            active[intermittent] &= np.mod(phase[intermittent], periods) < \
+                arrays["duties"][intermittent] * periods
+        return active, phase
+
+    def _apply(self, target, t, V, rows=None):
+        # Applies the active faults of target to the stacked signals V. If
+        # rows is given, V only holds the rows of these agents.
+        if self._arrays is None:
+            raise RuntimeError("FaultInjector.start() has not been called.")
+        arrays = self._arrays[target]
+        if arrays["agents"].shape[0] == 0:
+            return V
+        active, phase = self._active(arrays, t)
+        if rows is not None:
+            position = self._position(rows, V.shape[0])[arrays["agents"]]
+            active &= position >= 0
+        else:
+            position = arrays["agents"]
+        if not active.any():
+            return V
+        V = np.array(V, dtype="float")
+        kinds = arrays["kinds"][active]
+        values = arrays["values"][active]
+        masks = arrays["masks"][active]
+        where = position[active]
+        # Additive faults (bias and drift) are summed:
+        offsets = np.where((kinds == KINDS["drift"])[:, None], \
+                           values * phase[active][:, None], values)
+        additive = kinds != KINDS["stuck"]
+        np.add.at(V, where[additive], (offsets * masks)[additive])
+        # Stuck signals replace the (biased) values:
+        stuck = ~additive
+        if stuck.any():
+            rowsStuck = where[stuck]
+            V[rowsStuck] = np.where(masks[stuck], values[stuck], V[rowsStuck])
+        return V
+
+    def _position(self, rows, n):
+        # Maps agent indices to rows of a subset (-1 for other agents):
+        key = id(rows)
+        if key not in self._positions or self._positions[key][0] is not rows:
+            position = np.full(shape=(self._numOfAgents,), fill_value=-1, \
+                               dtype="int64")
+            position[rows] = np.arange(n)
+            self._positions[key] = (rows, position)
+        return self._positions[key][1]
+
+    def actuate(self, t: float, U: np.ndarray, rows=None) -> np.ndarray:
+        """
+        Returns the inputs U (numOfAgents, ni) with the active actuator
+        faults at time t. If rows (agent indices) is given, U only holds the
+        inputs of these agents. U itself is not changed.
+        """
+        return self._apply("actuator", t, U, rows)
+
+    def measure(self, t: float, X: np.ndarray, rows=None) -> np.ndarray:
+        """
+        Returns the measured states, i.e. the states X (numOfAgents, ns)
+        with the active sensor faults at time t. If rows (agent indices) is
+        given, X only holds the states of these agents. X itself is not
+        changed.
+        """
+        return self._apply("sensor", t, X, rows)
+
+    def hasSensorFaults(self) -> bool:
+        return len(self._faults["sensor"]) > 0
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("faults.py is not an executable module!")
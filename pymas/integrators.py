@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fixed-step integrators with the calling convention of scipy.integrate.odeint.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+from scipy.integrate import odeint
+
+# Local application imports
+
+# %% Integrators
+def rk4(f, y0, t_list, args=(), substeps=1):
+    """
+    Integrates dy/dt = f(y, t, *args) by the classical fourth-order
+    Runge-Kutta method with a fixed step. Unlike odeint, the steps do not
+    depend on the solution, so the result for each component only depends
+    on the arithmetic of f for that component (e.g. the same agent gives
+    the same result whether it is integrated alone or in a network).
+
+    Parameters
+    ----------
+    f : callable
+        The right-hand side f(y, t, *args).
+    y0 : numpy 1D array
+        The initial state at t_list[0].
+    t_list : numpy 1D array
+        The time points of the solution.
+    args : tuple, optional
+        Extra arguments of f. The default is ().
+    substeps : int, optional
+        Number of Runge-Kutta steps between two time points. The default
+        is 1.
+
+    Returns
+    -------
+    The solution with shape (len(t_list), len(y0)) as in odeint.
+
+    """
+    y = np.array(y0, dtype="float").reshape(-1)
+    sol = np.empty(shape=(len(t_list), y.shape[0]))
+    sol[0] = y
+    for k in range(1, len(t_list)):
+        h = (t_list[k] - t_list[k-1]) / substeps
+        t = t_list[k-1]
+        for _ in range(substeps):
+            k1 = f(y, t, *args)
+            k2 = f(y + h / 2 * k1, t + h / 2, *args)
+            k3 = f(y + h / 2 * k2, t + h / 2, *args)
+            k4 = f(y + h * k3, t + h, *args)
+            y = y + h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+            t = t + h
+        sol[k] = y
+    return sol
+
+def dopri5(f, y0, t_list, args=(), substeps=1):
+    """
+    Integrates dy/dt = f(y, t, *args) by the fifth-order Dormand-Prince
+    method with a fixed step (the steps are not adapted by the embedded
+    error estimate, so it is deterministic like rk4 with six evaluations
+    of f per step).
+
+    Parameters
+    ----------
+    See rk4().
+
+    Returns
+    -------
+    The solution with shape (len(t_list), len(y0)) as in odeint.
+
+    """
+    y = np.array(y0, dtype="float").reshape(-1)
+    sol = np.empty(shape=(len(t_list), y.shape[0]))
+    sol[0] = y
+    for k in range(1, len(t_list)):
+        h = (t_list[k] - t_list[k-1]) / substeps
+        t = t_list[k-1]
+        for _ in range(substeps):
+            k1 = f(y, t, *args)
+            k2 = f(y + h * (k1 / 5), t + h / 5, *args)
+            k3 = f(y + h * (3 / 40 * k1 + 9 / 40 * k2), t + h * 3 / 10, *args)
+            k4 = f(y + h * (44 / 45 * k1 - 56 / 15 * k2 + 32 / 9 * k3), \
+                   t + h * 4 / 5, *args)
+            k5 = f(y + h * (19372 / 6561 * k1 - 25360 / 2187 * k2 + \
+                            64448 / 6561 * k3 - 212 / 729 * k4), \
+                   t + h * 8 / 9, *args)
+            k6 = f(y + h * (9017 / 3168 * k1 - 355 / 33 * k2 + \
+                            46732 / 5247 * k3 + 49 / 176 * k4 - \
+                            5103 / 18656 * k5), t + h, *args)
+            y = y + h * (35 / 384 * k1 + 500 / 1113 * k3 + 125 / 192 * k4 - \
+                         2187 / 6784 * k5 + 11 / 84 * k6)
+            t = t + h
+        sol[k] = y
+    return sol
+
+# Integrators which can be selected by name in the engines:
+INTEGRATORS = {
+    "odeint": odeint,
+    "rk4": rk4,
+    "dopri5": dopri5,
+}
+
+def getIntegrator(method="odeint"):
+    """
+    Returns the integrator function for 'method' (a name from INTEGRATORS).
+    """
+    if method in INTEGRATORS:
+        return INTEGRATORS[method]
+    raise ValueError("Unknown integration method '{}'. Available methods: {}"\
+                     .format(method, ", ".join(INTEGRATORS)))
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("integrators.py is not an executable module!")
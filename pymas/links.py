@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the LinkLayer class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+from pymas.trajectory import StateRing
+
+# The attack kinds (rows of the per-edge window arrays):
+ATTACKS = ("fdi", "scale", "replay", "jam")
+
+# %% The received neighbour class
+class _Received:
+    # A neighbour as seen by the receiver of a link: its latest state is
+    # the received value, other attributes are the neighbour's.
+
+    def __init__(self, neighbour, value):
+        self._neighbour = neighbour
+        self.stateTrajectHistory = value[None, :]
+
+    def __getattr__(self, name):
+        return getattr(self._neighbour, name)
+
+# %% The link layer class
+class LinkLayer:
+
+    def __init__(self):
+        """
+        The links between the agents of a network, which carry the states
+        the agents send to their out-neighbours. Attacks on selected edges
+        and time windows change the received values:
+            "fdi": false-data injection, value is added,
+            "scale": the value is multiplied by factor,
+            "replay": the value sent delay seconds earlier is received,
+            "jam": nothing is received (the edge is left out).
+        (For an edge with several active attacks: replay, then scale, then
+        fdi.)
+
+        The attacks are compiled into arrays aligned with the edge list of
+        each topology of the network (see pymas.topology.Topology), so a
+        step costs one vectorized operation per attack kind, independent of
+        the number of attacked links. The replayed values are looked up in
+        a ring of the sent states, sized to the longest replay delay.
+
+        Example:
+            links = LinkLayer()
+            links.add("fdi", [(0, 1), (2, 1)], value=0.5, start=5, stop=10)
+            links.add("replay", [(3, 4)], delay=2, start=8)
+            net = Network(Adj, agents, links=links)
+
+        Controllers use the received values in controlProtocolAll() through
+        transmit() (see pymas.consensus.ConsensusDcontroller) and in
+        controlProtocol() through Dcontroller.inNeighbours().
+
+        Returns
+        -------
+        None.
+
+        """
+        self._attacks = []
+        self._compiled = {}
+        self._ring = None
+        self._time = None
+
+    def add(self, kind: str, edges=None, *, value=None, factor=None, \
+            delay=None, start=0.0, stop=np.inf):
+        """
+        Adds an attack on some edges. A later attack of the same kind on the
+        same edge replaces the earlier one.
+
+        Parameters
+        ----------
+        kind : str
+            "fdi", "scale", "replay" or "jam".
+        edges : list of (int, int), optional
+            The (source, target) agent indices of the attacked edges. Pairs
+            which are not edges of a topology are ignored. The default is
+            None (all edges).
+        value : float or numpy array, optional and Keyword-only argument
+            The injected value of "fdi": a scalar, one value per state or
+            one row per edge with shape (len(edges), ns).
+        factor : float, optional and Keyword-only argument
+            The factor of "scale".
+        delay : float, optional and Keyword-only argument
+            The age (in seconds) of the values replayed by "replay".
+        start : float, optional and Keyword-only argument
+            The time at which the attack starts. The default is 0.
+        stop : float, optional and Keyword-only argument
+            The time at which the attack stops. The default is np.inf.
+
+        Returns
+        -------
+        None.
+
+        """
+        if kind not in ATTACKS:
+            raise ValueError("kind should be one of: " + ", ".join(ATTACKS))
+        required = {"fdi": value, "scale": factor, "replay": delay}
+        if kind in required and required[kind] is None:
+            raise ValueError("The '" + kind + "' attack needs a " + \
+                             {"fdi": "value", "scale": "factor", \
+                              "replay": "delay"}[kind] + ".")
+        if edges is not None:
+            edges = np.asarray(edges, dtype="int64").reshape(-1, 2)
+        self._attacks.append((ATTACKS.index(kind), edges, value, factor, \
+                              delay, float(start), float(stop)))
+        self._compiled = {}
+
+    def start(self, mas):
+        """
+        Prepares the link layer for a run. It is called by MAS.run().
+        """
+        self.net = mas.network
+        self.ns = self.net.agents[0].ns
+        self._compiled = {}
+        self._time = None
+        self._step = None
+        self._interval = mas.time_step
+        history = self._history()
+        if history is not None:
+            # One sample per time step, and the first sample is kept:
+            size = int(np.ceil(history / mas.time_step - 1e-9)) + 2
+            self._ring = StateRing(size, len(self.net.agents), self.ns)
+        else:
+            self._ring = None
+
+    def getState(self) -> dict:
+        """
+        Returns the ring of the sent states and the time of the last sample
+        for a checkpoint (see MAS.checkpoint()).
+        """
+        return {"step": self._step, \
+                "ring": None if self._ring is None else self._ring.getState()}
+
+    def setState(self, state: dict):
+        """
+        Restores a state returned by getState(). It is called by
+        MAS.resume() after start().
+        """
+        self._step = state["step"]
+        if state["ring"] is not None:
+            self._ring.setState(state["ring"])
+
+    def _history(self):
+        # The age (in seconds) of the oldest values which are needed, or
+        # None if no values are kept:
+        delays = [a[4] for a in self._attacks if a[4] is not None]
+        return max(delays) if delays else None
+
+    def _compile(self, topology):
+        # The per-edge arrays of the attacks for a topology: start and stop
+        # times per attack kind with shape (len(ATTACKS), numOfEdges), and
+        # the parameters of the edges.
+        E = topology.numOfEdges
+        arrays = {
+            "starts": np.full(shape=(len(ATTACKS), E), fill_value=np.inf),
+            "stops": np.full(shape=(len(ATTACKS), E), fill_value=-np.inf),
+            "values": np.zeros(shape=(E, self.ns)),
+            "factors": np.ones(shape=(E,)),
+            "delays": np.zeros(shape=(E,)),
+        }
+        for kind, edges, value, factor, delay, start, stop in self._attacks:
+            ids, valid = self._edgeIds(topology, edges)
+            arrays["starts"][kind, ids] = start
+            arrays["stops"][kind, ids] = stop
+            if value is not None:
+                value = np.asarray(value, dtype="float")
+                if value.ndim == 2:
+                    value = value[valid]
+                arrays["values"][ids] = value
+            if factor is not None:
+                arrays["factors"][ids] = factor
+            if delay is not None:
+                arrays["delays"][ids] = delay
+        self._compiled[id(topology)] = (topology, arrays)
+        return arrays
+
+    def _edgeIds(self, topology, edges):
+        # The indices of the given edges in the edge list of topology, and
+        # which of the given edges are edges of topology:
+        if edges is None:
+            return np.arange(topology.numOfEdges), \
+                np.ones(shape=(topology.numOfEdges,), dtype="bool")
+        ids = topology.edgeIds(edges[:, 0], edges[:, 1])
+        valid = ids >= 0
+        return ids[valid], valid
+
+    def transmit(self, t: float, X: np.ndarray):
+        """
+        Sends the states X with shape (numOfAgents, ns) over the edges of
+        the current topology at time t.
+
+        Returns
+        -------
+        V : numpy 2D array
+            The received values with shape (numOfEdges, ns), aligned with
+            the edge list of the topology.
+        delivered : numpy 1D array of bool
+            False for the jammed edges.
+
+        """
+        X = np.reshape(X, (-1, self.ns))
+        topology = self.net.topology
+        # The sent states are kept once per time step:
+        newStep = self._step is None or \
+            t >= self._step + self._interval * (1 - 1e-6)
+        if newStep:
+            self._step = t
+            if self._ring is not None:
+                self._ring.push(t, X)
+        if id(topology) in self._compiled:
+            arrays = self._compiled[id(topology)][1]
+        else:
+            arrays = self._compile(topology)
+        sources = topology.edgeSources
+        V = self._send(t, X, topology, arrays, newStep)
+        active = (t >= arrays["starts"]) & (t < arrays["stops"])
+        replay, scale, fdi, jam = (active[ATTACKS.index(kind)] for kind in \
+                                   ("replay", "scale", "fdi", "jam"))
+        if replay.any():
+            V[replay] = self._ring.gather(t - arrays["delays"][replay], \
+                                          sources[replay])
+        if scale.any():
+            V[scale] *= arrays["factors"][scale, None]
+        if fdi.any():
+            V[fdi] += arrays["values"][fdi]
+        delivered = ~jam
+        self._time = t
+        self._topology = topology
+        self._received = (V, delivered)
+        return V, delivered
+
+    def _send(self, t, X, topology, arrays, newStep):
+        # The values which arrive over the edges before the attacks:
+        return X[topology.edgeSources]
+
+    def received(self, t: float, i: int):
+        """
+        Returns the in-neighbours of agent i whose values were delivered at
+        time t, their edge weights and the received values with shape
+        (number of neighbours, ns). The states are sent once per time t
+        (from the latest states of the agents).
+        """
+        topology = self.net.topology
+        if self._time != t or self._topology is not topology:
+            X = np.array([agent.stateTrajectHistory[-1] \
+                          for agent in self.net.agents])
+            self.transmit(t, X)
+        V, delivered = self._received
+        ids = topology.inEdgeIds(i)
+        ids = ids[delivered[ids]]
+        return topology.edgeSources[ids], topology.edgeWeights[ids], V[ids]
+
+    def neighbours(self, t: float, i: int):
+        """
+        Returns the in-neighbours of agent i as (weight, neighbour) pairs,
+        where the latest state of each neighbour is the received value (see
+        Dcontroller.inNeighbours()).
+        """
+        agents = self.net.agents
+        return [(a_ji, _Received(agents[j], v)) \
+                for j, a_ji, v in zip(*self.received(t, i))]
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("links.py is not an executable module!")
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the LTIAgent class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+from scipy.linalg import expm
+
+# Local application imports
+from pymas.agent import Agent
+
+# %% The compiled dynamics
+def ltiKernel(t, X, U, params):
+    # dX/dt = X A^T + U B^T for stacked states (see Agent.f_kernel), with
+    # params = (A^T, B^T):
+    AT, BT = params
+    return X @ AT + U @ BT
+
+# %% The linear time-invariant agent class
+class LTIAgent(Agent):
+
+    def __init__(self, A, B, C=None, D=None, *, tStart=0, \
+                 init_states=None, evolve_points=10, index: int=None):
+        """
+        An agent with linear time-invariant dynamics:
+            dx/dt = A x + B u
+                y = C x + D u
+
+        Since A and B are known, pymas.engines.LTIEngine can evolve these
+        agents exactly (under piecewise constant input) by matrix
+        multiplications instead of numerical integration.
+
+        Parameters
+        ----------
+        A : numpy 2D array
+            State matrix with shape (ns, ns).
+        B : numpy 2D array
+            Input matrix with shape (ns, ni).
+        C : numpy 2D array, optional
+            Output matrix with shape (no, ns). The default is the identity.
+        D : numpy 2D array, optional
+            Feedthrough matrix with shape (no, ni). The default is zero.
+        For the other arguments see pymas.agent.Agent.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.A = np.atleast_2d(np.asarray(A, dtype="float"))
+        ns = self.A.shape[0]
+        self.B = np.asarray(B, dtype="float").reshape(ns, -1)
+        ni = self.B.shape[1]
+        if C is None:
+            C = np.eye(ns)
+        self.C = np.atleast_2d(np.asarray(C, dtype="float"))
+        no = self.C.shape[0]
+        if D is None:
+            D = np.zeros(shape=(no, ni))
+        self.D = np.asarray(D, dtype="float").reshape(no, ni)
+        # Discretized (Phi, Gamma) matrices for each time step:
+        self._zoh = {}
+        Agent.__init__(self, ni, no, ns, tStart=tStart, \
+                       init_states=init_states, evolve_points=evolve_points, \
+                       index=index)
+
+    def f(self, x, t, u):
+        return np.dot(self.A, x) + np.dot(self.B, np.reshape(u, (self.ni,)))
+
+    def f_batch(self, t, X, U):
+        return X @ self.A.T + U @ self.B.T
+
+    f_kernel = staticmethod(ltiKernel)
+
+    def kernelParams(self) -> tuple:
+        # Contiguous transposes, so the compiled products do not copy them:
+        return (np.ascontiguousarray(self.A.T), np.ascontiguousarray(self.B.T))
+
+    def output(self, x, u):
+        return np.dot(self.C, x) + np.dot(self.D, np.reshape(u, (self.ni,)))
+
+    def discretize(self, time_step: float):
+        """
+        Returns the zero-order-hold discretization of the agent for a time
+        step h:
+            x(t+h) = Phi x(t) + Gamma u(t)
+        with Phi = expm(A h) and Gamma = int_0^h expm(A s) ds B. Both are
+        computed by one matrix exponential of the augmented matrix
+        [[A, B], [0, 0]] and are cached for each time step.
+
+        Parameters
+        ----------
+        time_step : float
+            The time step h.
+
+        Returns
+        -------
+        (Phi, Gamma) with shapes (ns, ns) and (ns, ni).
+
+        """
+        # Round the key so that time steps from np.linspace share the cache:
+        key = round(float(time_step), 12)
+        if key not in self._zoh:
+            M = np.zeros(shape=(self.ns + self.ni, self.ns + self.ni))
+            M[:self.ns, :self.ns] = self.A
+            M[:self.ns, self.ns:] = self.B
+            E = expm(M * time_step)
+            self._zoh[key] = (E[:self.ns, :self.ns], E[:self.ns, self.ns:])
+        return self._zoh[key]
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("ltiagent.py is not an executable module!")
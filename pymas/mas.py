@@ -6,19 +6,26 @@ This is the MAS class.
 
 # %% Imports
 # Standard library imports
+import os
+from collections import namedtuple
 
 # Third party imports
 import numpy as np
-import matplotlib.pyplot as plt
 
 # Local application imports
 from pymas.dcontroller import Dcontroller
 from pymas.network import Network
+from pymas.engines import getEngine
+from pymas.checkpoint import Checkpointer
+
+# The state of a MAS after a step, yielded by MAS.iter_run():
+Snapshot = namedtuple("Snapshot", ["step", "time", "states", "inputs"])
 
 # %% The multi-agent system class
 class MAS:
     
-    def __init__(self, network: Network, dcontroller: Dcontroller):
+    def __init__(self, network: Network, dcontroller: Dcontroller, *, \
+                 recorder=None, faults=None, observers=None):
         """
         Parameters
         ----------
@@ -26,20 +33,42 @@ class MAS:
             The network class instance.
         dcontroller : Dcontroller class
             The Dcontroller class instance.
+        recorder : pymas.recorder.MemmapRecorder, optional and Keyword-only
+            If given, the trajectories are recorded to memory-mapped files
+            instead of RAM. The default is None.
+        faults : pymas.faults.FaultInjector, optional and Keyword-only
+            The actuator and sensor faults of the agents. The default is
+            None.
+        observers : pymas.observers.ObserverBank, optional and Keyword-only
+            Residual generators which are updated after every step and
+            detect faults during the run. The default is None.
         """
         self.network = network # contains agents list
         self.dcontroller = dcontroller
+        self.recorder = recorder
+        self.faults = faults
+        self.observers = observers
         
         self.init_time = None
         self.end_time = None
         self.time_step = None
+        self.engine = None
+        self.convergenceTime = None
+        # The progress of the current run for checkpoints:
+        self._run = None
+        self._termination = None
+        self._metrics = None
+        self._checkpointers = {}
         
-    def run(self, init_time=0, end_time=10, time_step=0.1):
+    def run(self, init_time=0, end_time=10, time_step=0.1, engine=None, \
+            recording=None, termination=None, profiler=None, checkpoint=None, \
+            metrics=None):
         """
         Run the simulation.
         This class currently supports homogeneous multi-agent systems.
         
-        *** Do I need to use generator in the main loop of this function? ***
+        *** See iter_run() for a generator which yields the states during
+        the simulation. ***
 
         Parameters
         ----------
@@ -50,40 +79,268 @@ class MAS:
             Final time of simulation in seconds. The default is 10.
         time_step : float, optional
             Time step of simulation in seonds. The default is 0.1.
+        engine : str or pymas.engines.Engine, optional
+            The engine which advances the agents in each time step:
+                "agent": each agent is evolved by its own odeint call.
+                "monolithic": all agents are stacked into one global state
+                    vector and advanced by a single odeint call.
+                "batch": as "monolithic", but agents of the same class are
+                    evaluated together by their f_batch() method.
+                "lti": exact discretization of pymas.ltiagent.LTIAgent
+                    agents (one matrix multiplication per step).
+                "distributed": the agents are partitioned over worker
+                    processes.
+                "jit": compiled fixed-step integration of the stacked
+                    state.
+                "async": agents with their own sampling and control
+                    periods, driven by an event queue (see
+                    pymas.engines.AsyncEngine).
+            An Engine instance can also be passed to set its options, e.g.
+            MonolithicEngine(mode="horizon"). The default is "agent".
+        recording : pymas.recording.RecordingPolicy, optional
+            If given, it is set as the recording policy of all agents, e.g.
+            RecordingPolicy(endpoints=True, every=10) records one sample
+            per 10 steps. The default is None (the agents' own policies).
+        termination : pymas.termination.Termination, optional
+            A criterion which ends the run early once the agents agree,
+            e.g. PairwiseDisagreement(tol=1e-3, dwell=1). The time from
+            which they agree is stored in MAS.convergenceTime. The default
+            is None (the run ends at end_time).
+        profiler : pymas.profiler.Profiler, optional
+            If given, the time of each phase of the run, the evaluations of
+            the dynamics and the recorded bytes are collected (see
+            Profiler.report()). The default is None.
+        checkpoint : pymas.checkpoint.Checkpointer, optional
+            If given, checkpoints of the run are written every
+            checkpoint.every steps and after the last step, from which
+            resume() continues the run. The default is None.
+        metrics : pymas.metrics.Metrics, optional
+            If given, the metrics (disagreement, control energy, ...) are
+            updated after every step (see Metrics.report()), so they do not
+            need the recorded trajectories. The default is None.
 
         Returns
         -------
-        None.
+        The convergence time (None without termination or if the agents did
+        not converge).
+
+        """
+        for _ in self._iterate(init_time, end_time, time_step, engine, \
+                               recording, termination, profiler, checkpoint, \
+                               metrics=metrics):
+            pass
+        return self.convergenceTime
+    
+    def iter_run(self, init_time=0, end_time=10, time_step=0.1, engine=None, \
+                 every=1, recording=None, termination=None, profiler=None, \
+                 checkpoint=None, metrics=None):
+        """
+        Run the simulation as a generator which yields a Snapshot of the
+        MAS after every 'every' steps (and after the last step). Stopping
+        the iteration (e.g. by break) ends the simulation early.
+        
+        Example:
+            for snap in mas.iter_run(0, 15, 0.05, every=10):
+                if np.ptp(snap.states, axis=0).max() < 1e-3:
+                    break
+
+        Parameters
+        ----------
+        init_time, end_time, time_step, engine, recording, termination,
+        profiler, checkpoint, metrics : See run().
+        every : int, optional
+            Number of steps between two snapshots. The default is 1.
+
+        Yields
+        ------
+        Snapshot(step, time, states, inputs) where states has shape
+        (numOfAgents, ns) and inputs (the inputs applied in the last step)
+        has shape (numOfAgents, ni).
 
         """
+        every = max(int(every), 1)
+        for k, t, last in self._iterate(init_time, end_time, time_step, \
+                                        engine, recording, termination, \
+                                        profiler, checkpoint, \
+                                        metrics=metrics):
+            if k % every == 0 or last:
+                yield Snapshot(k, t, self.engine.states(), self.engine.U)
+    
+    def checkpoint(self, path: str):
+        """
+        Writes a checkpoint of the MAS after its latest step to the
+        directory path, e.g. inside the loop of iter_run(). The first
+        checkpoint of a run replaces the files in path, the next ones only
+        add the new trajectory rows (see pymas.checkpoint.Checkpointer). The
+        files are written in the background; the returned
+        concurrent.futures.Future is done when they are complete.
+        """
+        key = os.path.abspath(path)
+        if key not in self._checkpointers:
+            self._checkpointers[key] = Checkpointer(path)
+        return self._checkpointers[key].write(self)
+
+    def resume(self, path: str, engine=None, recording=None, \
+               termination=None, profiler=None, checkpoint=None, \
+               metrics=None):
+        """
+        Continues a run from the latest checkpoint in the directory path
+        (see checkpoint() and run(..., checkpoint=...)) until its end time,
+        with the same results as the uninterrupted run. The MAS should be
+        set up as for the original run (the same agents, network, controller
+        and links, and the same engine, recording policy, termination
+        criterion and metrics), since only their states are restored.
+
+        Parameters
+        ----------
+        path : str
+            The directory of the checkpoint.
+        engine, recording, termination, profiler, checkpoint, metrics :
+            See run().
+            If checkpoint writes to path, its checkpoints continue the
+            loaded one.
+
+        Returns
+        -------
+        The convergence time (see run()).
+
+        """
+        state = Checkpointer.load(path)
+        if checkpoint is not None:
+            if os.path.abspath(checkpoint.path) == os.path.abspath(path):
+                checkpoint.begin(state["sequence"], state["saved"])
+            else:
+                checkpoint.begin()
+        run = state["run"]
+        for _ in self._iterate(run["init_time"], run["end_time"], \
+                               run["time_step"], engine, recording, \
+                               termination, profiler, checkpoint, state, \
+                               metrics):
+            pass
+        return self.convergenceTime
+
+    def _iterate(self, init_time, end_time, time_step, engine, recording, \
+                 termination, profiler=None, checkpoint=None, resume=None, \
+                 metrics=None):
+        # The main loop of run(), iter_run() and resume(). It yields (step,
+        # time, last) after each step. A resumed run (resume is a loaded
+        # checkpoint) starts after the step of the checkpoint.
         # Set internal variables:
         self.init_time = init_time
         self.end_time = end_time
         self.time_step = time_step
+        self.engine = getEngine(engine)
+        self.convergenceTime = None
+        if termination is not None:
+            termination.reset()
+        self._termination = termination
+        self._metrics = metrics
+        self._checkpointers = {}
+        if checkpoint is not None:
+            Checkpointer.check(self)
+            if resume is None:
+                checkpoint.begin()
+            self._checkpointers[os.path.abspath(checkpoint.path)] = checkpoint
         
         numOfIterations = int( (end_time - init_time) // time_step )
         time_list = np.linspace(start=init_time, stop=end_time, \
                                 num=numOfIterations+1, endpoint=True)
-        # Main for loop:
-        for t in time_list[1:]:
-            idx = np.where(time_list == t)
-            t_prev = time_list[int(idx[0])-1]
+        if recording is not None:
             for agent in self.network.agents:
-                agent.evolve(t, self.dcontroller.controlProtocol(agent.index, t_prev))
-
-    # This is a temporary function for debugging
-    def plot(self, agentIndex):
-        plt.plot(self.network.agents[agentIndex].times, \
-                 self.network.agents[agentIndex].stateTrajectHistory.\
-                     reshape(len(self.network.agents[agentIndex].times), ))
-        plt.grid()
-        plt.show()
+                agent.setRecordingPolicy(recording)
+        self.network.reset(init_time)
+        self.dcontroller.reset()
+        if self.faults is not None:
+            self.faults.start(self)
+        if self.network.links is not None:
+            self.network.links.start(self)
+        if self.observers is not None:
+            self.observers.start(self, time_list)
+        if metrics is not None:
+            metrics.start(self, time_list)
+        first = 1
+        self._run = {"init_time": init_time, "end_time": end_time, \
+                     "time_step": time_step, "step": 0, "time": init_time, \
+                     "finished": False, "convergenceTime": None}
+        if resume is not None:
+            if self.recorder is not None:
+                raise ValueError("A MAS with a MemmapRecorder cannot be " \
+                                 "resumed.")
+            first = Checkpointer.restore(self, resume, termination, \
+                                         metrics) + 1
+            self._run.update(resume["run"])
+            self.convergenceTime = resume["run"]["convergenceTime"]
+            if resume["run"]["finished"]:
+                return
+        # Preallocate the trajectory buffers since the horizon is known:
+        if self.recorder is not None:
+            self.recorder.start(self, numOfIterations)
+        for agent in self.network.agents:
+            agent.reserve(numOfIterations - first + 1)
+        # The profiler instruments the instances until the end of the run:
+        if profiler is not None:
+            profiler.start(self, self.engine, termination, metrics)
+        try:
+            self.engine.start(self, time_list[first-1:])
+            try:
+                # Main for loop (the previous time is found by its index):
+                for k in range(first, numOfIterations+1):
+                    self.network.update(time_list[k-1])
+                    self.engine.step(time_list[k-1], time_list[k])
+                    if self.recorder is not None:
+                        self.recorder.step()
+                    X = self.engine.states()
+                    if self.observers is not None:
+                        engine = self.engine
+                        self.observers.update(time_list[k], X, \
+                            engine.U if engine.commanded is None else \
+                                engine.commanded)
+                    if metrics is not None:
+                        metrics.update(time_list[k], X, self.engine.U)
+                    converged = termination is not None and \
+                        termination.update(time_list[k], X)
+                    if converged:
+                        self.convergenceTime = termination.convergenceTime
+                    if profiler is not None:
+                        profiler.step(k, time_list[k])
+                    last = k == numOfIterations or converged
+                    self._run.update(step=k, time=time_list[k], \
+                                     finished=last, \
+                                     convergenceTime=self.convergenceTime)
+                    if checkpoint is not None and checkpoint.due(k, last):
+                        checkpoint.write(self)
+                    yield k, time_list[k], last
+                    if converged:
+                        break
+            finally:
+                self.engine.stop()
+                if self.recorder is not None:
+                    self.recorder.stop()
+        finally:
+            if profiler is not None:
+                profiler.stop()
+            # The checkpoints are complete when the run returns:
+            for writer in self._checkpointers.values():
+                writer.wait()
+
+    # Debugging helpers (see pymas.plotting, which imports matplotlib only
+    # when it is used):
+    def plot(self, agentIndex, **kwargs):
+        self.plotAll(agents=[agentIndex], **kwargs)
     
-    def plotAll(self):
-        for a in self.network.agents:
-            plt.plot(a.time, a.stateTrajectHistory)
-        plt.grid()
-        plt.show()
+    def plotAll(self, agents=None, **kwargs):
+        """
+        Plots the state trajectories of all agents (or of the agents with
+        the given indices), downsampled to the width of the plot (see
+        pymas.plotting.plotAgents()).
+        """
+        from pymas import plotting
+        selected = self.network.agents
+        if agents is not None:
+            selected = [selected[i] for i in agents]
+        kwargs.setdefault("grid", True)
+        plotting.plotAgents(selected, **kwargs)
+        plotting.show()
         
 # %% Handle direct executions
 if __name__ == "__main__":
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the Metrics class.
+"""
+
+# %% Imports
+# Standard library imports
+from abc import ABC, abstractmethod
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+
+# %% The metric class
+class Metric(ABC):
+
+    # The name of the metric in Metrics.report():
+    name = "metric"
+    # True if the value is constant over a step (e.g. a function of the
+    # inputs, which are held), so its integral is exact. Otherwise the
+    # integral is approximated by the trapezoidal rule:
+    held = False
+
+    def __init__(self, *, window=None, components=None):
+        """
+        A quantity of the MAS (a scalar, or one value per agent) which is
+        evaluated on the stacked states and inputs after every step of
+        MAS.run(). Besides the latest value, the base class keeps
+            integral: the integral of the value over the time of the run,
+            mean: the integral divided by the time of the run,
+            minimum, maximum: the running extrema (with the times of the
+                extrema of a scalar metric),
+            window statistics (optional): the mean, minimum and maximum of
+                the values at the last 'window' steps,
+        so the numbers of a report are available without recording the
+        trajectories (see pymas.recording.RecordingPolicy). Each update
+        costs O(numOfAgents * ns).
+
+        Parameters
+        ----------
+        window : int, optional and Keyword-only argument
+            The number of steps of the window statistics. The default is
+            None (no window statistics).
+        components : list of int, optional and Keyword-only argument
+            The state components which are used (e.g. only positions). The
+            default is None (all components).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.window = None if window is None else max(int(window), 1)
+        self.components = components
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the previous run. It is called by Metrics.start().
+        """
+        self.value = None
+        self.integral = None
+        self.minimum = None
+        self.maximum = None
+        self.timeOfMinimum = None
+        self.timeOfMaximum = None
+        self.startTime = None
+        self.time = None
+        self._ring = None
+        self._count = 0
+
+    def _states(self, X):
+        return X if self.components is None else X[:, self.components]
+
+    @abstractmethod
+    def measure(self, t: float, X: np.ndarray, U: np.ndarray):
+        """
+        Returns the value at time t for the states X (numOfAgents, ns) and
+        the inputs U (numOfAgents, ni) of the step which ended at t (None
+        at the start of the run), as a float or a numpy 1D array.
+        """
+        pass
+
+    def start(self, t: float, X: np.ndarray):
+        """
+        Starts the metric at time t with the initial states X. It is called
+        by Metrics.start().
+        """
+        self.reset()
+        self.startTime = t
+        self.time = t
+        if not self.held:
+            self._accept(t, self.measure(t, X, None))
+
+    def update(self, t: float, X: np.ndarray, U: np.ndarray):
+        """
+        Updates the metric with the states X at time t and the inputs U of
+        the step which ended at t. It is called by Metrics.update().
+        """
+        h = t - self.time
+        previous = self.value
+        value = self.measure(t, X, U)
+        if self.held or previous is None:
+            increment = h * value
+        else:
+            increment = h * (np.asarray(previous) + value) / 2
+        if self.integral is None:
+            self.integral = np.zeros_like(np.asarray(value, dtype="float"))
+        self.integral = self.integral + np.nan_to_num(increment)
+        self.time = t
+        self._accept(t, value)
+
+    def _accept(self, t, value):
+        # Updates the extrema and the window with a new value:
+        value = np.asarray(value, dtype="float")
+        self.value = value if value.ndim else float(value)
+        if self.minimum is None:
+            self.minimum = value.copy()
+            self.maximum = value.copy()
+            if not value.ndim:
+                self.timeOfMinimum = self.timeOfMaximum = float(t)
+        else:
+            if not value.ndim:
+                if value < self.minimum:
+                    self.timeOfMinimum = float(t)
+                if value > self.maximum:
+                    self.timeOfMaximum = float(t)
+            # NaN values (e.g. undefined estimates) are ignored:
+            self.minimum = np.fmin(self.minimum, value)
+            self.maximum = np.fmax(self.maximum, value)
+        if self.window is not None:
+            if self._ring is None:
+                self._ring = np.full(shape=(self.window,) + value.shape, \
+                                     fill_value=np.nan)
+            self._ring[self._count % self.window] = value
+        self._count += 1
+
+    def result(self) -> dict:
+        """
+        Returns the values of the metric as a dict (see Metric).
+        """
+        elapsed = None if self.time is None else self.time - self.startTime
+        result = {
+            "value": self.value,
+            "integral": _plain(self.integral),
+            "mean": None if self.integral is None or not elapsed else \
+                _plain(self.integral / elapsed),
+            "minimum": _plain(self.minimum),
+            "maximum": _plain(self.maximum),
+        }
+        if self.timeOfMaximum is not None:
+            result["timeOfMinimum"] = self.timeOfMinimum
+            result["timeOfMaximum"] = self.timeOfMaximum
+        if self._ring is not None:
+            ring = self._ring[:min(self._count, self.window)]
+            result["windowMean"] = _plain(np.nanmean(ring, axis=0))
+            result["windowMinimum"] = _plain(np.nanmin(ring, axis=0))
+            result["windowMaximum"] = _plain(np.nanmax(ring, axis=0))
+        return result
+
+    def getState(self) -> dict:
+        """
+        Returns the state of the metric for a checkpoint (see
+        MAS.checkpoint()).
+        """
+        return {name: value.copy() if isinstance(value, np.ndarray) else \
+                    value for name, value in vars(self).items()}
+
+    def setState(self, state: dict):
+        """
+        Restores a state returned by getState() (after start()).
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+
+def _plain(value):
+    # Scalars are returned as floats:
+    if value is None:
+        return None
+    value = np.asarray(value)
+    return value if value.ndim else float(value)
+
+# %% The disagreement class
+class Disagreement(Metric):
+    """
+    The disagreement of the agents:
+        "norm": ||X - 1 mean(X)||_F, the Euclidean norm of the deviations
+            of all agents from their average (the default),
+        "pairwise": max_k (max_i x_ik - min_i x_ik), as in
+            pymas.termination.PairwiseDisagreement,
+        "average": max_i ||x_i - mean(X)||, as in
+            pymas.termination.AverageDisagreement.
+    For the other parameters see Metric.
+    """
+
+    name = "disagreement"
+    KINDS = ("norm", "pairwise", "average")
+
+    def __init__(self, kind="norm", **kwargs):
+        if kind not in self.KINDS:
+            raise ValueError("kind should be one of: " + ", ".join(self.KINDS))
+        self.kind = kind
+        Metric.__init__(self, **kwargs)
+
+    def measure(self, t, X, U):
+        X = self._states(X)
+        if self.kind == "pairwise":
+            return float(np.max(np.ptp(X, axis=0)))
+        D = X - X.mean(axis=0)
+        squares = np.einsum("ij,ij->i", D, D)
+        if self.kind == "average":
+            return float(np.sqrt(np.max(squares)))
+        return float(np.sqrt(np.sum(squares)))
+
+# %% The average deviation class
+class AverageDeviation(Metric):
+    """
+    The distance of each agent to the average of all agents,
+    ||x_i - mean(X)|| (one value per agent, e.g. to find the agents which
+    lag behind). For the parameters see Metric.
+    """
+
+    name = "deviation"
+
+    def measure(self, t, X, U):
+        X = self._states(X)
+        D = X - X.mean(axis=0)
+        return np.sqrt(np.einsum("ij,ij->i", D, D))
+
+# %% The control energy class
+class ControlEnergy(Metric):
+    """
+    The control effort u_i^T R u_i of each agent, whose integral is the
+    control energy of the agent (exact, since the inputs are held over each
+    step). The result also holds the total energy of all agents.
+
+    Parameters
+    ----------
+    R : numpy 2D array, optional
+        The weight with shape (ni, ni). The default is None (the identity,
+        i.e. ||u_i||^2).
+    For the other parameters see Metric (components are not used).
+    """
+
+    name = "controlEnergy"
+    held = True
+
+    def __init__(self, R=None, **kwargs):
+        if R is not None:
+            R = np.atleast_2d(np.asarray(R, dtype="float"))
+        self.R = R
+        Metric.__init__(self, **kwargs)
+
+    def measure(self, t, X, U):
+        if self.R is None:
+            return np.einsum("ij,ij->i", U, U)
+        return np.einsum("ij,jk,ik->i", U, self.R, U)
+
+    def result(self):
+        result = Metric.result(self)
+        result["total"] = None if self.integral is None else \
+            float(np.sum(self.integral))
+        return result
+
+# %% The convergence rate class
+class ConvergenceRate(Metric):
+    """
+    An estimate of the exponential convergence rate lambda of the
+    disagreement, delta(t) ~ c exp(-lambda t): the slope of a least squares
+    line through log(delta) at the last 'samples' steps (the value), and
+    the average rate -log(delta(t) / delta(t0)) / (t - t0) since the start
+    ("averageRate" in the result). The value is NaN until 'samples' steps
+    have been made.
+
+    Parameters
+    ----------
+    samples : int, optional
+        The number of steps of the estimate. The default is 20.
+    kind : str, optional
+        The disagreement (see Disagreement). The default is "norm".
+    For the other parameters see Metric.
+    """
+
+    name = "convergenceRate"
+
+    def __init__(self, samples=20, kind="norm", **kwargs):
+        self.samples = max(int(samples), 2)
+        self._disagreement = Disagreement(kind, \
+                                          components=kwargs.get("components"))
+        Metric.__init__(self, **kwargs)
+
+    def reset(self):
+        Metric.reset(self)
+        self._times = np.full(shape=(self.samples,), fill_value=np.nan)
+        self._logs = np.full(shape=(self.samples,), fill_value=np.nan)
+        self._n = 0
+        self._first = None
+        self._last = None
+
+    def measure(self, t, X, U):
+        # The logarithm of a vanishing disagreement is bounded:
+        log = np.log(max(self._disagreement.measure(t, X, U), 1e-300))
+        i = self._n % self.samples
+        self._times[i] = t
+        self._logs[i] = log
+        self._n += 1
+        if self._first is None:
+            self._first = (t, log)
+        self._last = (t, log)
+        if self._n < self.samples:
+            return np.nan
+        # The times relative to their mean, for a well-conditioned fit:
+        dt = self._times - self._times.mean()
+        return float(-np.dot(dt, self._logs - self._logs.mean()) / \
+                     np.dot(dt, dt))
+
+    def result(self):
+        result = Metric.result(self)
+        if self._last is not None and self._last[0] > self._first[0]:
+            result["averageRate"] = float(-(self._last[1] - self._first[1]) / \
+                                          (self._last[0] - self._first[0]))
+        else:
+            result["averageRate"] = np.nan
+        return result
+
+# %% The metrics pipeline class
+class Metrics:
+
+    def __init__(self, metrics, *, callback=None, every=1):
+        """
+        The metrics of a run of MAS.run(..., metrics=...), which are
+        updated incrementally after every step on the stacked states and
+        inputs of all agents, e.g. to run without recording the
+        trajectories:
+
+            metrics = Metrics([Disagreement(window=50), ControlEnergy(),
+                               ConvergenceRate(), AverageDeviation()])
+            mas.run(0, 60, 0.05, metrics=metrics,
+                    recording=RecordingPolicy(endpoints=True, window=1))
+            metrics.report()["controlEnergy"]["total"]
+
+        New metrics are subclasses of Metric which implement measure().
+
+        Parameters
+        ----------
+        metrics : dict or list of Metric
+            The metrics (by name, or by their 'name' attributes for a list).
+        callback : callable, optional and Keyword-only argument
+            Called as callback(report) during the run. The default is None.
+        every : int, optional and Keyword-only argument
+            The number of steps between two callbacks. The default is 1.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not isinstance(metrics, dict):
+            named = {}
+            for metric in metrics:
+                if metric.name in named:
+                    raise ValueError("Two metrics are named '{}' (pass a " \
+                                     "dict).".format(metric.name))
+                named[metric.name] = metric
+            metrics = named
+        self.metrics = metrics
+        self.callback = callback
+        self.every = max(int(every), 1)
+        self.steps = 0
+
+    def __getitem__(self, name):
+        return self.metrics[name]
+
+    def start(self, mas, time_list: np.ndarray):
+        """
+        Starts the metrics with the latest states of the agents of mas at
+        the first time of time_list. It is called by MAS.run().
+        """
+        self.steps = 0
+        X0 = np.array([agent.stateTrajectHistory[-1] \
+                       for agent in mas.network.agents], dtype="float")
+        for metric in self.metrics.values():
+            metric.start(time_list[0], X0)
+
+    def update(self, t: float, X: np.ndarray, U: np.ndarray):
+        """
+        Updates the metrics with the states X (numOfAgents, ns) at time t
+        and the inputs U (numOfAgents, ni) of the step which ended at t. It
+        is called by MAS.run() after each step.
+        """
+        for metric in self.metrics.values():
+            metric.update(t, X, U)
+        self.steps += 1
+        if self.callback is not None and self.steps % self.every == 0:
+            self.callback(self.report())
+
+    def report(self) -> dict:
+        """
+        Returns the results of the metrics as {name: Metric.result()}.
+        """
+        return {name: metric.result() for name, metric in self.metrics.items()}
+
+    def getState(self) -> dict:
+        """
+        Returns the state of the metrics for a checkpoint (see
+        MAS.checkpoint()).
+        """
+        return {"steps": self.steps, \
+                "metrics": {name: metric.getState() \
+                            for name, metric in self.metrics.items()}}
+
+    def setState(self, state: dict):
+        """
+        Restores a state returned by getState() (after start()).
+        """
+        self.steps = state["steps"]
+        for name, metric in self.metrics.items():
+            metric.setState(state["metrics"][name])
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("metrics.py is not an executable module!")
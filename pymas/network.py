@@ -9,51 +9,161 @@ This is the Network class.
 from typing import List
 
 # Third party imports
-import numpy as np
+import scipy.sparse as sp
 
 # Local application imports
 from pymas.agent import Agent
+from pymas.topology import Topology
 
 # %% The distributed controller class
 class Network:
     
-    def __init__(self, A: np.ndarray, agents: List[Agent]):
+    def __init__(self, A, agents: List[Agent], *, schedule=None, links=None):
         """
         Parameters
         ----------
-        A : numpy 2D array
-            This is adjacancy matrix.
+        A : numpy 2D array or scipy sparse matrix
+            This is adjacancy matrix. Sparse matrices are stored in CSR
+            format, so large sparse topologies fit in memory.
         agents : List
             A list of agent objects.
+        schedule : pymas.schedule.Schedule, optional and Keyword-only
+            A switching topology (e.g. pymas.schedule.TopologySchedule). A
+            is used until the run starts and the topology of every mode is
+            built once here, so switching during the run only changes
+            Network.topology and Network.A. The default is None (A is
+            fixed).
+        links : pymas.links.LinkLayer, optional and Keyword-only
+            The links which carry the states the agents send to each other
+            (e.g. with attacks on some edges). The default is None (the
+            controllers read the states of the neighbours directly).
         
         *** NOTE: Networks keeps the agent instances in a list so that other
         classes can access them through Network.agents. ***
+        *** NOTE: The neighbours of each agent are precomputed (see
+        pymas.topology.Topology), so use neighbours() and in_neighbours()
+        instead of calling areNeighbours() for all agents. ***
         """
+        if sp.issparse(A):
+            A = sp.csr_matrix(A)
         self.A = A
         if len(agents) >= 2:
             self.agents = agents
         else:
             raise Exception("The number of agents should be more than one.")
+        # Rows and columns of A without an agent are ignored:
+        n = len(agents)
+        self.topology = Topology(A[:n, :n])
+        self.schedule = schedule
+        self.links = links
+        self._mode = None
+        if schedule is not None:
+            self._topologies = [Topology(sp.csr_matrix(M)[:n, :n]) \
+                                for M in schedule.modes]
+        
+    def reset(self, t: float):
+        """
+        Starts the schedule (if any) at time t. It is called by MAS.run().
+        """
+        if self.schedule is not None:
+            self.schedule.reset(t)
+            self._mode = None
+            self.update(t)
+    
+    def update(self, t: float):
+        """
+        Switches to the mode of the schedule at time t (if it has changed).
+        It is called by MAS.run() before every step.
+        """
+        if self.schedule is None:
+            return
+        mode = self.schedule.mode(t)
+        if mode != self._mode:
+            self._mode = mode
+            self.topology = self._topologies[mode]
+            self.A = self.schedule.modes[mode]
+        
+    def topologies(self):
+        """
+        Returns the topologies of all modes of the schedule (or only the
+        current topology without a schedule).
+        """
+        if self.schedule is None:
+            return [self.topology]
+        return self._topologies
+        
+    def topologyIndex(self, topology) -> int:
+        """
+        Returns the index of topology in topologies().
+        """
+        for k, other in enumerate(self.topologies()):
+            if other is topology:
+                return k
+        raise ValueError("The topology does not belong to the network.")
+    
+    def getState(self) -> dict:
+        """
+        Returns the current mode and the state of the schedule for a
+        checkpoint (see MAS.checkpoint()).
+        """
+        if self.schedule is None:
+            return {}
+        return {"mode": self._mode, "schedule": self.schedule.getState()}
+    
+    def setState(self, state: dict):
+        """
+        Restores a state returned by getState(). It is called by
+        MAS.resume() after reset().
+        """
+        if self.schedule is None:
+            return
+        self.schedule.setState(state["schedule"])
+        self._mode = state["mode"]
+        if self._mode is not None:
+            self.topology = self._topologies[self._mode]
+            self.A = self.schedule.modes[self._mode]
         
     def areNeighbours(self, agentIndex1: int, agentIndex2: int) -> bool:
         """
         Checks if two agents are neighbours by their indices.
         NOTE: Indexing of adjacency matrix in this function is assumed to
         start from 0.
-        Note: For now, we assume the graph is bi-directional.
         Note: Rows are "tail" indices and Columns are "head" indices.
         
         *** ORDER IS IMPORTANT FOR UNI-DIRECTIONAL GRAPHS. ***
-        *** WE SHOULD CHECK FOR NON-SYMMETRIC MATRICES, TOO. ***
         """       
         if agentIndex1 != agentIndex2:
-            if self.A[agentIndex1][agentIndex2] != 0:
-                return True
-            # # DEBUG:
-            # else:
-            #     print(self.A[agentIndex1][agentIndex2])
-            #     print(self.A)
+            return self.topology.weight(agentIndex1, agentIndex2) != 0
         return False
+    
+    def neighbours(self, agentIndex: int):
+        """
+        Iterates over the indices of the agents to which 'agentIndex'-th
+        agent sends information (out-neighbours, i.e. A[agentIndex, j] != 0).
+        """
+        return iter(self.topology.outNeighbours(agentIndex).tolist())
+    
+    def in_neighbours(self, agentIndex: int):
+        """
+        Iterates over the indices of the agents from which 'agentIndex'-th
+        agent receives information (in-neighbours, i.e.
+        A[j, agentIndex] != 0). These are the agents used by the
+        distributed control law of 'agentIndex'-th agent.
+        """
+        return iter(self.topology.inNeighbours(agentIndex).tolist())
+    
+    def weight(self, agentIndex1: int, agentIndex2: int) -> float:
+        """
+        Returns the weight of the edge from agentIndex1 to agentIndex2.
+        """
+        return self.topology.weight(agentIndex1, agentIndex2)
+    
+    def laplacian(self):
+        """
+        Returns the (cached) sparse Laplacian matrix L = D - A^T of the
+        network, where D is the diagonal matrix of in-degrees.
+        """
+        return self.topology.laplacian()
         
     def get_data(self): # May be removed in future! Or not now that agents list is here!
         pass
@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the ObserverBank class.
+"""
+
+# %% Imports
+# Standard library imports
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+# Third party imports
+import numpy as np
+from scipy.linalg import expm, solve_discrete_are
+from scipy.signal import place_poles
+
+# Local application imports
+
+# A raised ("detect") or cleared ("clear") alarm of an agent, see
+# ObserverBank.events:
+Detection = namedtuple("Detection", ["time", "agent", "observer", "kind", \
+                                     "value"])
+
+def discretize(A, B, time_step: float):
+    """
+    Returns the zero-order-hold discretization (Phi, Gamma) of the model
+    dx/dt = A x + B u for a time step (as pymas.ltiagent.LTIAgent.discretize).
+    """
+    ns, ni = A.shape[0], B.shape[1]
+    M = np.zeros(shape=(ns + ni, ns + ni))
+    M[:ns, :ns] = A
+    M[:ns, ns:] = B
+    E = expm(M * time_step)
+    return E[:ns, :ns], E[:ns, ns:]
+
+# %% The residual observer class
+class Observer(ABC):
+
+    def __init__(self, A=None, B=None, C=None, *, threshold=np.inf, \
+                 dwell=0.0, gain=None, poles=None, init_states=None):
+        """
+        A residual generator for all agents of a MAS, i.e. one observer per
+        agent of the model
+            dx/dt = A x + B u,  y = C x
+        discretized for the time step of the run (zero-order hold), in the
+        form
+            z(t+h) = F z(t) + G u(t) + K y(t)
+             xhat(t) = z(t) + H y(t)
+                r(t) = y(t) - C xhat(t)
+        where u are the inputs calculated by the Dcontroller and y = C x the
+        measured outputs (with the sensor faults of the MAS, see
+        pymas.faults.FaultInjector). The subclasses design F, G, K and H.
+        The observers of all agents are updated together on the stacked
+        arrays (numOfAgents, ns) once per step by ObserverBank.update(), so
+        only O(numOfAgents) values are kept instead of the trajectories.
+
+        The residual r_i of agent i stays (close to) zero while the agent
+        follows the model, and an alarm is raised when its Euclidean norm
+        has exceeded threshold for at least dwell seconds (e.g. after an
+        actuator or sensor fault). The alarm is cleared when the norm is
+        below threshold again.
+
+        *** The inputs are assumed to be held over each step, i.e. not with
+        pymas.engines.MonolithicEngine(mode="horizon"). ***
+
+        Parameters
+        ----------
+        A, B, C : numpy 2D arrays, optional
+            The model with shapes (ns, ns), (ns, ni) and (no, ns). The
+            defaults are the matrices of the first agent (a
+            pymas.ltiagent.LTIAgent).
+        threshold : float or numpy 1D array, optional and Keyword-only
+            The threshold of the residual norm (one per agent or for all).
+            The default is np.inf (no alarms).
+        dwell : float, optional and Keyword-only argument
+            The time (in seconds) the residual norm has to exceed threshold
+            before the alarm is raised. The default is 0.
+        gain : numpy 2D array, optional and Keyword-only argument
+            The observer gain (see the subclasses) with shape (ns, no) for
+            the time step of the run. The default is None (by poles).
+        poles : list of complex, optional and Keyword-only argument
+            The (discrete-time) eigenvalues of F, which are placed by
+            scipy.signal.place_poles. The default is None (the gain of the
+            steady-state Kalman predictor with unit noise covariances).
+        init_states : numpy 2D array, optional and Keyword-only argument
+            The initial estimates (numOfAgents, ns). The default is None
+            (the initial states of the agents).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.A, self.B, self.C = A, B, C
+        self.threshold = threshold
+        self.dwell = dwell
+        self.gain = gain
+        self.poles = poles
+        self.init_states = init_states
+        self._designs = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the previous run. It is called by ObserverBank.start().
+        """
+        self.Z = None
+        self.Y = None
+        self.residuals = None
+        self.norms = None
+        self.alarms = None
+        self.detectionTimes = None
+        self._since = None
+
+    def model(self, agent):
+        # Takes the missing matrices from the agent:
+        matrices = []
+        for name in ("A", "B", "C"):
+            M = getattr(self, name)
+            if M is None:
+                if not hasattr(agent, name):
+                    raise TypeError("The observer needs the matrix {} of " \
+                                    "the model (the agents are not " \
+                                    "LTIAgents).".format(name))
+                M = getattr(agent, name)
+            matrices.append(np.atleast_2d(np.asarray(M, dtype="float")))
+        return tuple(matrices)
+
+    def _gain(self, A, C):
+        # The gain L of the error dynamics e(t+h) = (A - L C) e(t):
+        if self.gain is not None:
+            return np.asarray(self.gain, dtype="float")\
+                .reshape(A.shape[0], -1)
+        if self.poles is not None:
+            return place_poles(A.T, C.T, self.poles).gain_matrix.T
+        I = np.eye(C.shape[0])
+        P = solve_discrete_are(A.T, C.T, np.eye(A.shape[0]), I)
+        return A @ P @ C.T @ np.linalg.inv(C @ P @ C.T + I)
+
+    @abstractmethod
+    def design(self, Phi, Gamma, C, time_step: float) -> tuple:
+        """
+        Returns the matrices (F, G, K, H) of the observer for the
+        discretized model (Phi, Gamma, C).
+        """
+        pass
+
+    def _matrices(self, time_step):
+        # The designs are cached for each time step (see LTIAgent):
+        key = round(float(time_step), 12)
+        if key not in self._designs:
+            Phi, Gamma = discretize(self._A, self._B, time_step)
+            F, G, K, H = self.design(Phi, Gamma, self._C, time_step)
+            # Transposed for the products with the stacked rows:
+            self._designs[key] = tuple(M.T.copy() for M in (F, G, K, H))
+        return self._designs[key]
+
+    def start(self, agent, X0: np.ndarray, Xm: np.ndarray, time_step: float):
+        """
+        Starts the observers from the initial states X0 (or init_states)
+        and the measured states Xm. It is called by ObserverBank.start().
+        """
+        self._A, self._B, self._C = self.model(agent)
+        self._designs = {}
+        self.reset()
+        N = X0.shape[0]
+        if self.init_states is not None:
+            X0 = np.asarray(self.init_states, dtype="float").reshape(N, -1)
+        _, _, _, HT = self._matrices(time_step)
+        self.Y = Xm @ self._C.T
+        self.Z = X0 - self.Y @ HT
+        self.residuals = np.zeros(shape=self.Y.shape)
+        self.norms = np.zeros(shape=(N,))
+        self.alarms = np.zeros(shape=(N,), dtype="bool")
+        self.detectionTimes = np.full(shape=(N,), fill_value=np.nan)
+        self._since = np.full(shape=(N,), fill_value=np.nan)
+
+    def update(self, t: float, time_step: float, Xm: np.ndarray, \
+               U: np.ndarray) -> tuple:
+        """
+        Advances the observers over a step to time t with the inputs U held
+        over the step and the measured states Xm at t. Returns the indices
+        of the agents whose alarms are raised and cleared at t.
+        """
+        FT, GT, KT, HT = self._matrices(time_step)
+        self.Z = self.Z @ FT + U @ GT + self.Y @ KT
+        self.Y = Xm @ self._C.T
+        self.residuals = self.Y - (self.Z + self.Y @ HT) @ self._C.T
+        self.norms = np.sqrt(np.einsum("ij,ij->i", self.residuals, \
+                                       self.residuals))
+        above = self.norms > self.threshold
+        self._since[~above] = np.nan
+        self._since[above & np.isnan(self._since)] = t
+        raised = np.flatnonzero(above & ~self.alarms & \
+                                (t - self._since >= self.dwell))
+        cleared = np.flatnonzero(self.alarms & ~above)
+        self.alarms[raised] = True
+        self.alarms[cleared] = False
+        first = raised[np.isnan(self.detectionTimes[raised])]
+        self.detectionTimes[first] = t
+        return raised, cleared
+
+    def getState(self) -> dict:
+        """
+        Returns the state of the observers for a checkpoint (see
+        MAS.checkpoint()).
+        """
+        return {name: None if getattr(self, name) is None else \
+                    getattr(self, name).copy() \
+                for name in ("Z", "Y", "residuals", "norms", "alarms", \
+                             "detectionTimes", "_since")}
+
+    def setState(self, state: dict):
+        """
+        Restores a state returned by getState() (after start()).
+        """
+        for name, value in state.items():
+            setattr(self, name, value)
+
+# %% The Luenberger observer class
+class LuenbergerObserver(Observer):
+    """
+    The Luenberger observer (predictor form)
+        xhat(t+h) = Phi xhat(t) + Gamma u(t) + L (y(t) - C xhat(t))
+    with the gain L (see Observer for the parameters). Its residual
+    responds to all faults and disturbances of an agent.
+    """
+
+    def design(self, Phi, Gamma, C, time_step):
+        L = self._gain(Phi, C)
+        return Phi - L @ C, Gamma, L, np.zeros(shape=L.shape)
+
+# %% The unknown input observer class
+class UnknownInputObserver(Observer):
+
+    def __init__(self, E, A=None, B=None, C=None, **kwargs):
+        """
+        The unknown input observer (UIO) of the model with the unknown
+        inputs d (e.g. disturbances or the faults of one actuator)
+            dx/dt = A x + B u + E d,  y = C x
+        whose residual is decoupled from d, so it only responds to the
+        other faults. A bank of UIOs, each decoupled from another input,
+        isolates the faulty input. With the discretized Ed (d held over a
+        step) the matrices are
+            H = Ed (C Ed)^+, T = I - H C, G = T Gamma,
+            F = T Phi - L C, K = L + F H
+        where the gain L is designed for (T Phi, C) (see Observer). It needs
+        rank(C Ed) = rank(Ed).
+
+        Parameters
+        ----------
+        E : numpy 2D array
+            The unknown input matrix with shape (ns, nd).
+        For the other arguments see Observer.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.E = E
+        Observer.__init__(self, A, B, C, **kwargs)
+
+    def design(self, Phi, Gamma, C, time_step):
+        ns = Phi.shape[0]
+        E = np.asarray(self.E, dtype="float").reshape(ns, -1)
+        # The unknown inputs enter the discretized model as Ed d:
+        _, Ed = discretize(self._A, E, time_step)
+        CE = C @ Ed
+        if np.linalg.matrix_rank(CE) < np.linalg.matrix_rank(Ed):
+            raise ValueError("The unknown inputs cannot be decoupled " \
+                             "(rank(C E) < rank(E)).")
+        H = Ed @ np.linalg.pinv(CE)
+        T = np.eye(ns) - H @ C
+        A1 = T @ Phi
+        L = self._gain(A1, C)
+        F = A1 - L @ C
+        return F, T @ Gamma, L + F @ H, H
+
+# %% The observer bank class
+class ObserverBank:
+
+    def __init__(self, observers, *, callback=None):
+        """
+        Residual generators which run in the simulation loop: the observers
+        are updated after every step of MAS.run() from the states and
+        inputs of the step, and their alarms are collected as Detection
+        events with the times of the steps. Fault detection thus runs while
+        the MAS is simulated, with O(numOfAgents) state per observer,
+        instead of on the recorded trajectories after the run.
+
+        Example:
+            bank = ObserverBank({
+                "all": LuenbergerObserver(threshold=0.05, dwell=0.2),
+                "not u0": UnknownInputObserver(E=B[:, [0]], threshold=0.05)})
+            mas = MAS(net, dcont, faults=faults, observers=bank)
+            mas.run(0, 30, 0.05)
+            bank.events       # [Detection(time, agent, observer, kind, value)]
+            bank["all"].detectionTimes
+
+        Parameters
+        ----------
+        observers : dict or list of Observer
+            The observers (by name, or by index for a list).
+        callback : callable, optional and Keyword-only argument
+            Called as callback(detection) for each event during the run.
+            The default is None.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not isinstance(observers, dict):
+            observers = dict(enumerate(observers))
+        self.observers = observers
+        self.callback = callback
+        self.events = []
+        self._mas = None
+        self._t = None
+
+    def __getitem__(self, name):
+        return self.observers[name]
+
+    def _measure(self, t, X):
+        faults = self._mas.faults
+        return X if faults is None else faults.measure(t, X)
+
+    def start(self, mas, time_list: np.ndarray):
+        """
+        Starts the observers from the latest states of the agents of mas at
+        the first time of time_list (the time points of the run). It is
+        called by MAS.run().
+        """
+        self._mas = mas
+        t = time_list[0]
+        self._t = t
+        if len(time_list) > 1:
+            time_step = time_list[1] - time_list[0]
+        else:
+            time_step = mas.time_step
+        self.events = []
+        agents = mas.network.agents
+        X0 = np.array([agent.stateTrajectHistory[-1] for agent in agents], \
+                      dtype="float")
+        Xm = self._measure(t, X0)
+        for observer in self.observers.values():
+            observer.start(agents[0], X0, Xm, time_step)
+
+    def update(self, t: float, X: np.ndarray, U: np.ndarray):
+        """
+        Updates the observers with the states X (numOfAgents, ns) at time t
+        and the inputs U (numOfAgents, ni) of the step which ended at t. It
+        is called by MAS.run() after each step.
+        """
+        time_step = t - self._t
+        self._t = t
+        Xm = self._measure(t, X)
+        for name, observer in self.observers.items():
+            raised, cleared = observer.update(t, time_step, Xm, U)
+            for kind, agents in (("detect", raised), ("clear", cleared)):
+                for i in agents:
+                    event = Detection(float(t), int(i), name, kind, \
+                                      float(observer.norms[i]))
+                    self.events.append(event)
+                    if self.callback is not None:
+                        self.callback(event)
+
+    def detections(self, observer=None) -> list:
+        """
+        Returns the "detect" events (of one observer, or of all observers if
+        observer is None).
+        """
+        return [event for event in self.events if event.kind == "detect" \
+                and (observer is None or event.observer == observer)]
+
+    def getState(self) -> dict:
+        """
+        Returns the state of the bank for a checkpoint (see
+        MAS.checkpoint()).
+        """
+        return {"t": self._t, "events": list(self.events), \
+                "observers": {name: observer.getState() \
+                              for name, observer in self.observers.items()}}
+
+    def setState(self, state: dict):
+        """
+        Restores a state returned by getState() (after start()).
+        """
+        self._t = state["t"]
+        self.events = [Detection(*event) for event in state["events"]]
+        for name, observer in self.observers.items():
+            observer.setState(state["observers"][name])
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("observers.py is not an executable module!")
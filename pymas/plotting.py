@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+"""
+Plotting of the trajectories of the agents.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+# matplotlib is only imported when a plot is made (see _pyplot()), so the
+# simulation modules work without it (e.g. on headless workers).
+
+# Local application imports
+
+# The number of samples (rows times columns) which are downsampled at once:
+BLOCK = 1 << 24
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
+
+# %% Downsampling
+def m4(t, Y, bins: int):
+    """
+    Downsamples the time series Y (one per column) to the first, minimum,
+    maximum and last sample of each of 'bins' equal time intervals (M4
+    aggregation). A line through these points is drawn with the same
+    pixels as the line through all samples if there is one interval per
+    pixel column, so the shape (peaks, oscillations) is preserved. It costs
+    one vectorized pass over the samples.
+
+    Parameters
+    ----------
+    t : numpy 1D array
+        The (non-decreasing) times of the samples, shared by all series.
+    Y : numpy 1D or 2D array
+        The samples with shape (len(t),) or (len(t), M).
+    bins : int
+        The number of time intervals (e.g. the width of the plot in pixels).
+
+    Returns
+    -------
+    The times with shape (P,) and the samples with shape (P,) or (P, M) of
+    at most 4 * bins points.
+
+    """
+    t = np.asarray(t, dtype="float")
+    Y = np.asarray(Y)
+    if t.shape[0] <= 4 * bins:
+        return t, Y
+    T = t.shape[0]
+    span = t[-1] - t[0]
+    if span <= 0:
+        return t[[0, -1]], Y[[0, -1]]
+    steps = np.diff(t)
+    if np.allclose(steps, span / (T - 1), rtol=1e-6, atol=0):
+        # Equally spaced times (e.g. a run recorded at every evolve point):
+        # the intervals have the same number of samples, so the extrema are
+        # reduced on a reshaped view (faster than reduceat).
+        size = -(-T // bins)
+        starts = np.arange(0, T, size)
+        full = (T // size) * size
+        blocks = Y[:full].reshape((-1, size) + Y.shape[1:])
+        lows, highs = blocks.min(axis=1), blocks.max(axis=1)
+        if full < T:
+            lows = np.concatenate((lows, Y[full:].min(axis=0)[None]))
+            highs = np.concatenate((highs, Y[full:].max(axis=0)[None]))
+    else:
+        b = np.minimum(((t - t[0]) / span * bins).astype("int64"), bins - 1)
+        starts = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+        lows = np.minimum.reduceat(Y, starts, axis=0)
+        highs = np.maximum.reduceat(Y, starts, axis=0)
+    ends = np.r_[starts[1:], T] - 1
+    # The min and max are placed between the first and the last sample of
+    # their interval (inside the same pixel column):
+    middle = (t[starts] + t[ends]) / 2
+    times = np.stack((t[starts], middle, middle, t[ends]), axis=1)
+    samples = np.stack((Y[starts], lows, highs, Y[ends]), axis=1)
+    return times.reshape(-1), samples.reshape((-1,) + Y.shape[1:])
+
+def lttb(t, Y, points: int):
+    """
+    Downsamples the time series Y to 'points' samples by the
+    Largest-Triangle-Three-Buckets algorithm: the first and last samples
+    are kept, and from each of the other (equal) buckets of samples the one
+    which forms the largest triangle with the sample kept from the previous
+    bucket and the mean of the next bucket. It keeps visually important
+    samples with fewer points than m4(), but the points differ per series.
+    All series are processed together (one loop over the buckets).
+
+    Parameters
+    ----------
+    t : numpy 1D array
+        The times of the samples, shared by all series.
+    Y : numpy 1D or 2D array
+        The samples with shape (len(t),) or (len(t), M).
+    points : int
+        The number of samples which are kept (at least 3).
+
+    Returns
+    -------
+    The times and the samples with shape (points,) or (points, M) each
+    (each series has its own times).
+
+    """
+    t = np.asarray(t, dtype="float")
+    Y = np.asarray(Y, dtype="float")
+    vector = Y.ndim == 1
+    if vector:
+        Y = Y[:, None]
+    T, M = Y.shape
+    if T <= points or points < 3:
+        times = np.repeat(t[:, None], M, axis=1)
+        return (times[:, 0], Y[:, 0]) if vector else (times, Y)
+    edges = np.linspace(1, T - 1, points - 1).astype("int64")
+    columns = np.arange(M)
+    selected = np.zeros(shape=(points, M), dtype="int64")
+    selected[-1] = T - 1
+    previous = np.zeros(shape=(M,), dtype="int64")
+    for k in range(points - 2):
+        bucket = slice(edges[k], edges[k+1])
+        if k + 2 < points - 1:
+            following = slice(edges[k+1], edges[k+2])
+        else:
+            following = slice(T - 1, T)
+        tNext = t[following].mean()
+        yNext = Y[following].mean(axis=0)
+        tPrev = t[previous]
+        yPrev = Y[previous, columns]
+        # Twice the areas of the triangles (previous, candidate, next mean):
+        areas = np.abs((tPrev - tNext) * (Y[bucket] - yPrev) - \
+                       (tPrev - t[bucket, None]) * (yNext - yPrev))
+        previous = edges[k] + np.argmax(areas, axis=0)
+        selected[k+1] = previous
+    times = t[selected]
+    samples = Y[selected, columns]
+    return (times[:, 0], samples[:, 0]) if vector else (times, samples)
+
+DOWNSAMPLERS = ("m4", "lttb")
+
+# %% Plotting
+def _pixels(ax) -> int:
+    # The width of the axes in pixels:
+    bbox = ax.get_window_extent()
+    return max(int(np.ceil(bbox.width)), 1)
+
+def plotTrajectories(t, Y, *, ax=None, component=None, pixels=None, \
+                     method="m4", **kwargs):
+    """
+    Plots many time series (e.g. one state component of all agents) as one
+    line collection after downsampling them to the width of the plot.
+    Arrays are reduced without copies, so the memory-mapped arrays of a
+    pymas.recorder.MemmapRecorder can be larger than the memory. Other
+    column sources (see plotAgents()) are stacked in blocks of columns.
+
+    Parameters
+    ----------
+    t : numpy 1D array
+        The times of the samples.
+    Y : numpy 2D or 3D array
+        The samples with shape (len(t), M) or (len(t), M, ns).
+    ax : matplotlib Axes, optional and Keyword-only argument
+        The axes of the plot. The default is None (the current axes).
+    component : int, optional and Keyword-only argument
+        The component plotted of a 3D Y. The default is None (all).
+    pixels : int, optional and Keyword-only argument
+        The number of time intervals (see m4()) or twice the number of
+        points (see lttb()). The default is None (the width of ax in
+        pixels).
+    method : str, optional and Keyword-only argument
+        "m4" (see m4()) or "lttb" (see lttb()). The default is "m4".
+    **kwargs :
+        Passed to matplotlib.collections.LineCollection (e.g. colors,
+        linewidths).
+
+    Returns
+    -------
+    The LineCollection.
+
+    """
+    if method not in DOWNSAMPLERS:
+        raise ValueError("method should be one of: " + \
+                         ", ".join(DOWNSAMPLERS))
+    from matplotlib.collections import LineCollection
+    plt = _pyplot()
+    if ax is None:
+        ax = plt.gca()
+    if pixels is None:
+        pixels = _pixels(ax)
+    t = np.asarray(t)
+    if not hasattr(Y, "ndim"):
+        Y = np.asarray(Y)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    elif Y.ndim == 3:
+        if component is not None:
+            Y = Y[:, :, component]
+        else:
+            Y = Y.reshape(Y.shape[0], -1)
+    if isinstance(Y, np.ndarray):
+        # The reductions stream over (memory-mapped) arrays without copies:
+        blocks = [Y]
+    else:
+        step = max(BLOCK // max(t.shape[0], 1), 1)
+        blocks = (np.asarray(Y[:, start:start + step], dtype="float") \
+                  for start in range(0, Y.shape[1], step))
+    segments = []
+    for block in blocks:
+        if method == "m4":
+            times, samples = m4(t, block, pixels)
+            times = np.broadcast_to(times[:, None], samples.shape)
+        else:
+            times, samples = lttb(t, block, 2 * pixels)
+        segments.append(np.stack((times.T, samples.T), axis=2))
+    if "colors" not in kwargs and "color" not in kwargs:
+        # One color per series, as with pyplot.plot():
+        kwargs["colors"] = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+    lines = LineCollection(np.concatenate(segments), **kwargs)
+    ax.add_collection(lines)
+    ax.autoscale_view()
+    return lines
+
+def plotAgents(agents, *, ax=None, components=None, pixels=None, \
+               method="m4", grid=False, **kwargs):
+    """
+    Plots the state trajectories of agents (e.g. MAS.network.agents)
+    downsampled by plotTrajectories(). The agents are plotted together if
+    they have the same time points (which is checked by the number and the
+    first and last times), otherwise one by one.
+
+    Parameters
+    ----------
+    agents : list of pymas.agent.Agent
+        The agents.
+    ax, pixels, method, **kwargs : See plotTrajectories().
+    components : list of int, optional and Keyword-only argument
+        The plotted state components. The default is None (all). Under a
+        reduced pymas.recording.RecordingPolicy only the recorded components
+        are plotted (from outputTrajectory), the others are skipped.
+    grid : bool, optional and Keyword-only argument
+        If True, the grid of the axes is shown. The default is False.
+
+    Returns
+    -------
+    The list of the LineCollections.
+
+    Raises
+    ------
+    ValueError
+        If none of the plotted components were recorded.
+
+    """
+    groups = {}
+    for agent in agents:
+        time = agent.time
+        key = (time.shape[0], time[0], time[-1]) if time.shape[0] else ()
+        groups.setdefault(key, []).append(agent)
+    collections = []
+    for group in groups.values():
+        t = group[0].time
+        for c in range(group[0].ns) if components is None else components:
+            columns = [column for column in \
+                       (_recorded(agent, c) for agent in group) \
+                       if column is not None]
+            if not columns:
+                continue
+            Y = _Columns(columns, t.shape[0])
+            collections.append(plotTrajectories(t, Y, ax=ax, pixels=pixels, \
+                                                method=method, **kwargs))
+    if agents and not collections:
+        raise ValueError("The plotted state components were not recorded " \
+                         "(see pymas.recording.RecordingPolicy).")
+    if grid:
+        (_pyplot().gca() if ax is None else ax).grid()
+    return collections
+
+def _recorded(agent, c):
+    # The recorded samples of state component c of agent as (array, column),
+    # or None if they were not recorded (a reduced RecordingPolicy only
+    # records some components, or the outputs, in outputTrajectory):
+    policy = agent.recording
+    if policy is None or not policy.reduced:
+        return agent.stateTrajectHistory, c
+    if policy.components is not None and c in list(policy.components):
+        return agent.outputTrajectory, list(policy.components).index(c)
+    return None
+
+class _Columns:
+    # The recorded columns (array, column) of some agents as a (T, columns)
+    # array which is only stacked per block of columns (see
+    # plotTrajectories()):
+
+    def __init__(self, columns, T):
+        self.columns = columns
+        self.ndim = 2
+        self.shape = (T, len(columns))
+
+    def __getitem__(self, index):
+        _, columns = index
+        return np.stack([array[:, c] for array, c in self.columns[columns]], \
+                        axis=1)
+
+def show(**kwargs):
+    """
+    Shows the figures (matplotlib.pyplot.show()).
+    """
+    _pyplot().show(**kwargs)
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("plotting.py is not an executable module!")
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the Profiler class.
+"""
+
+# %% Imports
+# Standard library imports
+from time import perf_counter
+
+# Third party imports
+import numpy as np
+from scipy.integrate import odeint
+
+# Local application imports
+from pymas.integrators import dopri5
+from pymas.engines import DistributedEngine
+
+# %% The profiler class
+class Profiler:
+
+    def __init__(self, *, callback=None, every=1):
+        """
+        Collects where the time of MAS.run() goes:
+            phases: the wall-clock time and the number of calls of each
+                phase of the simulation loop,
+                "network": Network.update() (switching topologies),
+                "control": the Dcontroller (and the engine's inputs()),
+                "integrate": the integrators (Agent.evolve() and the
+                    engines), without the control inputs calculated inside
+                    them (MonolithicEngine(mode="horizon")),
+                "record": appending to the trajectories,
+                "recorder": MemmapRecorder.step(),
+                "observers": ObserverBank.update() (fault detection),
+                "metrics": Metrics.update(),
+                "termination": the termination criterion,
+                "step": the rest of the engine's step().
+                The times are exclusive, i.e. a phase inside another one
+                (e.g. "record" inside Agent.evolve()) is not counted twice.
+            rhsCalls: the number of evaluations of the dynamics of each
+                agent (f() or one row of f_batch()); None with
+                pymas.engines.DistributedEngine, whose workers evaluate
+                them,
+            solver: the integrator calls, their internal steps and their
+                evaluations of the (stacked) right-hand side,
+            bytesRecorded: the bytes written to the trajectories of the
+                agents (to their buffers or to a
+                pymas.recorder.MemmapRecorder), including the rows which a
+                rolling window later drops.
+
+        The methods are instrumented (by wrappers on the instances) only
+        during a run with MAS.run(..., profiler=...), so without a profiler
+        a run costs nothing extra. The report is available with report()
+        after the run and is passed to 'callback' every 'every' steps during
+        the run.
+
+        *** The workers of pymas.engines.DistributedEngine run in other
+        processes, so only the phases of the main process are measured. ***
+
+        Parameters
+        ----------
+        callback : callable, optional and Keyword-only argument
+            Called as callback(report) during the run. The default is None.
+        every : int, optional and Keyword-only argument
+            The number of steps between two callbacks. The default is 1.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.callback = callback
+        self.every = max(int(every), 1)
+        self._patched = []
+        self.reset()
+
+    def reset(self):
+        self.seconds = {}
+        self.calls = {}
+        self.rhsCalls = None
+        self.solver = {"calls": 0, "steps": 0, "rhsEvaluations": 0, \
+                       "jacobianEvaluations": 0}
+        self.steps = 0
+        self.time = None
+        self._stack = []
+        self._since = None
+        self._start = None
+        self._stop = None
+        self._bytes = 0
+
+    # %% Timers
+    def _enter(self, phase):
+        stack = self._stack
+        if stack and stack[-1][0] == phase:
+            # The same phase inside itself (e.g. controlProtocol() inside
+            # controlProtocolAll()) is counted once:
+            stack[-1][1] += 1
+            return
+        now = perf_counter()
+        if stack:
+            parent = stack[-1][0]
+            self.seconds[parent] += now - self._since
+        stack.append([phase, 0])
+        self.seconds.setdefault(phase, 0.0)
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self._since = now
+
+    def _exit(self):
+        top = self._stack[-1]
+        if top[1] > 0:
+            top[1] -= 1
+            return
+        now = perf_counter()
+        self.seconds[top[0]] += now - self._since
+        self._stack.pop()
+        self._since = now
+
+    # %% Instrumentation
+    def _patch(self, obj, name, wrapper):
+        # Replaces a method of an instance until stop():
+        if obj is None or getattr(obj, name, None) is None:
+            return
+        original = getattr(obj, name)
+        self._patched.append((obj, name, name in vars(obj), \
+                              vars(obj).get(name)))
+        setattr(obj, name, wrapper(original))
+
+    def _timed(self, phase):
+        def wrapper(function):
+            def timed(*args, **kwargs):
+                self._enter(phase)
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self._exit()
+            return timed
+        return wrapper
+
+    def _counted(self, rows):
+        # Counts the evaluations of the dynamics of the agents in rows:
+        def wrapper(function):
+            def counted(*args, **kwargs):
+                self.rhsCalls[rows] += 1
+                return function(*args, **kwargs)
+            return counted
+        return wrapper
+
+    def _integrator(self, function, rows=None):
+        # Times an integrator and collects its statistics. If rows is given,
+        # the evaluations of f are counted for these agents:
+        def integrate(f, y0, t, args=(), **kwargs):
+            if rows is not None:
+                f = self._counted(rows)(f)
+            self._enter("integrate")
+            try:
+                self.solver["calls"] += 1
+                if function is odeint:
+                    sol, info = odeint(f, y0, t, args=args, full_output=True, \
+                                       **kwargs)
+                    self.solver["steps"] += int(info["nst"][-1])
+                    self.solver["rhsEvaluations"] += int(info["nfe"][-1])
+                    self.solver["jacobianEvaluations"] += int(info["nje"][-1])
+                    return sol
+                # Fixed-step integrators (see pymas.integrators):
+                substeps = kwargs.get("substeps", 1)
+                self.solver["steps"] += (len(t) - 1) * substeps
+                self.solver["rhsEvaluations"] += \
+                    (6 if function is dopri5 else 4) * (len(t) - 1) * substeps
+                return function(f, y0, t, args, **kwargs)
+            finally:
+                self._exit()
+        return integrate
+
+    def _segmentIntegrator(self, engine, function):
+        # Times the integration of pymas.engines.JITEngine, whose kernels
+        # cannot be instrumented, and counts its steps and evaluations:
+        def integrate(t_list, U, out):
+            self._enter("integrate")
+            try:
+                steps = (len(t_list) - 1) * engine.substeps
+                evaluations = (6 if engine.method == "dopri5" else 4) * steps
+                self.solver["calls"] += 1
+                self.solver["steps"] += steps
+                self.solver["rhsEvaluations"] += evaluations
+                self.rhsCalls += evaluations
+                return function(t_list, U, out)
+            finally:
+                self._exit()
+        return integrate
+
+    def _countedBinder(self, function):
+        # Counts the evaluations of the BatchEngines which AsyncEngine binds
+        # to the due agents (each one is instrumented once):
+        def binder(rows):
+            batch = function(rows)
+            if "_rhs" not in vars(batch):
+                self._patch(batch, "_rhs", self._counted(np.array(rows)))
+            return batch
+        return binder
+
+    def _written(self, function):
+        # Counts the bytes of the rows appended to a trajectory buffer or
+        # written by MemmapRecorder.record():
+        def written(*rows):
+            self._bytes += sum(np.asarray(r, dtype="float").nbytes \
+                               for r in rows)
+            return function(*rows)
+        return written
+
+    def start(self, mas, engine, termination=None, metrics=None):
+        """
+        Instruments a run of mas with engine. It is called by MAS.run()
+        before engine.start().
+        """
+        self.reset()
+        self._agents = mas.network.agents
+        self.rhsCalls = np.zeros(shape=(len(self._agents),), dtype="int64")
+        timed = self._timed
+        self._patch(mas.network, "update", timed("network"))
+        self._patch(engine, "step", timed("step"))
+        self._patch(engine, "inputs", timed("control"))
+        self._patch(engine, "record", timed("record"))
+        self._patch(mas.dcontroller, "controlProtocol", timed("control"))
+        self._patch(mas.dcontroller, "controlProtocolAll", timed("control"))
+        self._patch(mas.recorder, "step", timed("recorder"))
+        self._patch(mas.recorder, "record", self._written)
+        self._patch(mas.observers, "update", timed("observers"))
+        self._patch(termination, "update", timed("termination"))
+        self._patch(metrics, "update", timed("metrics"))
+        if getattr(engine, "_integrate", None) is not None:
+            self._patch(engine, "_integrate", lambda f: self._integrator(f))
+        if getattr(engine, "_rhs", None) is not None:
+            # The engine evaluates the dynamics of all its agents at once:
+            self._patch(engine, "_rhs", self._counted(slice(None)))
+            counted = False
+        elif getattr(engine, "_integrateSegment", None) is not None:
+            # The (compiled) fixed-step integrator of JITEngine:
+            self._patch(engine, "_integrateSegment", \
+                        lambda f: self._segmentIntegrator(engine, f))
+        elif getattr(engine, "_binder", None) is not None:
+            self._patch(engine, "_binder", self._countedBinder)
+        elif isinstance(engine, DistributedEngine):
+            # The dynamics are evaluated in the workers:
+            self.rhsCalls = None
+        # The dynamics of the agents are counted through their integrators,
+        # not by replacing f() (see pymas.agent.Agent.batchDynamics()):
+        for i, agent in enumerate(self._agents):
+            self._patch(agent, "record", timed("record"))
+            for buffer in (agent._timeBuffer, agent._stateBuffer, \
+                           agent._inputBuffer, agent._outputBuffer):
+                # The time column of a recorder is written only once:
+                if buffer is not None and getattr(buffer, "owner", True):
+                    self._patch(buffer, "append", self._written)
+            self._patch(agent, "_integrate", \
+                        lambda f, i=i: self._integrator(f, rows=i))
+        self._start = perf_counter()
+        self._since = self._start
+
+    def step(self, k: int, t: float):
+        """
+        Called by MAS.run() after step k (at time t).
+        """
+        self.steps = k
+        self.time = t
+        if self.callback is not None and k % self.every == 0:
+            self.callback(self.report())
+
+    def stop(self):
+        """
+        Removes the instrumentation. It is called by MAS.run() at the end of
+        the run.
+        """
+        self._stop = perf_counter()
+        for obj, name, had, original in reversed(self._patched):
+            if had:
+                setattr(obj, name, original)
+            else:
+                delattr(obj, name)
+        self._patched = []
+        self._stack = []
+
+    def report(self) -> dict:
+        """
+        Returns the collected measurements as a dict with the keys "steps",
+        "time" (of the last step), "wallTime", "phases" ({phase: {"seconds",
+        "calls"}}), "rhsCalls" (per agent), "solver" and "bytesRecorded".
+        """
+        if self._start is None:
+            wallTime = 0.0
+        elif self._stop is None:
+            wallTime = perf_counter() - self._start
+        else:
+            wallTime = self._stop - self._start
+        phases = {phase: {"seconds": self.seconds[phase], \
+                          "calls": self.calls[phase]} \
+                  for phase in self.seconds}
+        return {
+            "steps": self.steps,
+            "time": self.time,
+            "wallTime": wallTime,
+            "phases": phases,
+            "rhsCalls": None if self.rhsCalls is None else \
+                self.rhsCalls.copy(),
+            "solver": dict(self.solver),
+            "bytesRecorded": self._bytes,
+        }
+
+    def summary(self) -> str:
+        """
+        Returns the phases of report() as a text table.
+        """
+        report = self.report()
+        lines = ["{:<12s} {:>10s} {:>8s} {:>10s}".format("phase", "seconds", \
+                                                         "share", "calls")]
+        total = max(report["wallTime"], 1e-12)
+        for phase, item in sorted(report["phases"].items(), \
+                                  key=lambda item: -item[1]["seconds"]):
+            lines.append("{:<12s} {:>10.4f} {:>7.1%} {:>10d}".format( \
+                phase, item["seconds"], item["seconds"] / total, \
+                item["calls"]))
+        lines.append("RHS calls per agent: {} (total {}), solver: {}".format( \
+            "-" if report["rhsCalls"] is None else \
+                "{:.0f} on average".format(report["rhsCalls"].mean()), \
+            "-" if report["rhsCalls"] is None else report["rhsCalls"].sum(), \
+            report["solver"]))
+        lines.append("Bytes recorded: {}".format(report["bytesRecorded"]))
+        return "\n".join(lines)
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("profiler.py is not an executable module!")
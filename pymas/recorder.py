@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the MemmapRecorder class.
+"""
+
+# %% Imports
+# Standard library imports
+import os
+import json
+
+# Third party imports
+import numpy as np
+from numpy.lib.format import open_memmap
+
+# Local application imports
+
+# %% The column view class
+class RecorderColumn:
+
+    def __init__(self, array: np.ndarray, index, counts: np.ndarray, *, \
+                 owner=True):
+        """
+        The part of a recorder array which belongs to one agent. It has the
+        same interface as pymas.trajectory.TrajectoryBuffer, so it can
+        replace the trajectory buffers of an agent.
+
+        Parameters
+        ----------
+        array : numpy array
+            The (memory-mapped) array with the time as its first axis.
+        index : int or None
+            The agent's index on the second axis of array. If None, the
+            whole rows are used (e.g. for the time array).
+        counts : numpy 1D array
+            The number of filled rows, shared with the recorder. counts[0]
+            belongs to this column.
+        owner : bool, optional and Keyword-only argument
+            If False, appended rows are only counted and not written. This
+            is used for the time column, which is shared by all agents: it
+            is written by the last agent only, so the agents evolved before
+            it in a step still read their own latest time. The default is
+            True.
+
+        """
+        self.array = array
+        self.index = index
+        self.counts = counts
+        self.owner = owner
+
+    def __len__(self):
+        return int(self.counts[0])
+
+    @property
+    def capacity(self) -> int:
+        return self.array.shape[0]
+
+    def _column(self):
+        if self.index is None:
+            return self.array
+        return self.array[:, self.index]
+
+    @property
+    def data(self) -> np.ndarray:
+        # A zero-copy view of the memory-mapped file:
+        return self._column()[:len(self)]
+
+    def reserve(self, rows: int):
+        if len(self) + int(rows) > self.capacity:
+            raise RuntimeError("The recorder has been sized for {} rows."\
+                               .format(self.capacity))
+
+    def append(self, rows):
+        column = self._column()
+        rows = np.asarray(rows, dtype=self.array.dtype)
+        rows = rows.reshape((-1,) + column.shape[1:])
+        n = len(self)
+        self.reserve(rows.shape[0])
+        if self.owner:
+            column[n:n + rows.shape[0]] = rows
+        self.counts[0] = n + rows.shape[0]
+
+    def replaceLast(self, row):
+        if self.owner:
+            column = self._column()
+            column[len(self) - 1] = np.reshape(row, column.shape[1:])
+
+    def reset(self, rows=None):
+        self.counts[0] = 0
+        if rows is not None:
+            self.append(rows)
+
+# %% The memory-mapped recorder class
+class MemmapRecorder:
+
+    def __init__(self, directory: str, *, flush_every=1024):
+        """
+        Records the trajectories of all agents to memory-mapped .npy files
+        instead of keeping them in RAM:
+            time.npy   : shape (rows,)
+            states.npy : shape (rows, numOfAgents, ns)
+            inputs.npy : shape (steps+1, numOfAgents, ni)
+        The files are sized from the horizon of MAS.run(). While recording,
+        time, stateTrajectHistory and inputTrajectory of each agent are
+        zero-copy views of these files, so post-processing (and plotAll)
+        does not load everything into memory. The endpoints and every
+        options of a pymas.recording.RecordingPolicy reduce the number of
+        rows accordingly (window and outputs are not supported).
+
+        *** Only the current run is recorded: the first row is the latest
+        state of each agent when the run starts. ***
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the files. It is created if it does not exist.
+        flush_every : int, optional and Keyword-only argument
+            Number of steps between two flushes of the files to disk. The
+            default is 1024.
+
+        """
+        self.directory = directory
+        self.flush_every = max(int(flush_every), 1)
+        self.time = None
+        self.states = None
+        self.inputs = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def start(self, mas, numOfIterations: int):
+        """
+        Creates the files for a run of numOfIterations steps and binds the
+        agents' trajectories to them. It is called by MAS.run().
+        """
+        agents = mas.network.agents
+        numOfAgents = len(agents)
+        ns, ni = agents[0].ns, agents[0].ni
+        policy = agents[0].recording
+        points = agents[0].num_evolve_points
+        if policy is None:
+            rows, steps = numOfIterations * (points - 1), numOfIterations
+        elif policy.window is not None or policy.reduced:
+            raise ValueError("Only the endpoints and every options of a " \
+                             "RecordingPolicy can be used with a recorder.")
+        else:
+            rows, steps = policy.rows(numOfIterations, points)
+        rows += 1
+        os.makedirs(self.directory, exist_ok=True)
+        self.time = open_memmap(self._path("time.npy"), mode="w+", \
+                                dtype="float", shape=(rows,))
+        self.states = open_memmap(self._path("states.npy"), mode="w+", \
+                                  dtype="float", shape=(rows, numOfAgents, ns))
+        self.inputs = open_memmap(self._path("inputs.npy"), mode="w+", \
+                                  dtype="float", \
+                                  shape=(steps+1, numOfAgents, ni))
+        # Filled rows of (time, states, inputs) for each agent:
+        self.counts = np.zeros(shape=(3, numOfAgents), dtype="int64")
+        self._steps = 0
+        for i, agent in enumerate(agents):
+            timeColumn = RecorderColumn(self.time, None, self.counts[0, i:], \
+                                        owner=(i == numOfAgents-1))
+            stateColumn = RecorderColumn(self.states, i, self.counts[1, i:])
+            inputColumn = RecorderColumn(self.inputs, i, self.counts[2, i:])
+            timeColumn.append(agent.time[-1])
+            stateColumn.append(agent.stateTrajectHistory[-1])
+            inputColumn.append(agent.inputTrajectory[-ni:])
+            agent.setTrajectoryBuffers(timeColumn, stateColumn, inputColumn)
+
+    def record(self, t_list: np.ndarray, X: np.ndarray, U: np.ndarray):
+        """
+        Writes a stacked segment (see pymas.engines.Engine.record()) for all
+        agents at once.
+        """
+        n = int(self.counts[1, 0])
+        k = len(t_list)
+        self.time[n:n+k] = t_list
+        self.states[n:n+k] = X
+        self.inputs[int(self.counts[2, 0])] = U
+        self.counts[:2] += k
+        self.counts[2] += 1
+
+    def step(self):
+        """
+        Counts the steps and flushes the files every flush_every steps. It
+        is called by MAS.run() after each step.
+        """
+        self._steps += 1
+        if self._steps % self.flush_every == 0:
+            self.flush()
+
+    def flush(self):
+        for array in (self.time, self.states, self.inputs):
+            array.flush()
+
+    def stop(self):
+        """
+        Flushes the files and writes the number of recorded rows to
+        meta.json (the files are preallocated, so a run which stops early
+        leaves unused rows).
+        """
+        self.flush()
+        with open(self._path("meta.json"), "w") as file:
+            json.dump({"rows": int(self.counts[1].min()), \
+                       "steps": int(self.counts[2].min()) - 1}, file)
+
+    @staticmethod
+    def load(directory: str):
+        """
+        Opens a recording read-only. Returns (time, states, inputs) as
+        memory-mapped arrays trimmed to the recorded rows.
+        """
+        with open(os.path.join(directory, "meta.json")) as file:
+            meta = json.load(file)
+        arrays = [np.load(os.path.join(directory, name), mmap_mode="r") \
+                  for name in ("time.npy", "states.npy", "inputs.npy")]
+        return arrays[0][:meta["rows"]], arrays[1][:meta["rows"]], \
+            arrays[2][:meta["steps"]+1]
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("recorder.py is not an executable module!")
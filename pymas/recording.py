@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the RecordingPolicy class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+
+# Local application imports
+
+# %% The recording policy class
+class RecordingPolicy:
+
+    def __init__(self, *, endpoints=False, every=1, window=None, \
+                 components=None, outputs=False):
+        """
+        Defines what Agent.record() keeps, so that memory and copy costs
+        scale with what is analysed rather than with solver resolution.
+        The default policy keeps everything (as without a policy).
+
+        *** The last row of stateTrajectHistory is always the latest state
+        of the agent, since controllers and engines read it. ***
+
+        Parameters
+        ----------
+        endpoints : bool, optional and Keyword-only argument
+            If True, only the endpoint of each step is recorded instead of
+            all evolve_points. The default is False.
+        every : int, optional and Keyword-only argument
+            Only every k-th step is recorded. The latest sample is kept as a
+            provisional last row which is overwritten until the next k-th
+            step. The default is 1.
+        window : int, optional and Keyword-only argument
+            Only the last 'window' samples are kept (a rolling window). The
+            default is None (all samples).
+        components : list of int, optional and Keyword-only argument
+            If given, only these state components are recorded, in the
+            agent's outputTrajectory. stateTrajectHistory then only keeps
+            the latest state. The default is None.
+        outputs : bool, optional and Keyword-only argument
+            If True, the values of Agent.output(x, u) are recorded in the
+            agent's outputTrajectory instead of the states.
+            stateTrajectHistory then only keeps the latest state. The
+            default is False.
+
+        """
+        self.endpoints = endpoints
+        self.every = max(int(every), 1)
+        self.window = window
+        self.components = components
+        self.outputs = outputs
+        if components is not None and outputs:
+            raise ValueError("Either components or outputs can be recorded.")
+
+    @property
+    def reduced(self) -> bool:
+        """
+        True if outputTrajectory is recorded instead of the full states.
+        """
+        return self.components is not None or self.outputs
+
+    def rows(self, steps: int, points: int):
+        """
+        Returns the number of (sample rows, input rows) which are recorded
+        in 'steps' steps with 'points' evolve points.
+        """
+        if self.endpoints:
+            points = 2
+        committed = steps // self.every
+        rows = committed * (points - 1)
+        if steps % self.every:
+            rows += 1 # The provisional row
+            committed += 1
+        return rows, committed
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("recording.py is not an executable module!")
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the TopologySchedule class.
+"""
+
+# %% Imports
+# Standard library imports
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+
+# %% Helpers
+def removeEdges(A, edges):
+    """
+    Returns a copy of the adjacency matrix A (in CSR format) without the
+    given edges, e.g. to model link failures or a denial-of-service attack
+    on some links.
+
+    Parameters
+    ----------
+    A : numpy 2D array or scipy sparse matrix
+        The adjacency matrix.
+    edges : list of (int, int)
+        The (tail, head) indices of the removed edges.
+
+    Returns
+    -------
+    The adjacency matrix without the edges as a scipy CSR matrix.
+
+    """
+    A = sp.csr_matrix(A, dtype="float", copy=True)
+    A = A.tolil()
+    for i, j in edges:
+        A[i, j] = 0
+    A = A.tocsr()
+    A.eliminate_zeros()
+    return A
+
+def _modeKey(A):
+    # Identical adjacency matrices share one mode:
+    A = sp.csr_matrix(A)
+    A.sum_duplicates()
+    A.eliminate_zeros()
+    return (A.shape, A.indptr.tobytes(), A.indices.tobytes(), \
+            A.data.astype("float").tobytes())
+
+# %% The schedule base class
+class Schedule(ABC):
+
+    def __init__(self, modes):
+        """
+        A sequence of network modes over time, used by
+        pymas.network.Network(..., schedule=...). The network builds the
+        topology (neighbour lists and Laplacian) of each mode once, so a
+        switch is only a change of the current topology.
+
+        Parameters
+        ----------
+        modes : list of numpy 2D arrays or scipy sparse matrices
+            The adjacency matrices of the modes.
+
+        """
+        self.modes = list(modes)
+
+    def reset(self, t: float):
+        """
+        Starts the schedule at time t. It is called by MAS.run().
+        """
+        pass
+
+    def getState(self) -> dict:
+        """
+        Returns the state of the schedule for a checkpoint (see
+        MAS.checkpoint()). Schedules which keep a state during a run should
+        override it together with setState().
+        """
+        return {}
+
+    def setState(self, state: dict):
+        """
+        Restores a state returned by getState() (after reset()).
+        """
+        pass
+
+    @abstractmethod
+    def mode(self, t: float) -> int:
+        """
+        Returns the index (in modes) of the mode at time t. It is called
+        with non-decreasing times during a run.
+        """
+        pass
+
+# %% The time-based schedule class
+class TopologySchedule(Schedule):
+
+    def __init__(self, switches, *, period=None):
+        """
+        Switches the network at given times. Mode k is used from the k-th
+        time until the next time (the first mode is also used before its
+        time).
+
+        Example (the link 0 -> 1 fails between t=5 and t=8):
+            schedule = TopologySchedule([(0, A),
+                                         (5, removeEdges(A, [(0, 1)])),
+                                         (8, A)])
+            net = Network(A, agents, schedule=schedule)
+
+        Parameters
+        ----------
+        switches : list of (float, adjacency matrix)
+            The switching times (in increasing order) and the adjacency
+            matrices from these times on. Identical matrices are stored
+            once, so their topology is only built once.
+        period : float, optional and Keyword-only argument
+            If given, the schedule is repeated with this period (the times
+            should then be in [0, period)). The default is None.
+
+        """
+        modes, keys, sequence = [], {}, []
+        for t, A in switches:
+            key = _modeKey(A)
+            if key not in keys:
+                keys[key] = len(modes)
+                modes.append(A)
+            sequence.append(keys[key])
+        Schedule.__init__(self, modes)
+        self.times = [float(t) for t, _ in switches]
+        self.sequence = sequence
+        self.period = period
+
+    def mode(self, t):
+        if self.period is not None:
+            t = t % self.period
+        # (with a tolerance for the rounding of the time steps)
+        k = bisect_right(self.times, t + 1e-9) - 1
+        return self.sequence[max(k, 0)]
+
+# %% The Markov switching schedule class
+class MarkovSchedule(Schedule):
+
+    def __init__(self, modes, P, interval: float, *, initial=0, seed=None):
+        """
+        Switches the network randomly: every 'interval' seconds the next
+        mode is drawn from the row of the transition matrix P of the current
+        mode (a discrete-time Markov chain).
+
+        Parameters
+        ----------
+        modes : list of numpy 2D arrays or scipy sparse matrices
+            The adjacency matrices of the modes.
+        P : numpy 2D array
+            The transition probabilities with shape (len(modes),
+            len(modes)). Its rows should sum to 1.
+        interval : float
+            The time between two transitions.
+        initial : int, optional and Keyword-only argument
+            The mode at the start of the run. The default is 0.
+        seed : int, optional and Keyword-only argument
+            The seed of the random transitions. Every run starts from this
+            seed, so runs are reproducible. The default is None.
+
+        """
+        Schedule.__init__(self, modes)
+        self.P = np.asarray(P, dtype="float")
+        if self.P.shape != (len(self.modes), len(self.modes)):
+            raise ValueError("P should have the shape " \
+                             "(len(modes), len(modes)).")
+        self.interval = interval
+        self.initial = initial
+        self.seed = seed
+        self.reset(0)
+
+    def reset(self, t):
+        self._rng = np.random.default_rng(self.seed)
+        self._mode = self.initial
+        self._start = t
+        self._transitions = 0
+
+    def getState(self):
+        return {"rng": self._rng.bit_generator.state, "mode": self._mode, \
+                "start": self._start, "transitions": self._transitions}
+
+    def setState(self, state):
+        self._rng.bit_generator.state = state["rng"]
+        self._mode = state["mode"]
+        self._start = state["start"]
+        self._transitions = state["transitions"]
+
+    def mode(self, t):
+        # The transition times are t0 + n * interval (with a tolerance for
+        # the rounding of the time steps):
+        while t >= self._start + (self._transitions + 1) * self.interval \
+                - 1e-9 * self.interval:
+            self._mode = int(self._rng.choice(len(self.modes), \
+                                              p=self.P[self._mode]))
+            self._transitions += 1
+        return self._mode
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("schedule.py is not an executable module!")
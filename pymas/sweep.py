@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the Sweep class.
+"""
+
+# %% Imports
+# Standard library imports
+import os
+import json
+import itertools
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+
+# The adjacency matrix shared with the worker processes (set by _initWorker):
+_ADJACENCY = None
+_SHARED = []
+
+# %% Shared memory helpers
+def _share(adjacency):
+    # Copies the arrays of the adjacency matrix to shared memory blocks.
+    # Returns the blocks and a (picklable) description to attach to them.
+    if sp.issparse(adjacency):
+        csr = sp.csr_matrix(adjacency)
+        kind, shape = "csr", csr.shape
+        arrays = (csr.data, csr.indices, csr.indptr)
+    else:
+        kind, shape = "dense", np.shape(adjacency)
+        arrays = (np.ascontiguousarray(adjacency),)
+    blocks, spec = [], []
+    for array in arrays:
+        block = shared_memory.SharedMemory(create=True, \
+                                           size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        spec.append((block.name, array.shape, array.dtype.str))
+    return blocks, (kind, shape, spec)
+
+def _attach(description):
+    # Rebuilds the adjacency matrix from shared memory (without copying).
+    kind, shape, spec = description
+    arrays = []
+    for name, arrayShape, dtype in spec:
+        # The blocks are owned (and unlinked) by the parent process:
+        block = shared_memory.SharedMemory(name=name)
+        _SHARED.append(block)
+        array = np.ndarray(arrayShape, dtype, buffer=block.buf)
+        array.flags.writeable = False
+        arrays.append(array)
+    if kind == "csr":
+        return sp.csr_matrix(tuple(arrays), shape=shape, copy=False)
+    return arrays[0]
+
+def _initWorker(description):
+    global _ADJACENCY
+    if description is not None:
+        _ADJACENCY = _attach(description)
+
+def _runTask(scenario, collect, runArgs, index, params, seed):
+    # Runs one scenario. Exceptions are returned (with the traceback) so
+    # that one failing scenario does not stop the sweep.
+    try:
+        rng = np.random.default_rng(seed)
+        mas = scenario(params, rng, _ADJACENCY)
+        mas.run(**runArgs)
+        return index, collect(mas, params), None
+    except Exception:
+        return index, None, traceback.format_exc()
+
+def finalStates(mas, params):
+    """
+    The default collect function of Sweep. It returns the final time and
+    the final states of all agents with shape (numOfAgents, ns).
+    """
+    return {"time": mas.network.agents[0].time[-1], \
+            "states": mas.engine.states()}
+
+# %% The result store class
+class SweepStore:
+
+    def __init__(self, directory: str=None):
+        """
+        An indexed store of sweep results. Each task is stored under its
+        index with its parameters, seed and result (a dict of arrays) or
+        error. If a directory is given, results are also streamed to it as
+        they arrive:
+            index.jsonl     : one line {index, params, seed, error} per task
+            task_<index>.npz: the result of the task
+
+        Parameters
+        ----------
+        directory : str, optional
+            The directory of the store. The default is None (in memory).
+
+        """
+        self.directory = directory
+        self.params = {}
+        self.seeds = {}
+        self.results = {}
+        self.errors = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self.params)
+
+    def add(self, index: int, params: dict, seed, result=None, error=None):
+        self.params[index] = params
+        self.seeds[index] = seed
+        if error is not None:
+            self.errors[index] = error
+        else:
+            self.results[index] = result
+        if self.directory is None:
+            return
+        if error is None:
+            np.savez(os.path.join(self.directory, \
+                                  "task_{}.npz".format(index)), **result)
+        with open(os.path.join(self.directory, "index.jsonl"), "a") as file:
+            file.write(json.dumps({"index": index, "params": params, \
+                                   "seed": seed, "error": error}, \
+                                  default=_jsonDefault) + "\n")
+
+    def stack(self, key: str) -> np.ndarray:
+        """
+        Returns the results for 'key' of all successful tasks stacked in the
+        order of the task indices (see indices()).
+        """
+        return np.stack([np.asarray(self.results[i][key]) \
+                         for i in self.indices()])
+
+    def indices(self):
+        """
+        Returns the sorted indices of the successful tasks.
+        """
+        return sorted(self.results)
+
+    @staticmethod
+    def load(directory: str):
+        """
+        Opens a store which was written to a directory.
+        """
+        store = SweepStore()
+        with open(os.path.join(directory, "index.jsonl")) as file:
+            for line in file:
+                entry = json.loads(line)
+                index = entry["index"]
+                result = None
+                if entry["error"] is None:
+                    path = os.path.join(directory, "task_{}.npz".format(index))
+                    with np.load(path) as data:
+                        result = dict(data)
+                store.add(index, entry["params"], entry["seed"], result, \
+                          entry["error"])
+        store.directory = directory
+        return store
+
+def _jsonDefault(value):
+    # Parameters may contain numpy scalars or arrays.
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("{} is not JSON serializable.".format(type(value)))
+
+# %% The sweep class
+class Sweep:
+
+    def __init__(self, scenario, *, grid: dict=None, sampler=None, \
+                 samples: int=None, seed=None, adjacency=None, \
+                 collect=finalStates, **runArgs):
+        """
+        Runs many MAS simulations which differ only in their parameters
+        (e.g. initial states, fault times or magnitudes) on a pool of
+        processes.
+
+        The scenarios are built by a factory function in the worker
+        processes:
+            scenario(params, rng, adjacency) -> MAS
+        where params is a dict of the task's parameters, rng is a
+        numpy.random.Generator seeded for the task, and adjacency is the
+        adjacency matrix (shared read-only between the processes through
+        shared memory, so it is not copied for each task).
+
+        *** scenario, sampler and collect must be picklable (e.g. functions
+        defined at module level) to be sent to the worker processes. ***
+
+        Example:
+            def scenario(params, rng, adjacency):
+                agents = [MyAgent(init_states=rng.normal(size=2), index=i)
+                          for i in range(adjacency.shape[0])]
+                net = Network(adjacency, agents)
+                return MAS(net, MyDcontroller(net, params["gain"]))
+
+            sweep = Sweep(scenario, grid={"gain": [0.5, 1, 2]}, seed=1,
+                          adjacency=Adj, end_time=15, time_step=0.05)
+            store = sweep.run(workers=4)
+            finalStates = store.stack("states")
+
+        Parameters
+        ----------
+        scenario : callable
+            The scenario factory (see above).
+        grid : dict, optional and Keyword-only argument
+            Lists of values for each parameter. One task is run for every
+            combination of them. The default is None.
+        sampler : callable, optional and Keyword-only argument
+            A function sampler(rng) -> params which draws random parameters.
+            It is called 'samples' times with a generator seeded by 'seed'.
+            If grid is also given, each grid point is combined with each
+            sample. The default is None.
+        samples : int, optional and Keyword-only argument
+            The number of samples drawn by sampler (or the number of
+            repetitions of each grid point with different seeds if there is
+            no sampler). The default is 1.
+        seed : int, optional and Keyword-only argument
+            The seed of the sweep. The seeds of the tasks are spawned from
+            it by numpy.random.SeedSequence, so the results do not depend on
+            the number of workers or on the order of execution. The default
+            is None (fresh entropy).
+        adjacency : numpy 2D array or scipy sparse matrix, optional and
+            Keyword-only argument. The adjacency matrix shared with the
+            scenarios. The default is None.
+        collect : callable, optional and Keyword-only argument
+            A function collect(mas, params) -> dict which extracts the
+            results of a finished run as a dict of arrays. The default is
+            finalStates().
+        **runArgs :
+            The arguments of MAS.run() (init_time, end_time, time_step,
+            engine, recording).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.scenario = scenario
+        self.grid = grid
+        self.sampler = sampler
+        self.samples = 1 if samples is None else int(samples)
+        self.seedSequence = np.random.SeedSequence(seed)
+        self.adjacency = adjacency
+        self.collect = collect
+        self.runArgs = runArgs
+
+    def tasks(self):
+        """
+        Returns the list of (index, params, seed) of the tasks. The seeds
+        are the entropy of the spawned SeedSequences (so they are stored
+        with the results and can be used to rerun a single task).
+        """
+        if self.grid is None:
+            points = [{}]
+        else:
+            names = list(self.grid)
+            points = [dict(zip(names, values)) for values in \
+                      itertools.product(*(self.grid[n] for n in names))]
+        # A fresh SeedSequence (spawn() is stateful) so that the tasks are
+        # the same in every call. The sampler has its own stream:
+        root = np.random.SeedSequence(self.seedSequence.entropy)
+        samplerSeed, taskSeed = root.spawn(2)
+        if self.sampler is not None:
+            rng = np.random.default_rng(samplerSeed)
+            draws = [self.sampler(rng) for _ in range(self.samples)]
+        else:
+            draws = [{}] * self.samples
+        params = [dict(point, **draw) for point in points for draw in draws]
+        seeds = taskSeed.spawn(len(params))
+        return [(i, p, s.generate_state(4).tolist()) \
+                for i, (p, s) in enumerate(zip(params, seeds))]
+
+    def run(self, workers: int=None, store: SweepStore=None) -> SweepStore:
+        """
+        Runs all tasks and returns the store of results.
+
+        Parameters
+        ----------
+        workers : int, optional
+            The number of worker processes. If 0, the tasks are run in this
+            process (e.g. for debugging). The default is os.cpu_count().
+        store : SweepStore, optional
+            The store which receives the results as soon as each task is
+            finished (e.g. SweepStore("results/sweep1") to stream them to
+            disk). The default is a new in-memory store.
+
+        Returns
+        -------
+        The SweepStore of the results.
+
+        """
+        global _ADJACENCY
+        if store is None:
+            store = SweepStore()
+        tasks = self.tasks()
+        if workers is None:
+            workers = os.cpu_count()
+        if workers == 0:
+            _ADJACENCY = self.adjacency
+            try:
+                for index, params, seed in tasks:
+                    self._store(store, tasks, _runTask(self.scenario, \
+                        self.collect, self.runArgs, index, params, seed))
+            finally:
+                _ADJACENCY = None
+            return store
+        blocks, description = [], None
+        if self.adjacency is not None:
+            blocks, description = _share(self.adjacency)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, \
+                                     initializer=_initWorker, \
+                                     initargs=(description,)) as executor:
+                futures = [executor.submit(_runTask, self.scenario, \
+                                           self.collect, self.runArgs, \
+                                           index, params, seed) \
+                           for index, params, seed in tasks]
+                # Results are stored in the order they are finished:
+                for future in as_completed(futures):
+                    self._store(store, tasks, future.result())
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+        return store
+
+    def _store(self, store, tasks, output):
+        index, result, error = output
+        _, params, seed = tasks[index]
+        store.add(index, params, seed, result, error)
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("sweep.py is not an executable module!")
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the Termination class.
+"""
+
+# %% Imports
+# Standard library imports
+from abc import ABC, abstractmethod
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+
+# %% The termination criterion class
+class Termination(ABC):
+
+    def __init__(self, tol: float, dwell: float=0, *, components=None):
+        """
+        A criterion which ends MAS.run() early, when the disagreement of the
+        agents has stayed below tol for (at least) dwell seconds. It is
+        evaluated once per step on the stacked current states, in
+        O(numOfAgents * ns).
+
+        After the run, convergenceTime is the time from which the
+        disagreement stayed below tol (None if the agents did not converge),
+        and time is the time at which the run was ended.
+
+        Parameters
+        ----------
+        tol : float
+            The tolerance of the disagreement.
+        dwell : float, optional
+            The time (in seconds) the disagreement has to stay below tol.
+            The default is 0.
+        components : list of int, optional and Keyword-only argument
+            The state components which are compared (e.g. only positions).
+            The default is None (all components).
+
+        Returns
+        -------
+        None.
+
+        """
+        self.tol = tol
+        self.dwell = dwell
+        self.components = components
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the previous run. It is called by MAS.run().
+        """
+        self.convergenceTime = None
+        self.time = None
+        self.value = None
+        self._since = None
+
+    def getState(self) -> dict:
+        """
+        Returns the state of the criterion for a checkpoint (see
+        MAS.checkpoint()).
+        """
+        return {"convergenceTime": self.convergenceTime, "time": self.time, \
+                "value": self.value, "since": self._since}
+
+    def setState(self, state: dict):
+        """
+        Restores a state returned by getState() (after reset()).
+        """
+        self.convergenceTime = state["convergenceTime"]
+        self.time = state["time"]
+        self.value = state["value"]
+        self._since = state["since"]
+
+    @abstractmethod
+    def disagreement(self, X: np.ndarray) -> float:
+        """
+        Returns the disagreement of the states X with shape
+        (numOfAgents, ns).
+        """
+        pass
+
+    def update(self, t: float, X: np.ndarray) -> bool:
+        """
+        Updates the criterion with the states X at time t. Returns True if
+        the run should end.
+        """
+        if self.components is not None:
+            X = X[:, self.components]
+        self.value = self.disagreement(X)
+        if self.value >= self.tol:
+            self._since = None
+            return False
+        if self._since is None:
+            self._since = t
+        if t - self._since >= self.dwell:
+            self.convergenceTime = self._since
+            self.time = t
+            return True
+        return False
+
+# %% The pairwise disagreement class
+class PairwiseDisagreement(Termination):
+    """
+    The largest difference between two agents in any state component,
+    max_k (max_i x_ik - min_i x_ik), i.e. the maximum pairwise disagreement
+    in the infinity norm. It is computed in O(numOfAgents * ns) without
+    forming the pairs. For the parameters see Termination.
+    """
+
+    def disagreement(self, X):
+        return float(np.max(np.ptp(X, axis=0)))
+
+# %% The average disagreement class
+class AverageDisagreement(Termination):
+    """
+    The largest (Euclidean) distance of an agent to the average of all
+    agents, max_i ||x_i - mean(x)||. For the parameters see Termination.
+    """
+
+    def disagreement(self, X):
+        D = X - X.mean(axis=0)
+        return float(np.sqrt(np.max(np.einsum("ij,ij->i", D, D))))
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("termination.py is not an executable module!")
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.channel.Channel class
+"""
+
+# Standard library imports
+from types import SimpleNamespace
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+import testing
+from pymas.channel import Channel
+from pymas.network import Network
+
+if __name__ == "__main__":
+
+    # A directed ring of 3 agents: 0 -> 1 -> 2 -> 0 (ns=1)
+    A = np.roll(np.eye(3), 1, axis=1)
+    agents = [SimpleNamespace(ns=1) for i in range(3)]
+
+    def run(channel, steps):
+        # The received values of 'steps' time steps (the sent states of step
+        # k are k, 10 + k and 20 + k)
+        net = Network(A, agents, links=channel)
+        channel.start(SimpleNamespace(network=net, time_step=0.5))
+        X = np.array([[0], [10], [20]])
+        return np.array([channel.transmit(0.5 * k, X + k)[0].ravel() \
+                         for k in range(steps)])
+
+    # Constant delays (in time steps) and jitter:
+    channel = Channel()
+    channel.setDelay([(0, 1)], 1.0)
+    channel.setDelay([(1, 2)], 0.5, jitter=0.5)
+    V = run(channel, 6)
+    assert np.array_equal(V[:, 0], [0, 0, 0, 1, 2, 3])
+    assert np.all((V[1:, 1] <= 10 + np.arange(5)) & \
+                  (V[1:, 1] >= 10 + np.arange(5) - 1))
+    assert np.array_equal(V[:, 2], 20 + np.arange(6))
+    assert channel._ring.size == 4 # The ring is sized to the longest delay
+
+    # Lost packets hold the last received value:
+    channel = Channel(seed=1)
+    channel.setLoss([(2, 0)], p=0.5)
+    V = run(channel, 50)
+    held = np.diff(V[:, 2]) == 0
+    assert held.any() and not held.all()
+    assert np.array_equal(V[:, 0], np.arange(50))
+    # Runs are reproducible:
+    assert np.array_equal(run(channel, 50), V)
+
+    # Gilbert-Elliott losses come in bursts (no losses in the good state):
+    channel = Channel(seed=2)
+    channel.setLoss(goodToBad=0.05, badToGood=0.2)
+    V = run(channel, 400)
+    lost = np.diff(V, axis=0) == 0
+    assert 0.05 < lost.mean() < 0.4
+    assert (lost[1:] & lost[:-1]).mean() > 0.5 * lost.mean()
+
+    print("Channel tests passed.")
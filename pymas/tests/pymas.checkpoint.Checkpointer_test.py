@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.checkpoint.Checkpointer class
+"""
+
+# Standard library imports
+import os
+import tempfile
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.eventtriggered import EventTriggeredConsensus
+from pymas.channel import Channel
+from pymas.schedule import MarkovSchedule, removeEdges
+from pymas.termination import PairwiseDisagreement
+from pymas.recording import RecordingPolicy
+from pymas.mas import MAS
+from pymas.checkpoint import Checkpointer
+from pymas.recorder import MemmapRecorder
+from pymas.engines import AsyncEngine
+
+if __name__ == "__main__":
+
+    # A ring of 10 agents with a random channel, random switching and an
+    # event-triggered controller (all with internal states)
+    N = 10
+    ring = np.arange(N)
+    Adj = sp.csr_matrix((np.ones(2 * N), \
+                         (np.concatenate((ring, ring)), \
+                          np.concatenate(((ring + 1) % N, (ring - 1) % N)))), \
+                        shape=(N, N))
+    X0 = np.random.default_rng(0).normal(size=(N, 2))
+    def build():
+        agents = [LTIAgent([[0, 1], [-1, -1]], [[0], [1]], \
+                           init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        channel = Channel(seed=3)
+        channel.setDelay(delay=0.0625, jitter=0.125)
+        channel.setLoss(p=0.1, goodToBad=0.1, badToGood=0.3)
+        schedule = MarkovSchedule([Adj, removeEdges(Adj, [(0, 1), (1, 0)])], \
+                                  [[0.7, 0.3], [0.4, 0.6]], 0.25, seed=5)
+        net = Network(Adj, agents, schedule=schedule, links=channel)
+        return MAS(net, EventTriggeredConsensus(net, sigma=0.3)), agents
+    def trajectories(agents):
+        return [(a.time.copy(), a.stateTrajectHistory.copy(), \
+                 a.inputTrajectory.copy()) for a in agents]
+
+    path = os.path.join(tempfile.mkdtemp(), "ckpt")
+    for recording in (None, RecordingPolicy(every=3)):
+        mas, agents = build()
+        mas.run(0, 4, 0.0625, engine="batch", recording=recording, \
+                termination=PairwiseDisagreement(1e-4))
+        reference = trajectories(agents)
+
+        # Stopped after step 30 (checkpoints after steps 7, 14, 21, 28
+        # and 30)
+        mas, agents = build()
+        for snap in mas.iter_run(0, 4, 0.0625, engine="batch", \
+                                 recording=recording, \
+                                 termination=PairwiseDisagreement(1e-4), \
+                                 checkpoint=Checkpointer(path, every=7)):
+            if snap.step == 30:
+                mas.checkpoint(path)
+                break
+        assert len([name for name in os.listdir(path) \
+                    if name.startswith("chunk")]) == 5
+        assert len([name for name in os.listdir(path) \
+                    if name.startswith("state")]) == 1
+
+        # The resumed run is identical to the uninterrupted one
+        mas, agents = build()
+        mas.resume(path, engine="batch", recording=recording, \
+                   termination=PairwiseDisagreement(1e-4), \
+                   checkpoint=Checkpointer(path, every=7))
+        for a, b in zip(reference, trajectories(agents)):
+            for x, y in zip(a, b):
+                assert np.array_equal(x, y)
+
+        # The incremental checkpoints hold the whole run
+        state = Checkpointer.load(path)
+        assert state["run"]["step"] == 64 and state["run"]["finished"]
+        assert np.array_equal(state["agents"][3]["states"], reference[3][1])
+
+    # Runs which cannot be checkpointed fail before the first step
+    for engine, recorder in ((AsyncEngine(), None), \
+                             ("batch", MemmapRecorder(tempfile.mkdtemp()))):
+        mas, agents = build()
+        mas.recorder = recorder
+        try:
+            mas.run(0, 4, 0.0625, engine=engine, \
+                    checkpoint=Checkpointer(tempfile.mkdtemp(), every=1000))
+            assert False
+        except ValueError:
+            pass
+        assert all(len(agent.time) == 1 for agent in agents)
+
+    print("Checkpointer tests passed.")
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.dcontroller.Dcontroller class
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.dcontroller import Dcontroller
+from pymas.consensus import ConsensusDcontroller
+
+# A nonlinear protocol without a bulk implementation
+class SaturatedConsensus(Dcontroller):
+
+    def rule(self, agent, neighbour):
+        return np.tanh(neighbour.stateTrajectHistory[-1] - \
+                       agent.stateTrajectHistory[-1])
+
+    def controlProtocol(self, agentIndex, t):
+        agent = self.net.agents[agentIndex]
+        u = np.zeros(shape=(self.ni,))
+        for a_ji, neighbour in self.inNeighbours(agentIndex, t):
+            u += a_ji * self.rule(agent, neighbour)
+        return u
+
+if __name__ == "__main__":
+
+    # A directed, weighted graph of 7 agents
+    N = 7
+    rng = np.random.default_rng(6)
+    A = sp.random(N, N, density=0.4, random_state=7, format="csr")
+    A.setdiag(0)
+    A.eliminate_zeros()
+    X = rng.normal(size=(N, 2))
+    agents = [LTIAgent(np.zeros((2, 2)), np.eye(2), \
+                       init_states=X[i].copy(), index=i) for i in range(N)]
+    net = Network(A, agents)
+
+    # The default bulk protocol stacks the per-agent protocols
+    dcont = SaturatedConsensus(net)
+    assert not dcont.hasBulkProtocol()
+    stacked = np.array([dcont.controlProtocol(i, 0) for i in range(N)])
+    assert np.array_equal(dcont.controlProtocolAll(X, 0), stacked)
+    rows = np.array([5, 1, 3])
+    assert np.array_equal(dcont.controlProtocolAll(X, 0, rows), stacked[rows])
+
+    # The vectorized consensus protocol gives the same inputs
+    K = np.array([[1.0, 0.5], [0.0, 2.0]])
+    dcont = ConsensusDcontroller(net, K)
+    assert dcont.hasBulkProtocol()
+    stacked = np.array([dcont.controlProtocol(i, 0) for i in range(N)])
+    assert np.allclose(dcont.controlProtocolAll(X, 0), stacked)
+    assert np.allclose(dcont.controlProtocolAll(X, 0, rows), stacked[rows])
+    dense = A.toarray()
+    for i in range(N):
+        u = K @ sum(dense[j, i] * (X[j] - X[i]) for j in range(N))
+        assert np.allclose(stacked[i], u)
+
+    print("Dcontroller tests passed.")
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.engines.AsyncEngine class
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.dcontroller import Dcontroller
+from pymas.consensus import ConsensusDcontroller
+from pymas.faults import FaultInjector
+from pymas.engines import AsyncEngine
+from pymas.mas import MAS
+
+class PerAgentConsensus(ConsensusDcontroller):
+    # The same protocol, calculated agent by agent:
+    controlProtocolAll = Dcontroller.controlProtocolAll
+
+class SlowAgent(LTIAgent):
+    pass
+
+if __name__ == "__main__":
+
+    # A ring of 6 oscillators, the last three of class SlowAgent
+    N = 6
+    A = np.array([[0, 1], [-1, -1]])
+    B = np.array([[0], [1]])
+    K = np.array([[1, 0]])
+    Adj = np.roll(np.eye(N), 1, axis=1) + np.roll(np.eye(N), -1, axis=1)
+    X0 = np.random.default_rng(0).normal(size=(N, 2))
+    def build(controller=ConsensusDcontroller, faults=None):
+        agents = [(LTIAgent if i < 3 else SlowAgent)(A, B, \
+                  init_states=X0[i].copy(), index=i) for i in range(N)]
+        net = Network(Adj, agents)
+        return MAS(net, controller(net, K=K), faults=faults), agents
+    def trajectories(agents):
+        return [agent.stateTrajectHistory for agent in agents]
+
+    # With the time step as period, the same results as a synchronous run
+    mas, agents = build()
+    mas.run(0, 5, 0.0625, engine="batch")
+    reference = trajectories(agents)
+    mas, agents = build()
+    mas.run(0, 5, 0.0625, engine="async")
+    assert all(np.array_equal(x, y) for x, y in \
+               zip(trajectories(agents), reference))
+
+    # Multi-rate agents are recorded on their own time grids
+    engine = AsyncEngine(periods={SlowAgent: 0.25}, \
+                         control_periods={SlowAgent: 0.5})
+    mas, agents = build()
+    mas.run(0, 5, 0.0625, engine=engine)
+    assert agents[0].time.shape == (1 + 80 * 9,)
+    assert agents[5].time.shape == (1 + 20 * 9,)
+    assert np.allclose(agents[5].time[::9], np.arange(21) * 0.25)
+    # The slow inputs are held over two sampling periods
+    U = agents[5].inputTrajectory.reshape(-1)
+    assert np.array_equal(U[1:-1:2], U[2::2])
+    assert np.ptp(mas.engine.states(), axis=0).max() < \
+        np.ptp(X0, axis=0).max()
+
+    # Per-agent protocols see the published (held) states as well
+    multiRate = trajectories(agents)
+    mas, agents = build(PerAgentConsensus)
+    mas.run(0, 5, 0.0625, engine=AsyncEngine(periods={SlowAgent: 0.25}, \
+                                             control_periods={SlowAgent: 0.5}))
+    assert all(np.allclose(x, y) for x, y in \
+               zip(trajectories(agents), multiRate))
+
+    # Offsets desynchronize the agents
+    mas, agents = build()
+    mas.run(0, 1, 0.0625, engine=AsyncEngine(periods=0.125, \
+                                             offsets=[0, 0.0625] * 3))
+    assert agents[0].time[9] == 0.125 and agents[1].time[9] == 0.0625
+
+    # Faults are applied to the published states and the held inputs
+    faults = FaultInjector()
+    faults.add("actuator", "bias", agents=0, value=1.0)
+    mas, agents = build(faults=faults)
+    mas.run(0, 1, 0.0625, engine="async")
+    assert np.allclose(mas.engine.U[0] - mas.engine.commanded[0], 1.0)
+
+    # Periods have to be positive
+    try:
+        build()[0].run(0, 1, 0.0625, engine=AsyncEngine(periods=0))
+        assert False
+    except ValueError:
+        pass
+
+    print("AsyncEngine tests passed.")
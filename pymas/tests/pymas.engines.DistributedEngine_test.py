@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.engines.DistributedEngine class
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.mas import MAS
+from pymas.engines import BatchEngine, DistributedEngine
+from pymas.engines.distributed import partition, cutEdges
+
+if __name__ == "__main__":
+
+    # A ring of 40 agents with shuffled indices
+    N = 40
+    rng = np.random.default_rng(0)
+    perm = rng.permutation(N)
+    ring = np.arange(N)
+    Adj = sp.csr_matrix((np.ones(2 * N), \
+                         (perm[np.concatenate((ring, ring))], \
+                          perm[np.concatenate(((ring + 1) % N, \
+                                               (ring - 1) % N))])), \
+                        shape=(N, N))
+
+    # The partition cuts few edges of the ring (a random one cuts most)
+    groups = partition(Adj, 4)
+    assert sorted(np.concatenate(groups).tolist()) == list(range(N))
+    assert cutEdges(Adj, groups) <= 16
+    assert cutEdges(Adj, np.array_split(np.arange(N), 4)) > 40
+
+    A = np.array([[0, 1], [-2, -1]])
+    B = np.array([[0.5], [1]])
+    X0 = rng.normal(size=(N, 2))
+    def build():
+        agents = [LTIAgent(A, B, init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        return MAS(net, ConsensusDcontroller(net)), agents
+
+    # Bit-for-bit the same as the single-process fixed-step engine
+    mas, reference = build()
+    mas.run(0, 1, 0.05, engine=BatchEngine(method="rk4"))
+    mas, agents = build()
+    mas.run(0, 1, 0.05, engine=DistributedEngine(3))
+    for a, b in zip(reference, agents):
+        assert np.array_equal(a.time, b.time)
+        assert np.array_equal(a.stateTrajectHistory, b.stateTrajectHistory)
+        assert np.array_equal(a.inputTrajectory, b.inputTrajectory)
+
+    # Stopping early releases the workers
+    mas, agents = build()
+    for snap in mas.iter_run(0, 1, 0.05, engine=DistributedEngine(2)):
+        if snap.step == 5:
+            break
+    assert len(agents[0].inputTrajectory) == 6
+
+    print("DistributedEngine tests passed.")
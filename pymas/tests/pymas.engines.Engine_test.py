@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Test the pymas.engines engines on the same consensus MAS
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.eventtriggered import EventTriggeredConsensus
+from pymas.schedule import TopologySchedule, removeEdges
+from pymas.channel import Channel
+from pymas.mas import MAS
+from pymas.engines import getEngine, MonolithicEngine, LTIEngine
+
+if __name__ == "__main__":
+
+    # A directed, weighted graph of 12 agents (a ring with chords)
+    N = 12
+    ring = np.arange(N)
+    Adj = sp.csr_matrix((np.concatenate((np.ones(N), 0.5 * np.ones(N))), \
+                         (np.concatenate((ring, ring)), \
+                          np.concatenate(((ring + 1) % N, (ring + 5) % N)))), \
+                        shape=(N, N))
+    A = np.array([[0, 1], [-1, -0.5]])
+    B = np.array([[0], [1]])
+    X0 = np.random.default_rng(4).normal(size=(N, 2))
+    def run(engine, end_time=2, time_step=0.03125):
+        agents = [LTIAgent(A, B, init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        MAS(net, ConsensusDcontroller(net)).run(0, end_time, time_step, \
+                                                engine=engine)
+        return agents
+
+    # Piecewise constant inputs: the engines agree up to the solvers
+    reference = run("agent")
+    for engine in ("monolithic", "batch", "lti", "jit", \
+                   MonolithicEngine(mode="step")):
+        agents = run(engine)
+        for a, b in zip(reference, agents):
+            assert np.array_equal(a.time, b.time)
+            assert np.allclose(a.stateTrajectHistory, b.stateTrajectHistory, \
+                               rtol=0, atol=1e-5)
+            assert np.allclose(a.inputTrajectory, b.inputTrajectory, \
+                               rtol=0, atol=1e-5)
+
+    # Continuous state feedback: the horizon mode and the closed-loop
+    # LTIEngine agree with each other, and with the sampled engines up to
+    # the sampling error
+    horizon = run(MonolithicEngine(mode="horizon"))
+    closed = run(LTIEngine(closed_loop=True))
+    for a, b, c in zip(reference, horizon, closed):
+        assert np.array_equal(a.time, b.time)
+        assert np.allclose(b.stateTrajectHistory, c.stateTrajectHistory, \
+                           rtol=0, atol=1e-5)
+        assert np.allclose(a.stateTrajectHistory, b.stateTrajectHistory, \
+                           rtol=0, atol=0.1)
+
+    # The horizon mode (solved before the first step) rejects switching
+    # topologies, link layers and controllers with an internal state
+    def horizon(**kwargs):
+        agents = [LTIAgent(A, B, init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        controller = kwargs.pop("controller", ConsensusDcontroller)
+        net = Network(Adj, agents, **kwargs)
+        MAS(net, controller(net)).run(0, 1, 0.0625, \
+                                      engine=MonolithicEngine(mode="horizon"))
+    schedule = TopologySchedule([(0, Adj), (0.5, removeEdges(Adj, [(0, 1)]))])
+    for kwargs in ({"schedule": schedule}, {"links": Channel()}, \
+                   {"controller": EventTriggeredConsensus}):
+        try:
+            horizon(**kwargs)
+            assert False
+        except ValueError:
+            pass
+    horizon()
+
+    # A subclass which only overrides f() is not evaluated by the f_batch()
+    # and f_kernel() of its parent class
+    class DriftingAgent(LTIAgent):
+        def f(self, x, t, u):
+            return LTIAgent.f(self, x, t, u) + np.array([0.0, 1.0])
+    agent = DriftingAgent(A, B, init_states=X0[0].copy(), index=0)
+    assert agent.batchDynamics() is None
+    assert agent.batchDynamics("f_kernel") is None
+    assert LTIAgent(A, B, init_states=X0[0].copy(), \
+                    index=0).batchDynamics() is not None
+    def drifting(engine):
+        agents = [DriftingAgent(A, B, init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        MAS(net, ConsensusDcontroller(net)).run(0, 1, 0.0625, engine=engine)
+        return agents
+    reference = drifting("agent")
+    assert not np.allclose(reference[0].stateTrajectHistory, \
+                           run("agent", 1, 0.0625)[0].stateTrajectHistory)
+    for engine in ("batch", "jit", "async"):
+        for a, b in zip(reference, drifting(engine)):
+            assert np.allclose(a.stateTrajectHistory, b.stateTrajectHistory, \
+                               rtol=0, atol=1e-5)
+
+    # Engines are selected by name or passed as instances
+    engine = LTIEngine()
+    assert getEngine(engine) is engine
+    assert type(getEngine()).__name__ == "AgentEngine"
+    for name in ("rk4", "Batch", ""):
+        try:
+            getEngine(name)
+            assert False
+        except ValueError:
+            pass
+    try:
+        MonolithicEngine(mode="stepwise")
+        assert False
+    except ValueError:
+        pass
+
+    print("Engine tests passed.")
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.engines.JITEngine class
+"""
+
+# Standard library imports
+import sys
+import subprocess
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.mas import MAS
+from pymas.engines import BatchEngine, MonolithicEngine, JITEngine
+
+if __name__ == "__main__":
+
+    # A ring of 30 agents
+    N = 30
+    ring = np.arange(N)
+    Adj = sp.csr_matrix((np.ones(2 * N), \
+                         (np.concatenate((ring, ring)), \
+                          np.concatenate(((ring + 1) % N, (ring - 1) % N)))), \
+                        shape=(N, N))
+    A = np.array([[0, 1], [-2, -1]])
+    B = np.array([[0.5], [1]])
+    X0 = np.random.default_rng(0).normal(size=(N, 2))
+    def build():
+        agents = [LTIAgent(A, B, init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        return MAS(net, ConsensusDcontroller(net)), agents
+
+    # The same as the fixed-step engines (bit-for-bit without Numba)
+    for method in ("rk4", "dopri5"):
+        mas, reference = build()
+        mas.run(0, 1, 0.0625, engine=MonolithicEngine(method=method))
+        mas, agents = build()
+        mas.run(0, 1, 0.0625, engine=JITEngine(method=method))
+        for a, b in zip(reference, agents):
+            assert np.array_equal(a.time, b.time)
+            assert np.allclose(a.stateTrajectHistory, b.stateTrajectHistory, \
+                               rtol=0, atol=1e-12)
+            assert np.allclose(a.inputTrajectory, b.inputTrajectory, \
+                               rtol=0, atol=1e-12)
+
+    # Agents without f_kernel are evaluated by their f_batch
+    mas, reference = build()
+    mas.run(0, 1, 0.0625, engine=BatchEngine(method="rk4"))
+    mas, agents = build()
+    for agent in agents:
+        agent.f_kernel = None
+    mas.run(0, 1, 0.0625, engine="jit")
+    for a, b in zip(reference, agents):
+        assert np.allclose(a.stateTrajectHistory, b.stateTrajectHistory, \
+                           rtol=0, atol=1e-12)
+
+    # More substeps converge to the adaptive solution
+    mas, reference = build()
+    mas.run(0, 1, 0.0625)
+    mas, agents = build()
+    mas.run(0, 1, 0.0625, engine=JITEngine(method="dopri5", substeps=4))
+    assert np.allclose(reference[0].stateTrajectHistory, \
+                       agents[0].stateTrajectHistory, atol=1e-6)
+
+    try:
+        JITEngine(method="odeint")
+        assert False
+    except ValueError:
+        pass
+
+    # Importing pymas does not import Numba
+    code = "import sys, pymas.mas; print('numba' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd="../..", \
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+    print("JITEngine tests passed.")
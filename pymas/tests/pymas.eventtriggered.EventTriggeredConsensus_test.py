@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.eventtriggered.EventTriggeredConsensus class
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.eventtriggered import EventTriggeredConsensus
+from pymas.mas import MAS
+from pymas.engines import LTIEngine
+
+if __name__ == "__main__":
+
+    # A weighted directed ring of 6 agents with one chord (0 -> 3)
+    N = 6
+    ring = np.arange(N)
+    Adj = sp.csr_matrix((np.concatenate((np.ones(N), [2.0])), \
+                         (np.concatenate((ring, [0])), \
+                          np.concatenate(((ring + 1) % N, [3])))), \
+                        shape=(N, N))
+    X0 = np.random.default_rng(1).normal(size=(N, 2))
+    def build(**kwargs):
+        agents = [LTIAgent([[0, 1], [0, -1]], [[0], [1]], \
+                           init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        return net, EventTriggeredConsensus(net, **kwargs)
+
+    # The first call broadcasts all states: the aggregates are -L xh
+    net, dcont = build(sigma=0.5, offset=0.1, decay=2.0)
+    L = net.topology.laplacian()
+    U = dcont.controlProtocolAll(X0, 0)
+    assert np.allclose(dcont._Z, -(L @ X0))
+    assert np.allclose(U, -(L @ X0) @ dcont.K.T)
+    assert dcont.events == N and dcont.steps == 1
+
+    # The trigger ||xh_i - x_i|| > sigma ||z_i|| + c0 exp(-alpha t)
+    t = 0.5
+    bound = dcont.sigma * np.linalg.norm(dcont._Z, axis=1) + \
+        0.1 * np.exp(-2.0 * t)
+    assert np.isclose(dcont.threshold(t), 0.1 * np.exp(-1.0))
+    X = X0.copy()
+    X[1] += [bound[1] * 1.01, 0]      # Just above the threshold
+    X[4] += [0, bound[4] * 0.99]      # Just below the threshold
+    assert list(dcont.triggered(X, t)) == [1]
+    # At t = 0 the offset is larger (0.1 instead of 0.1 exp(-1))
+    assert bound[1] * 1.01 < bound[1] - 0.1 * np.exp(-1.0) + 0.1
+    assert list(dcont.triggered(X, 0)) == []
+
+    # A broadcast updates the cached aggregates to -L xh
+    U = dcont.controlProtocolAll(X, t)
+    xhat = X0.copy()
+    xhat[1] = X[1]
+    assert np.array_equal(dcont._xhat, xhat)
+    assert np.allclose(dcont._Z, -(L @ xhat))
+    assert np.allclose(U, -(L @ xhat) @ dcont.K.T)
+
+    # The counters: one message over each out-edge of agent 1 (1 -> 2)
+    assert dcont.events == N + 1 and dcont.steps == 2
+    assert np.array_equal(dcont.broadcasts, [1, 2, 1, 1, 1, 1])
+    counts = dcont.transmissionCounts().toarray()
+    expected = (Adj.toarray() != 0).astype("int64")
+    expected[1, 2] += 1
+    assert np.array_equal(counts, expected)
+    assert np.isclose(dcont.savings(), 1 - (N + 1) / (2 * N))
+
+    # A run saves messages, and reset() starts each run afresh
+    net, dcont = build(sigma=0.3, offset=1e-3)
+    mas = MAS(net, dcont)
+    mas.run(0, 5, 0.0625, engine="batch")
+    events, saved = dcont.events, dcont.savings()
+    assert 0 < saved < 1 and dcont.steps == 80
+    counts = dcont.transmissionCounts()
+    assert counts.nnz == Adj.nnz
+    assert counts.sum() == sum(dcont.broadcasts[j] * Adj[j].nnz \
+                               for j in range(N))
+    # A second run (from the final states) starts with a fresh controller
+    final = np.array([a.stateTrajectHistory[-1] for a in net.agents])
+    mas.run(0, 5, 0.0625, engine="batch")
+    events, saved = dcont.events, dcont.savings()
+    assert dcont.steps == 80
+    X0 = final
+    net, dcont = build(sigma=0.3, offset=1e-3)
+    MAS(net, dcont).run(0, 5, 0.0625, engine="batch")
+    assert dcont.events == events and dcont.savings() == saved
+    X0 = np.random.default_rng(1).normal(size=(N, 2))
+
+    # The closed-loop LTIEngine only accepts a plain ConsensusDcontroller
+    net, dcont = build(sigma=0.3)
+    try:
+        MAS(net, dcont).run(0, 1, 0.05, engine=LTIEngine(closed_loop=True))
+        assert False
+    except TypeError:
+        pass
+    agents = [LTIAgent([[0, 1], [0, -1]], [[0], [1]], \
+                       init_states=X0[i].copy(), index=i) for i in range(N)]
+    net = Network(Adj, agents)
+    MAS(net, ConsensusDcontroller(net)).run(0, 1, 0.05, \
+        engine=LTIEngine(closed_loop=True))
+
+    print("EventTriggeredConsensus tests passed.")
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.faults.FaultInjector class
+"""
+
+# Standard library imports
+from types import SimpleNamespace
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+import testing
+from pymas.faults import FaultInjector
+
+if __name__ == "__main__":
+
+    # A stand-in for a MAS of 4 agents with ns=2 and ni=1
+    agent = SimpleNamespace(ns=2, ni=1)
+    mas = SimpleNamespace(network=SimpleNamespace(agents=[agent] * 4))
+
+    faults = FaultInjector()
+    faults.add("actuator", "bias", agents=[1, 3], value=0.5, start=1, stop=2)
+    faults.add("actuator", "stuck", agents=2, value=-1, start=0, period=1, \
+               duty=0.25)
+    faults.add("sensor", "drift", agents=0, value=[1, 2], start=1)
+    faults.add("sensor", "stuck", agents=3, value=7, components=[1])
+    faults.start(mas)
+
+    U = np.zeros(shape=(4, 1))
+    # No active actuator fault: U is returned as it is
+    assert faults.actuate(0.5, U) is U
+    assert np.allclose(faults.actuate(1.5, U).ravel(), [0, 0.5, 0, 0.5])
+    # The intermittent fault is active in [k, k + 0.25):
+    assert np.allclose(faults.actuate(2.1, U).ravel(), [0, 0, -1, 0])
+    # Subsets of the agents (as in DistributedEngine workers):
+    rows = np.array([2, 3])
+    assert np.allclose(faults.actuate(1.1, U[rows], rows).ravel(), [-1, 0.5])
+    assert not U.any()
+
+    X = np.ones(shape=(4, 2))
+    Xm = faults.measure(3, X)
+    assert np.allclose(Xm, [[3, 5], [1, 1], [1, 1], [1, 7]])
+    assert np.allclose(X, 1)
+
+    print("FaultInjector tests passed.")
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.links.LinkLayer class
+"""
+
+# Standard library imports
+from types import SimpleNamespace
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+import testing
+from pymas.links import LinkLayer
+from pymas.network import Network
+
+if __name__ == "__main__":
+
+    # A directed ring of 4 agents: 0 -> 1 -> 2 -> 3 -> 0 (ns=2)
+    A = np.roll(np.eye(4), 1, axis=1)
+    agents = [SimpleNamespace(ns=2, \
+                              stateTrajectHistory=np.zeros(shape=(1, 2))) \
+              for i in range(4)]
+    links = LinkLayer()
+    links.add("fdi", [(0, 1)], value=[1, 2], start=1, stop=2)
+    links.add("scale", [(1, 2), (2, 0)], factor=-1) # (2, 0) is not an edge
+    links.add("replay", [(2, 3)], delay=0.5, start=1)
+    links.add("jam", [(3, 0)], start=2)
+    net = Network(A, agents, links=links)
+    links.start(SimpleNamespace(network=net, time_step=0.25))
+
+    X = np.arange(8.0).reshape(4, 2)
+    for k in range(5): # t = 0, 0.25, ..., 1
+        V, delivered = links.transmit(0.25 * k, X + k)
+    # Edges in the CSR order: 0 -> 1, 1 -> 2, 2 -> 3, 3 -> 0
+    assert np.allclose(V, [[5, 7], [-6, -7], [6, 7], [10, 11]])
+    assert delivered.all()
+    # (The value sent at t=0.5 is replayed at t=1.)
+    # At t=2 (after the stop of fdi) the value of t=1 is held:
+    V, delivered = links.transmit(2, X)
+    assert np.allclose(V, [[0, 1], [-2, -3], [8, 9], [6, 7]])
+    assert list(delivered) == [True, True, True, False]
+
+    # Jammed links are left out:
+    sources, weights, values = links.received(2, 0)
+    assert len(sources) == 0
+    sources, weights, values = links.received(2, 1)
+    assert list(sources) == [0] and np.allclose(values, [[0, 1]])
+
+    print("LinkLayer tests passed.")
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.mas.MAS.iter_run method
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.mas import MAS
+
+if __name__ == "__main__":
+
+    # A ring of 6 agents
+    N = 6
+    ring = np.arange(N)
+    Adj = sp.csr_matrix((np.ones(2 * N), \
+                         (np.concatenate((ring, ring)), \
+                          np.concatenate(((ring + 1) % N, (ring - 1) % N)))), \
+                        shape=(N, N))
+    X0 = np.random.default_rng(8).normal(size=(N, 2))
+    def build():
+        agents = [LTIAgent([[0, 1], [-1, -1]], [[0], [1]], \
+                           init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        return MAS(net, ConsensusDcontroller(net)), agents
+
+    mas, reference = build()
+    mas.run(0, 2, 0.125, engine="batch")
+
+    # Snapshots after steps k, 2k, ... and after the last step (16)
+    for every, steps in ((1, list(range(1, 17))), (5, [5, 10, 15, 16]), \
+                         (4, [4, 8, 12, 16]), (20, [16])):
+        mas, agents = build()
+        snaps = list(mas.iter_run(0, 2, 0.125, engine="batch", every=every))
+        assert [snap.step for snap in snaps] == steps
+        assert np.allclose([snap.time for snap in snaps], \
+                           0.125 * np.array(steps))
+        for snap in snaps:
+            assert snap.states.shape == (N, 2) and snap.inputs.shape == (N, 1)
+        # The snapshots are the states of the agents at their times
+        for snap in snaps:
+            for i, agent in enumerate(agents):
+                k = np.flatnonzero(np.isclose(agent.time, snap.time))[0]
+                assert np.array_equal(agent.stateTrajectHistory[k], \
+                                      snap.states[i])
+        # The same trajectories as run()
+        for a, b in zip(reference, agents):
+            assert np.array_equal(a.time, b.time)
+            assert np.array_equal(a.stateTrajectHistory, b.stateTrajectHistory)
+
+    # break ends the run after the step of the snapshot
+    for engine in ("agent", "batch"):
+        mas, agents = build()
+        for snap in mas.iter_run(0, 2, 0.125, engine=engine, every=3):
+            if snap.step == 9:
+                break
+        for a, b in zip(reference, agents):
+            assert b.time[-1] == snap.time == 9 * 0.125
+            n = len(b.time)
+            assert len(b.stateTrajectHistory) == n
+            assert len(b.inputTrajectory) == 10
+            assert np.allclose(a.time[:n], b.time)
+            assert np.allclose(a.stateTrajectHistory[:n], \
+                               b.stateTrajectHistory, rtol=0, atol=1e-6)
+        assert np.array_equal(snap.states, \
+                              [agent.stateTrajectHistory[-1] \
+                               for agent in agents])
+
+    print("MAS tests passed.")
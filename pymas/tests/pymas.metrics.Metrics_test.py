@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.metrics.Metrics class
+"""
+
+# Standard library imports
+import tempfile
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.recording import RecordingPolicy
+from pymas.metrics import Metrics, Disagreement, ControlEnergy, \
+    ConvergenceRate, AverageDeviation
+from pymas.mas import MAS
+
+if __name__ == "__main__":
+
+    # Single integrators on a ring of 8 agents
+    N = 8
+    Adj = np.roll(np.eye(N), 1, axis=1) + np.roll(np.eye(N), -1, axis=1)
+    X0 = np.random.default_rng(0).normal(size=(N, 1))
+    def build():
+        agents = [LTIAgent([[0]], [[1]], init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        return MAS(net, ConsensusDcontroller(net)), agents
+    def metrics(**kwargs):
+        return Metrics([Disagreement(window=10), ControlEnergy(), \
+                        ConvergenceRate(), AverageDeviation()], **kwargs)
+
+    # The metrics agree with the recorded trajectories
+    mas, agents = build()
+    m = metrics()
+    mas.run(0, 10, 0.0625, engine="lti", metrics=m)
+    report = m.report()
+    X = np.stack([agent.stateTrajectHistory[:, 0] for agent in agents], axis=1)
+    U = np.stack([agent.inputTrajectory.reshape(-1) for agent in agents], \
+                 axis=1)
+    energy = (U[1:] ** 2).sum(axis=0) * 0.0625
+    assert np.allclose(report["controlEnergy"]["integral"], energy)
+    assert np.isclose(report["controlEnergy"]["total"], energy.sum())
+    norms = np.linalg.norm(X - X.mean(axis=1, keepdims=True), axis=1)
+    assert np.isclose(report["disagreement"]["value"], norms[-1])
+    assert np.isclose(report["disagreement"]["maximum"], norms.max())
+    assert report["disagreement"]["timeOfMaximum"] == 0
+    # (9 samples per step with evolve_points=10)
+    assert np.isclose(report["disagreement"]["windowMean"], \
+                      norms[::9][-10:].mean())
+    deviations = np.abs(X[-1] - X[-1].mean())
+    assert np.allclose(report["deviation"]["value"], deviations)
+
+    # The convergence rate is the algebraic connectivity of the ring
+    L = np.diag(Adj.sum(axis=0)) - Adj.T
+    rate = np.sort(np.linalg.eigvalsh(L))[1]
+    assert abs(report["convergenceRate"]["value"] - rate) < 0.05 * rate
+
+    # The same numbers without recording the trajectories
+    mas, agents = build()
+    reports = []
+    m = metrics(callback=reports.append, every=40)
+    mas.run(0, 10, 0.0625, engine="lti", metrics=m, \
+            recording=RecordingPolicy(endpoints=True, window=1))
+    assert agents[0].time.shape == (1,)
+    assert m.report()["controlEnergy"]["total"] == \
+        report["controlEnergy"]["total"]
+    assert len(reports) == 4
+
+    # Resumed runs give the same metrics
+    path = tempfile.mkdtemp()
+    mas, agents = build()
+    m = metrics()
+    for snap in mas.iter_run(0, 10, 0.0625, engine="lti", metrics=m):
+        if snap.step == 50:
+            mas.checkpoint(path).result()
+            break
+    mas, agents = build()
+    m = metrics()
+    mas.resume(path, engine="lti", metrics=m)
+    resumed = m.report()
+    assert resumed["controlEnergy"]["total"] == \
+        report["controlEnergy"]["total"]
+    assert resumed["disagreement"]["integral"] == \
+        report["disagreement"]["integral"]
+
+    # Metrics need unique names
+    try:
+        Metrics([Disagreement(), Disagreement(kind="pairwise")])
+        assert False
+    except ValueError:
+        pass
+
+    print("Metrics tests passed.")
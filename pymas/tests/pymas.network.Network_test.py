@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.network.Network class
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.network import Network
+from pymas.schedule import TopologySchedule, removeEdges
+
+if __name__ == "__main__":
+
+    # A directed graph: 0 -> 1, 0 -> 2, 2 -> 1 (with a self-loop on 1)
+    A = np.array([[0, 1, 2],
+                  [0, 1, 0],
+                  [0, 3, 0]])
+    agents = [None, None, None] # The agents are not used in this test
+
+    for adjacency in (A, sp.csr_matrix(A), sp.coo_matrix(A)):
+        net = Network(adjacency, agents)
+        assert list(net.neighbours(0)) == [1, 2]
+        assert list(net.in_neighbours(1)) == [0, 2]
+        assert list(net.in_neighbours(0)) == []
+        # Self-loops are ignored:
+        assert not net.areNeighbours(1, 1)
+        assert list(net.neighbours(1)) == []
+        # Order is important for directed graphs:
+        assert net.areNeighbours(2, 1) and not net.areNeighbours(1, 2)
+        assert net.weight(2, 1) == 3 and net.weight(1, 2) == 0
+        assert net.topology.numOfEdges == 3
+        assert list(net.topology.edgeSources) == [0, 0, 2]
+        assert list(net.topology.edgeTargets) == [1, 2, 1]
+        assert list(net.topology.edgeIds([0, 2, 1], [2, 1, 0])) == [1, 2, -1]
+        assert list(net.topology.inEdgeIds(1)) == [0, 2]
+        assert np.allclose(net.topology.incidence() @ [1, 2, 4], [0, 5, 2])
+
+    # Switching topologies: one Topology per distinct mode
+    B = removeEdges(A, [(0, 2)])
+    schedule = TopologySchedule([(0, A), (1, B), (2, A.copy())])
+    assert len(schedule.modes) == 2 and schedule.sequence == [0, 1, 0]
+    net = Network(A, agents, schedule=schedule)
+    net.reset(0)
+    first = net.topology
+    net.update(1.5)
+    assert list(net.neighbours(0)) == [1]
+    net.update(2)
+    assert net.topology is first and list(net.neighbours(0)) == [1, 2]
+
+    print("Network tests passed.")
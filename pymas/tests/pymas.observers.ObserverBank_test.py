@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.observers.ObserverBank class
+"""
+
+# Standard library imports
+import tempfile
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.faults import FaultInjector
+from pymas.observers import ObserverBank, LuenbergerObserver, \
+    UnknownInputObserver
+from pymas.mas import MAS
+
+if __name__ == "__main__":
+
+    # A ring of 6 agents with two inputs, an actuator fault in input 0 of
+    # agent 2 (from 5 to 7 s) and a sensor fault of agent 4 (from 8 s)
+    N = 6
+    A = np.array([[0, 1], [-1, -1]])
+    B = np.array([[0, 0], [1, 0.5]])
+    Adj = np.roll(np.eye(N), 1, axis=1) + np.roll(np.eye(N), -1, axis=1)
+    X0 = np.random.default_rng(0).normal(size=(N, 2))
+    def build(callback=None):
+        agents = [LTIAgent(A, B, init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        faults = FaultInjector()
+        faults.add("actuator", "bias", agents=2, value=[1, 0], start=5, \
+                   stop=7)
+        faults.add("sensor", "bias", agents=4, value=0.5, start=8, \
+                   components=[0])
+        bank = ObserverBank({
+            "all": LuenbergerObserver(threshold=0.01, dwell=0.2),
+            "not u0": UnknownInputObserver(B[:, [0]], threshold=0.01)}, \
+            callback=callback)
+        dcont = ConsensusDcontroller(net, K=np.eye(2))
+        return MAS(net, dcont, faults=faults, observers=bank), bank
+
+    # The Luenberger observer detects both faults, the UIO decoupled from
+    # input 0 only the sensor fault (isolation)
+    for engine in ("agent", "lti", "batch"):
+        mas, bank = build()
+        mas.run(0, 15, 0.0625, engine=engine)
+        times = bank["all"].detectionTimes
+        assert np.isnan(times[[0, 1, 3, 5]]).all()
+        assert 5.2 <= times[2] <= 5.4 and 8.2 <= times[4] <= 8.4
+        times = bank["not u0"].detectionTimes
+        assert np.isnan(times[2]) and times[4] == 8
+        assert bank["not u0"].norms[2] < 1e-6
+
+    # Events with timestamps, also passed to the callback
+    received = []
+    mas, bank = build(received.append)
+    mas.run(0, 15, 0.0625, engine="lti")
+    assert received == bank.events
+    kinds = [(e.agent, e.observer, e.kind) for e in bank.events]
+    assert kinds[:2] == [(2, "all", "detect"), (2, "all", "clear")]
+    assert 7 < bank.events[1].time < 8
+    assert [e.agent for e in bank.detections("not u0")] == [4]
+
+    # The nominal residuals vanish with the exact discretization
+    assert bank["all"].norms[[0, 1, 3, 5]].max() < 1e-9
+
+    # Placed poles give the same detections
+    mas, bank = build()
+    bank.observers["all"] = LuenbergerObserver(threshold=0.01, dwell=0.2, \
+                                               poles=[0.5, 0.6])
+    mas.run(0, 15, 0.0625, engine="lti")
+    assert [e.agent for e in bank.detections("all")] == [2, 4]
+
+    # Resumed runs give the same events
+    mas, bank = build()
+    mas.run(0, 15, 0.0625, engine="lti")
+    path = tempfile.mkdtemp()
+    resumed, resumedBank = build()
+    for snap in resumed.iter_run(0, 15, 0.0625, engine="lti"):
+        if snap.step == 100:
+            resumed.checkpoint(path).result()
+            break
+    resumed, resumedBank = build()
+    resumed.resume(path, engine="lti")
+    assert resumedBank.events == bank.events
+
+    # The unknown inputs have to be decoupled by the outputs
+    agents = [LTIAgent(A, B, init_states=X0[i].copy(), index=i) \
+              for i in range(N)]
+    net = Network(Adj, agents)
+    bank = ObserverBank([UnknownInputObserver(np.eye(2), C=[[1, 0]])])
+    mas = MAS(net, ConsensusDcontroller(net, K=np.eye(2)), observers=bank)
+    try:
+        mas.run(0, 1, 0.0625)
+        assert False
+    except ValueError:
+        pass
+
+    print("ObserverBank tests passed.")
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.plotting.plotTrajectories function
+"""
+
+# Standard library imports
+import sys
+import subprocess
+
+# Third party imports
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+# Local application imports
+import testing
+from pymas.plotting import m4, lttb, plotTrajectories, plotAgents
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.recording import RecordingPolicy
+from pymas.mas import MAS
+
+if __name__ == "__main__":
+
+    rng = np.random.default_rng(0)
+    T, M = 10_000, 5
+    t = np.linspace(0, 10, T)
+    Y = rng.normal(size=(T, M))
+
+    # M4 keeps the first, last and extreme samples (of every bin)
+    times, samples = m4(t, Y, 100)
+    assert times.shape == (400,) and samples.shape == (400, M)
+    assert np.all(np.diff(times) >= 0)
+    assert np.array_equal(samples.min(axis=0), Y.min(axis=0))
+    assert np.array_equal(samples.max(axis=0), Y.max(axis=0))
+    assert np.array_equal(samples[0], Y[0]) and \
+        np.array_equal(samples[-1], Y[-1])
+
+    # Non-uniform times give the same extrema
+    tIrregular = np.sort(rng.uniform(0, 10, T))
+    times, samples = m4(tIrregular, Y, 100)
+    assert samples.shape[0] <= 400
+    assert np.array_equal(samples.max(axis=0), Y.max(axis=0))
+
+    # Short series are not downsampled
+    times, samples = m4(t[:50], Y[:50], 100)
+    assert np.array_equal(samples, Y[:50])
+
+    # LTTB keeps the endpoints and increasing times per series
+    times, samples = lttb(t, Y, 200)
+    assert times.shape == samples.shape == (200, M)
+    assert np.all(np.diff(times, axis=0) > 0)
+    assert np.array_equal(samples[0], Y[0]) and \
+        np.array_equal(samples[-1], Y[-1])
+    times, samples = lttb(t, Y[:, 0], 200)
+    assert times.shape == samples.shape == (200,)
+
+    # A line collection with one line per series (and per component of 3D)
+    fig, ax = plt.subplots()
+    lines = plotTrajectories(t, Y, ax=ax, pixels=100)
+    assert len(lines.get_segments()) == M
+    assert len(lines.get_segments()[0]) == 400
+    Y3 = rng.normal(size=(T, M, 2))
+    lines = plotTrajectories(t, Y3, ax=ax, pixels=100, method="lttb")
+    assert len(lines.get_segments()) == 2 * M
+    lines = plotTrajectories(t, Y3, ax=ax, pixels=100, component=1)
+    assert np.array_equal(lines.get_segments()[0][:, 1].max(), \
+                          Y3[:, 0, 1].max())
+    try:
+        plotTrajectories(t, Y, ax=ax, method="unknown")
+        assert False
+    except ValueError:
+        pass
+    plt.close(fig)
+
+    # The agents of a run
+    Adj = np.array([[0, 1, 0], [0, 0, 1], [1, 0, 0]])
+    agents = [LTIAgent([[0]], [[1]], init_states=np.array([float(i)]), \
+                       index=i) for i in range(3)]
+    net = Network(Adj, agents)
+    mas = MAS(network=net, dcontroller=ConsensusDcontroller(net))
+    mas.run(0, 5, 0.0625)
+    fig, ax = plt.subplots()
+    collections = plotAgents(agents, ax=ax, pixels=10)
+    assert len(collections) == 1 and len(collections[0].get_segments()) == 3
+    assert not any(line.get_visible() for line in ax.get_xgridlines())
+    plt.close(fig)
+    fig, ax = plt.subplots()
+    plotAgents(agents, ax=ax, pixels=10, grid=True)
+    assert all(line.get_visible() for line in ax.get_xgridlines())
+    plt.close(fig)
+
+    # Under a reduced recording policy only the recorded components are
+    # plotted (from outputTrajectory), and nothing recorded is an error
+    agents = [LTIAgent(np.zeros((2, 2)), np.eye(2), \
+                       init_states=np.array([float(i), -float(i)]), index=i) \
+              for i in range(3)]
+    net = Network(Adj, agents)
+    mas = MAS(network=net, dcontroller=ConsensusDcontroller(net, np.eye(2)))
+    mas.run(0, 5, 0.0625, recording=RecordingPolicy(components=[1]))
+    fig, ax = plt.subplots()
+    collections = plotAgents(agents, ax=ax, pixels=10)
+    assert len(collections) == 1 and len(collections[0].get_segments()) == 3
+    assert np.isclose(collections[0].get_segments()[2][0, 1], -2.0)
+    try:
+        plotAgents(agents, ax=ax, components=[0])
+        assert False
+    except ValueError:
+        pass
+    mas.run(0, 5, 0.0625, recording=RecordingPolicy(outputs=True))
+    try:
+        plotAgents(agents, ax=ax)
+        assert False
+    except ValueError:
+        pass
+    plt.close(fig)
+
+    # Importing pymas does not import matplotlib
+    code = "import sys, pymas.mas; print('matplotlib' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], cwd="../..", \
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+    print("plotTrajectories tests passed.")
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.profiler.Profiler class
+"""
+
+# Standard library imports
+import tempfile
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.mas import MAS
+from pymas.profiler import Profiler
+from pymas.recording import RecordingPolicy
+from pymas.recorder import MemmapRecorder
+from pymas.engines import JITEngine, AsyncEngine, DistributedEngine
+
+if __name__ == "__main__":
+
+    A = np.array([[0, 1], [-2, -1]])
+    B = np.array([[0.5], [1]])
+    Adj = np.array([[0, 1, 1, 0],
+                    [1, 0, 1, 0],
+                    [1, 1, 0, 1],
+                    [0, 0, 1, 0]])
+
+    def build():
+        agents = [LTIAgent(A, B, init_states=np.array([i, -i]), index=i) \
+                  for i in range(4)]
+        net = Network(Adj, agents)
+        return MAS(net, ConsensusDcontroller(net))
+
+    reference = build()
+    reference.run(0, 2, 0.0625)
+
+    reports = []
+    profiler = Profiler(callback=reports.append, every=8)
+    mas = build()
+    mas.run(0, 2, 0.0625, profiler=profiler)
+    # Profiling does not change the results, and the instances are restored:
+    assert np.array_equal(mas.network.agents[3].stateTrajectHistory, \
+                          reference.network.agents[3].stateTrajectHistory)
+    for agent in mas.network.agents:
+        assert "f" not in vars(agent) and "_integrate" not in vars(agent)
+    assert "update" not in vars(mas.network)
+
+    report = profiler.report()
+    assert len(reports) == 4 and reports[-1]["steps"] == 32
+    assert report["steps"] == 32 and report["time"] == 2
+    phases = report["phases"]
+    assert phases["step"]["calls"] == 32 and phases["control"]["calls"] == 32
+    # One odeint call per agent and step:
+    assert phases["integrate"]["calls"] == 4 * 32
+    assert report["solver"]["calls"] == 4 * 32
+    assert report["rhsCalls"].sum() == report["solver"]["rhsEvaluations"]
+    assert sum(p["seconds"] for p in phases.values()) <= report["wallTime"]
+    # 9 points per step (without the first) of time and states, and the
+    # input of the step:
+    assert report["bytesRecorded"] == 4 * 32 * (9 * (1 + 2) + 1) * 8
+
+    # The integration of the JITEngine is timed as "integrate" (4 kernel
+    # evaluations per RK4 step, 9 steps per run step)
+    reference = build()
+    reference.run(0, 2, 0.0625, engine="jit")
+    profiler = Profiler()
+    mas = build()
+    engine = JITEngine()
+    mas.run(0, 2, 0.0625, engine=engine, profiler=profiler)
+    assert np.array_equal(mas.network.agents[3].stateTrajectHistory, \
+                          reference.network.agents[3].stateTrajectHistory)
+    assert "_integrateSegment" not in vars(engine)
+    report = profiler.report()
+    assert report["phases"]["integrate"]["calls"] == 32
+    assert report["solver"]["steps"] == 9 * 32
+    assert report["solver"]["rhsEvaluations"] == 4 * 9 * 32
+    assert np.all(report["rhsCalls"] == 4 * 9 * 32)
+
+    # The AsyncEngine keeps its batched dynamics under the profiler: the
+    # same groups of its binders and the same results
+    def grouping(engine):
+        return sorted((len(binder._groups), len(binder._others)) \
+                      for binder in engine._binders.values())
+    reference = build()
+    engine = AsyncEngine(periods=[0.0625, 0.0625, 0.125, 0.125])
+    reference.run(0, 2, 0.0625, engine=engine)
+    groups = grouping(engine)
+    assert all(others == 0 for _, others in groups)
+    profiler = Profiler()
+    mas = build()
+    engine = AsyncEngine(periods=[0.0625, 0.0625, 0.125, 0.125])
+    mas.run(0, 2, 0.0625, engine=engine, profiler=profiler)
+    assert grouping(engine) == groups
+    for a, b in zip(reference.network.agents, mas.network.agents):
+        assert np.array_equal(a.stateTrajectHistory, b.stateTrajectHistory)
+        assert "f" not in vars(b)
+    rhsCalls = profiler.report()["rhsCalls"]
+    assert np.all(rhsCalls > 0) and rhsCalls[0] > rhsCalls[3]
+    assert all("_rhs" not in vars(binder) \
+               for binder in engine._binders.values())
+
+    # The bytes are counted where the rows are written: in rolling windows
+    # and in a MemmapRecorder (one time column for all agents)
+    total = 4 * 32 * (9 * (1 + 2) + 1) * 8
+    for engine in ("agent", "batch"):
+        profiler = Profiler()
+        build().run(0, 2, 0.0625, engine=engine, profiler=profiler, \
+                    recording=RecordingPolicy(window=5))
+        assert profiler.report()["bytesRecorded"] == total
+        profiler = Profiler()
+        mas = build()
+        mas.recorder = MemmapRecorder(tempfile.mkdtemp())
+        mas.run(0, 2, 0.0625, engine=engine, profiler=profiler)
+        assert profiler.report()["bytesRecorded"] == total - 3 * 32 * 9 * 8
+
+    # The workers of a DistributedEngine are not counted
+    profiler = Profiler()
+    build().run(0, 1, 0.0625, engine=DistributedEngine(workers=2), \
+                profiler=profiler)
+    assert profiler.report()["rhsCalls"] is None
+
+    print("Profiler tests passed.")
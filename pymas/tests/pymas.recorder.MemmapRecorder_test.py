@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.recorder.MemmapRecorder class
+"""
+
+# Standard library imports
+import os
+import json
+import tempfile
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.recording import RecordingPolicy
+from pymas.mas import MAS
+from pymas.recorder import MemmapRecorder, RecorderColumn
+
+if __name__ == "__main__":
+
+    # A ring of 8 agents
+    N = 8
+    ring = np.arange(N)
+    Adj = sp.csr_matrix((np.ones(2 * N), \
+                         (np.concatenate((ring, ring)), \
+                          np.concatenate(((ring + 1) % N, (ring - 1) % N)))), \
+                        shape=(N, N))
+    X0 = np.random.default_rng(2).normal(size=(N, 2))
+    def build(recorder=None):
+        agents = [LTIAgent([[0, 1], [-1, -1]], [[0], [1]], \
+                           init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        return MAS(net, ConsensusDcontroller(net), recorder=recorder), agents
+
+    for engine in ("agent", "batch"):
+        for recording in (None, RecordingPolicy(endpoints=True), \
+                          RecordingPolicy(every=3), \
+                          RecordingPolicy(endpoints=True, every=4)):
+            mas, reference = build()
+            mas.run(0, 2, 0.125, engine=engine, recording=recording)
+
+            directory = tempfile.mkdtemp()
+            recorder = MemmapRecorder(directory, flush_every=5)
+            mas, agents = build(recorder)
+            mas.run(0, 2, 0.125, engine=engine, recording=recording)
+
+            # The agents' trajectories are views of the memory-mapped files
+            for i, agent in enumerate(agents):
+                assert isinstance(agent._timeBuffer, RecorderColumn)
+                assert np.shares_memory(agent.time, recorder.time)
+                assert np.shares_memory(agent.stateTrajectHistory, \
+                                        recorder.states)
+                assert np.shares_memory(agent.inputTrajectory, \
+                                        recorder.inputs)
+
+            # The same trajectories as in RAM (the shared time column
+            # gives every agent its own time rows)
+            time, states, inputs = MemmapRecorder.load(directory)
+            assert isinstance(time, np.memmap)
+            for i, (a, b) in enumerate(zip(reference, agents)):
+                assert np.array_equal(a.time, b.time)
+                assert np.array_equal(a.time, time)
+                assert np.allclose(a.stateTrajectHistory, states[:, i], \
+                                   rtol=0, atol=1e-12)
+                assert np.allclose(a.inputTrajectory.reshape(-1, 1), \
+                                   inputs[:, i], rtol=0, atol=1e-12)
+
+            # stop() flushed the files and wrote the recorded rows
+            with open(os.path.join(directory, "meta.json")) as file:
+                meta = json.load(file)
+            assert meta["rows"] == len(reference[0].time)
+            saved = np.load(os.path.join(directory, "states.npy"))
+            assert np.array_equal(saved[:meta["rows"]], states)
+
+    # A recorder cannot keep a rolling window
+    mas, agents = build(MemmapRecorder(tempfile.mkdtemp()))
+    try:
+        mas.run(0, 1, 0.125, recording=RecordingPolicy(window=4))
+        assert False
+    except ValueError:
+        pass
+
+    print("MemmapRecorder tests passed.")
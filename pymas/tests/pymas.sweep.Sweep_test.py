@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.sweep.Sweep class
+"""
+
+# Standard library imports
+import tempfile
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.mas import MAS
+from pymas.sweep import Sweep, SweepStore
+
+A = np.array([[0, 1], [-2, -1]])
+B = np.array([[0.5], [1]])
+
+def scenario(params, rng, adjacency):
+    if params["gain"] < 0:
+        raise ValueError("Negative gain")
+    agents = [LTIAgent(A, B, init_states=rng.normal(size=2), index=i) \
+              for i in range(adjacency.shape[0])]
+    net = Network(adjacency, agents)
+    return MAS(net, ConsensusDcontroller(net, K=params["gain"] * np.eye(1, 2)))
+
+if __name__ == "__main__":
+
+    Adj = sp.csr_matrix(np.array([[0, 1, 1, 0],
+                                  [1, 0, 1, 0],
+                                  [0, 1, 0, 1],
+                                  [1, 0, 0, 0]]))
+    sweep = Sweep(scenario, grid={"gain": [0.5, 1, -1]}, samples=2, seed=7, \
+                  adjacency=Adj, end_time=1, time_step=0.05, engine="lti")
+
+    # The results do not depend on the number of workers:
+    serial = sweep.run(workers=0)
+    directory = tempfile.mkdtemp()
+    parallel = sweep.run(workers=2, store=SweepStore(directory))
+    assert len(serial) == len(parallel) == 6
+    assert np.array_equal(serial.stack("states"), parallel.stack("states"))
+    assert serial.seeds == parallel.seeds
+
+    # Failing scenarios are stored with their errors:
+    assert sorted(parallel.errors) == [4, 5]
+    assert parallel.indices() == [0, 1, 2, 3]
+
+    # The store can be reopened from its directory:
+    loaded = SweepStore.load(directory)
+    assert np.array_equal(loaded.stack("states"), serial.stack("states"))
+    assert loaded.params[2] == {"gain": 1}
+
+    print("Sweep tests passed.")
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.termination.Termination classes
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.ltiagent import LTIAgent
+from pymas.network import Network
+from pymas.consensus import ConsensusDcontroller
+from pymas.mas import MAS
+from pymas.termination import PairwiseDisagreement, AverageDisagreement
+
+if __name__ == "__main__":
+
+    # The disagreements of 3 agents with 2 components
+    X = np.array([[0.0, 1.0],
+                  [2.0, 1.5],
+                  [1.0, 4.0]])
+    assert PairwiseDisagreement(1).disagreement(X) == 3.0
+    D = X - X.mean(axis=0)
+    assert np.isclose(AverageDisagreement(1).disagreement(X), \
+                      np.linalg.norm(D, axis=1).max())
+
+    # Only the selected components are compared
+    criterion = PairwiseDisagreement(2.5, components=[0])
+    assert criterion.update(0, X) and criterion.value == 2.0
+    criterion = AverageDisagreement(1.2, components=[0])
+    assert criterion.update(0, X) and np.isclose(criterion.value, 1.0)
+    assert not PairwiseDisagreement(2.5).update(0, X)
+
+    # A brief dip below tol does not stop the run: the dwell time restarts
+    criterion = PairwiseDisagreement(1.0, dwell=0.3)
+    values = [2.0, 0.5, 0.5, 1.5, 0.5, 0.5, 0.5, 0.5, 0.5]
+    for k, v in enumerate(values):
+        if criterion.update(0.1 * k, np.array([[0.0], [v]])):
+            break
+    assert k == 7
+    assert np.isclose(criterion.convergenceTime, 0.4)
+    assert np.isclose(criterion.time, 0.7)
+
+    # reset() forgets the previous run
+    criterion.reset()
+    assert criterion.convergenceTime is None and criterion.time is None
+    assert not criterion.update(0, np.array([[0.0], [0.5]]))
+
+    # MAS.run() stops early and returns the convergence time
+    N = 10
+    ring = np.arange(N)
+    Adj = sp.csr_matrix((np.ones(2 * N), \
+                         (np.concatenate((ring, ring)), \
+                          np.concatenate(((ring + 1) % N, (ring - 1) % N)))), \
+                        shape=(N, N))
+    X0 = np.random.default_rng(3).normal(size=(N, 2))
+    def build():
+        agents = [LTIAgent([[0, 0], [0, 0]], [[1, 0], [0, 1]], \
+                           init_states=X0[i].copy(), index=i) \
+                  for i in range(N)]
+        net = Network(Adj, agents)
+        return MAS(net, ConsensusDcontroller(net, np.eye(2))), agents
+
+    for criterion in (PairwiseDisagreement(1e-3, dwell=0.5), \
+                      AverageDisagreement(1e-3, dwell=0.5)):
+        mas, agents = build()
+        convergenceTime = mas.run(0, 100, 0.0625, engine="batch", \
+                                  termination=criterion)
+        assert convergenceTime is not None and convergenceTime < 100
+        assert mas.convergenceTime == convergenceTime
+        assert agents[0].time[-1] < 100
+        assert np.isclose(agents[0].time[-1] - convergenceTime, 0.5)
+        X = np.array([agent.stateTrajectHistory[-1] for agent in agents])
+        assert criterion.disagreement(X) < 1e-3
+
+        # The same criterion in a second run starts afresh
+        mas, agents = build()
+        assert mas.run(0, 100, 0.0625, engine="batch", \
+                       termination=criterion) == convergenceTime
+
+    # Without convergence the run ends at end_time
+    mas, agents = build()
+    assert mas.run(0, 1, 0.0625, engine="batch", \
+                   termination=PairwiseDisagreement(1e-3)) is None
+    assert agents[0].time[-1] == 1
+
+    print("Termination tests passed.")
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.topology.Topology class
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+import testing
+from pymas.topology import Topology
+from pymas.network import Network
+
+if __name__ == "__main__":
+
+    # A directed, weighted graph with a self-loop (on agent 3), where
+    # A[j, i] is the weight of the edge j -> i
+    A = np.array([[0.0, 1.0, 2.0, 0.0],
+                  [0.0, 0.0, 0.5, 0.0],
+                  [3.0, 0.0, 0.0, 1.5],
+                  [0.0, 4.0, 0.0, 7.0]])
+    # L = D_in - A^T, where D_in holds the in-degrees (column sums); the
+    # self-loop cancels out
+    D = np.diag(A.sum(axis=0))
+    expected = D - A.T
+    assert np.allclose(expected.sum(axis=1), 0)
+
+    X = np.random.default_rng(5).normal(size=(4, 2))
+    for adjacency in (A, sp.csr_matrix(A), sp.coo_matrix(A), \
+                      sp.csc_matrix(A)):
+        topology = Topology(adjacency)
+        L = topology.laplacian()
+        assert sp.isspmatrix_csr(L) and L.has_sorted_indices
+        assert np.allclose(L.toarray(), expected)
+        # Row i of L x is sum_j a_ji (x_i - x_j)
+        for i in range(4):
+            row = sum(A[j, i] * (X[i] - X[j]) for j in range(4))
+            assert np.allclose((L @ X)[i], row)
+        # The Laplacian is cached
+        assert topology.laplacian() is L
+
+    # The Network shares the Laplacian of its topology
+    net = Network(sp.csr_matrix(A), [None] * 4)
+    assert net.laplacian() is net.topology.laplacian()
+
+    print("Topology tests passed.")
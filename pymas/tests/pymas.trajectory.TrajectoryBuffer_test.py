@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Test pymas.trajectory.TrajectoryBuffer class
+"""
+
+# Standard library imports
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+import testing
+from pymas.trajectory import TrajectoryBuffer, WindowBuffer, StateRing
+
+if __name__ == "__main__":
+
+    # Unknown horizon: the buffer grows in chunks
+    b = TrajectoryBuffer(2, chunk=4)
+    for i in range(10):
+        b.append([i, -i])
+    assert len(b) == 10
+    assert b.capacity >= 10
+    assert np.array_equal(b.data[:, 0], np.arange(10))
+
+    # Known horizon: no reallocation after reserve()
+    b = TrajectoryBuffer()
+    b.append(0.0)
+    b.reserve(100)
+    backing = b._buffer
+    b.append(np.linspace(0.1, 10, 100))
+    assert b._buffer is backing
+    assert b.data.shape == (101,)
+
+    # Views share memory with the buffer
+    assert np.shares_memory(b.data, b._buffer)
+
+    # Reset keeps the capacity
+    b.reset([1.0])
+    assert len(b) == 1 and b.capacity >= 101
+
+    # Replacing the last (provisional) row
+    b.replaceLast(2.0)
+    assert np.array_equal(b.data, [2.0])
+
+    # A rolling window keeps the last rows as a contiguous view
+    w = WindowBuffer(2, window=3)
+    for i in range(5):
+        w.append([i, -i])
+    assert len(w) == 3
+    assert np.array_equal(w.data[:, 0], [2, 3, 4])
+    w.append(np.arange(14).reshape(7, 2))
+    assert np.array_equal(w.data[:, 0], [8, 10, 12])
+    w.replaceLast([0, 0])
+    assert np.array_equal(w.data[-1], [0, 0])
+    assert np.shares_memory(w.data, w._buffer)
+
+    # A ring of the stacked states of 2 agents at the last 3 times
+    r = StateRing(3, 2, 1)
+    for k in range(5):
+        r.push(0.5 * k, [[k], [-k]])
+    assert len(r) == 3 and r.lastTime == 2
+    assert np.array_equal(r.lagged(np.array([0, 1, 5]), [0, 1, 0]).ravel(), \
+                          [4, -3, 2])
+    assert np.array_equal(r.gather([1.7, 1.5, 0], [0, 1, 1]).ravel(), \
+                          [3, -3, -2])
+
+    print("TrajectoryBuffer tests passed.")
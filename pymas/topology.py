@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the Topology class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+import scipy.sparse as sp
+
+# Local application imports
+
+# %% The sparse graph topology class
+class Topology:
+
+    def __init__(self, A):
+        """
+        Sparse (CSR) storage of an adjacency matrix with precomputed
+        neighbour index arrays and edge weights, so that the neighbours of an
+        agent are found in O(degree) instead of O(numOfAgents).
+
+        NOTE: Rows are "tail" indices and Columns are "head" indices, i.e.
+        A[i, j] != 0 is an edge from agent i to agent j. Self-loops are
+        ignored.
+
+        Parameters
+        ----------
+        A : numpy 2D array or scipy sparse matrix
+            The adjacency matrix.
+
+        """
+        csr = sp.csr_matrix(A, dtype="float")
+        csr = (csr - sp.diags(csr.diagonal())).tocsr()
+        csr.eliminate_zeros()
+        csr.sort_indices()
+        self.csr = csr
+        self.numOfAgents = csr.shape[0]
+        # Out-neighbours (edges i -> j) are the rows of A:
+        self.outIndptr = csr.indptr
+        self.outIndices = csr.indices
+        self.outWeights = csr.data
+        # In-neighbours (edges j -> i) are the columns of A:
+        csc = csr.tocsc()
+        csc.sort_indices()
+        self.inIndptr = csc.indptr
+        self.inIndices = csc.indices
+        self.inWeights = csc.data
+        # The edge list in CSR order (per-edge arrays are aligned with it):
+        self.edgeSources = np.repeat(np.arange(self.numOfAgents), \
+                                     np.diff(csr.indptr))
+        self.edgeTargets = csr.indices
+        self.edgeWeights = csr.data
+        self.numOfEdges = csr.nnz
+        self._laplacian = None
+        self._inEdgeIds = None
+        self._incidence = None
+
+    def outNeighbours(self, i: int) -> np.ndarray:
+        return self.outIndices[self.outIndptr[i]:self.outIndptr[i+1]]
+
+    def outNeighbourWeights(self, i: int) -> np.ndarray:
+        return self.outWeights[self.outIndptr[i]:self.outIndptr[i+1]]
+
+    def inNeighbours(self, i: int) -> np.ndarray:
+        return self.inIndices[self.inIndptr[i]:self.inIndptr[i+1]]
+
+    def inNeighbourWeights(self, i: int) -> np.ndarray:
+        return self.inWeights[self.inIndptr[i]:self.inIndptr[i+1]]
+
+    def edgeIds(self, sources, targets) -> np.ndarray:
+        """
+        Returns the indices (in the edge list) of the edges sources[k] ->
+        targets[k], or -1 for pairs which are not edges. The edge list is
+        sorted by (source, target), so they are found by one binary search.
+        """
+        query = np.asarray(sources, dtype="int64") * self.numOfAgents + \
+            np.asarray(targets, dtype="int64")
+        if self.numOfEdges == 0:
+            return np.full(shape=query.shape, fill_value=-1, dtype="int64")
+        keys = self.edgeSources * self.numOfAgents + self.edgeTargets
+        k = np.minimum(np.searchsorted(keys, query), self.numOfEdges - 1)
+        return np.where(keys[k] == query, k, -1)
+
+    def inEdgeIds(self, i: int) -> np.ndarray:
+        """
+        Returns the indices (in the edge list) of the edges into agent i, in
+        the order of inNeighbours(i).
+        """
+        if self._inEdgeIds is None:
+            ids = sp.csr_matrix((np.arange(self.numOfEdges) + 1.0, \
+                                 self.csr.indices, self.csr.indptr), \
+                                shape=self.csr.shape).tocsc()
+            ids.sort_indices()
+            self._inEdgeIds = ids.data.astype("int64") - 1
+        return self._inEdgeIds[self.inIndptr[i]:self.inIndptr[i+1]]
+
+    def incidence(self):
+        """
+        Returns the sparse matrix T with shape (numOfAgents, numOfEdges) and
+        T[i, e] = 1 if edge e goes into agent i, so T @ V sums per-edge
+        values V over the in-edges of each agent. It is computed once and
+        cached.
+        """
+        if self._incidence is None:
+            self._incidence = sp.csr_matrix( \
+                (np.ones(shape=(self.numOfEdges,)), \
+                 (self.edgeTargets, np.arange(self.numOfEdges))), \
+                shape=(self.numOfAgents, self.numOfEdges))
+        return self._incidence
+
+    def laplacian(self):
+        """
+        Returns the (in-degree) Laplacian matrix L = D - A^T as a CSR matrix,
+        so that row i of L x gives sum_j a_ji (x_i - x_j). It is computed
+        once and cached.
+        """
+        if self._laplacian is None:
+            inDegrees = np.asarray(self.csr.sum(axis=0)).reshape(-1)
+            self._laplacian = (sp.diags(inDegrees) - self.csr.T).tocsr()
+            self._laplacian.sort_indices()
+        return self._laplacian
+
+    def weight(self, i: int, j: int) -> float:
+        """
+        Returns the weight of the edge i -> j (0 if there is no edge) by a
+        binary search in the sorted out-neighbours of i.
+        """
+        start, end = self.outIndptr[i], self.outIndptr[i+1]
+        k = start + np.searchsorted(self.outIndices[start:end], j)
+        if k < end and self.outIndices[k] == j:
+            return self.outWeights[k]
+        return 0.0
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("topology.py is not an executable module!")
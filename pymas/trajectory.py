@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+
+"""
+This is the TrajectoryBuffer class.
+"""
+
+# %% Imports
+# Standard library imports
+
+# Third party imports
+import numpy as np
+
+# Local application imports
+
+# %% The trajectory buffer class
+class TrajectoryBuffer:
+
+    def __init__(self, width=None, capacity=0, *, chunk=1024, dtype="float"):
+        """
+        A preallocated row store which replaces repeated np.append calls.
+        Rows are written into a larger backing array and only the filled part
+        is exposed (as a view, without copying) through TrajectoryBuffer.data.
+
+        Parameters
+        ----------
+        width : int, optional
+            Number of columns of each row. If None, the buffer is 1-D and
+            each row is a scalar (e.g. time). The default is None.
+        capacity : int, optional
+            Number of rows to preallocate. The default is 0.
+        chunk : int, optional and Keyword-only argument
+            Minimum number of rows added when the buffer has to grow and the
+            horizon is unknown. The default is 1024.
+        dtype : optional and Keyword-only argument
+            Data type of the buffer. The default is "float".
+
+        Returns
+        -------
+        None.
+
+        """
+        self.width = width
+        self.chunk = max(int(chunk), 1)
+        self.dtype = dtype
+        self._n = 0
+        self._buffer = np.empty(shape=self._shape(int(capacity)), dtype=dtype)
+
+    def _shape(self, rows):
+        if self.width is None:
+            return (rows,)
+        return (rows, self.width)
+
+    def __len__(self):
+        return self._n
+
+    @property
+    def capacity(self) -> int:
+        return self._buffer.shape[0]
+
+    @property
+    def data(self) -> np.ndarray:
+        """
+        The filled rows of the buffer. This is a view into the backing array,
+        so it must be copied if it is needed after the buffer grows.
+        """
+        return self._buffer[:self._n]
+
+    def reserve(self, rows: int):
+        """
+        Makes sure that at least 'rows' more rows can be appended without
+        growing the buffer again. This is used when the horizon is known
+        (e.g. in MAS.run).
+        """
+        needed = self._n + int(rows)
+        if needed > self.capacity:
+            self._resize(needed)
+
+    def _resize(self, rows):
+        new = np.empty(shape=self._shape(rows), dtype=self.dtype)
+        new[:self._n] = self._buffer[:self._n]
+        self._buffer = new
+
+    def _grow(self, needed):
+        # Amortized growth: at least double the capacity (or add a chunk) so
+        # that appending T rows one by one costs O(T) copies in total.
+        self._resize(max(needed, \
+                         self.capacity + max(self.chunk, self.capacity)))
+
+    def append(self, rows):
+        """
+        Appends one row or a block of rows to the end of the buffer.
+
+        Parameters
+        ----------
+        rows : array_like
+            A single row (scalar or 1-D vector of length width) or a block of
+            rows with shape (k,) or (k, width).
+
+        Returns
+        -------
+        None.
+
+        """
+        rows = np.asarray(rows, dtype=self.dtype)
+        if self.width is None:
+            rows = rows.reshape(-1)
+        else:
+            rows = rows.reshape(-1, self.width)
+        k = rows.shape[0]
+        needed = self._n + k
+        if needed > self.capacity:
+            self._grow(needed)
+        self._buffer[self._n:needed] = rows
+        self._n = needed
+
+    def replaceLast(self, row):
+        """
+        Overwrites the last row (used for the latest, not yet committed
+        sample of a decimated recording).
+        """
+        self._buffer[self._n - 1] = np.reshape(row, self._buffer.shape[1:])
+
+    def reset(self, rows=None):
+        """
+        Discards the stored rows and optionally starts over with 'rows'.
+        The backing array is kept so that its capacity can be reused.
+        """
+        self._n = 0
+        if rows is not None:
+            self.append(rows)
+
+# %% The rolling window buffer class
+class WindowBuffer:
+
+    def __init__(self, width=None, window=1, *, dtype="float"):
+        """
+        A buffer with the interface of TrajectoryBuffer which only keeps the
+        last 'window' rows. Each row is written twice into a backing array
+        of 2*window rows, so that the last rows are always contiguous and
+        TrajectoryBuffer.data stays a view (no copy is made).
+
+        Parameters
+        ----------
+        width : int, optional
+            Number of columns of each row (None for a 1-D buffer).
+        window : int, optional
+            Number of rows which are kept. The default is 1.
+        dtype : optional and Keyword-only argument
+            Data type of the buffer. The default is "float".
+
+        Returns
+        -------
+        None.
+
+        """
+        self.width = width
+        self.window = max(int(window), 1)
+        self.dtype = dtype
+        self._count = 0 # Number of rows appended since the last reset
+        if width is None:
+            shape = (2 * self.window,)
+        else:
+            shape = (2 * self.window, width)
+        self._buffer = np.empty(shape=shape, dtype=dtype)
+
+    def __len__(self):
+        return min(self._count, self.window)
+
+    @property
+    def capacity(self) -> int:
+        return self.window
+
+    @property
+    def data(self) -> np.ndarray:
+        if self._count <= self.window:
+            return self._buffer[:self._count]
+        start = self._count % self.window
+        return self._buffer[start:start + self.window]
+
+    def reserve(self, rows: int):
+        # The window never grows.
+        pass
+
+    def append(self, rows):
+        rows = np.asarray(rows, dtype=self.dtype)
+        if self.width is None:
+            rows = rows.reshape(-1)
+        else:
+            rows = rows.reshape(-1, self.width)
+        # Rows older than the window are skipped but still counted:
+        self._count += max(rows.shape[0] - self.window, 0)
+        for row in rows[-self.window:]:
+            self._write(row)
+
+    def _write(self, row):
+        i = self._count % self.window
+        self._buffer[i] = row
+        self._buffer[i + self.window] = row
+        self._count += 1
+
+    def replaceLast(self, row):
+        i = (self._count - 1) % self.window
+        row = np.reshape(row, self._buffer.shape[1:])
+        self._buffer[i] = row
+        self._buffer[i + self.window] = row
+
+    def reset(self, rows=None):
+        self._count = 0
+        if rows is not None:
+            self.append(rows)
+
+# %% The state history ring class
+class StateRing:
+
+    def __init__(self, size: int, numOfAgents: int, ns: int):
+        """
+        A fixed-size ring of the stacked states of all agents at the last
+        'size' sample times, e.g. the values which the agents sent over
+        their links. Delayed values are looked up by vectorized gathers, so
+        the cost per step depends on the number of lookups and not on the
+        length of the run.
+
+        Parameters
+        ----------
+        size : int
+            The number of samples which are kept.
+        numOfAgents : int
+            The number of agents.
+        ns : int
+            The number of states of each agent.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.size = max(int(size), 1)
+        self.times = np.full(shape=(self.size,), fill_value=-np.inf)
+        self.states = np.zeros(shape=(self.size, numOfAgents, ns))
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.size)
+
+    @property
+    def lastTime(self) -> float:
+        if self._count == 0:
+            return -np.inf
+        return self.times[(self._count - 1) % self.size]
+
+    def push(self, t: float, X: np.ndarray):
+        """
+        Adds the states X with shape (numOfAgents, ns) at time t (the oldest
+        sample is overwritten when the ring is full).
+        """
+        i = self._count % self.size
+        self.times[i] = t
+        self.states[i] = X
+        self._count += 1
+
+    def slots(self, times) -> np.ndarray:
+        """
+        Returns the slots of the latest samples at or before the given
+        times (with a tolerance for the rounding of the time steps). For
+        times before the oldest sample, the oldest sample is used.
+        """
+        n = len(self)
+        order = (self._count - n + np.arange(n)) % self.size
+        pos = np.searchsorted(self.times[order], np.asarray(times) + 1e-9, \
+                              side="right") - 1
+        return order[np.maximum(pos, 0)]
+
+    def lagged(self, lags, agents) -> np.ndarray:
+        """
+        Returns the states of the agents lags[k] samples before the latest
+        one (0 is the latest sample) with shape (len(agents), ns). Lags
+        beyond the oldest sample give the oldest sample.
+        """
+        lags = np.minimum(lags, len(self) - 1)
+        return self.states[(self._count - 1 - lags) % self.size, agents]
+
+    def gather(self, times, agents) -> np.ndarray:
+        """
+        Returns the states of the agents at the given times (one time per
+        agent index) with shape (len(agents), ns).
+        """
+        return self.states[self.slots(times), agents]
+
+    def reset(self):
+        self.times[:] = -np.inf
+        self._count = 0
+
+    def getState(self) -> dict:
+        return {"times": self.times.copy(), "states": self.states.copy(), \
+                "count": self._count}
+
+    def setState(self, state: dict):
+        self.times[:] = state["times"]
+        self.states[:] = state["states"]
+        self._count = state["count"]
+
+# %% Handle direct executions
+if __name__ == "__main__":
+    print("trajectory.py is not an executable module!")
@@ -80,9 +80,8 @@ class MyDcontroller(Dcontroller):
         #     return np.zeros(shape=(self.ni, 1))
         # Calculate the control input of "agentIndex"-th agent:
         u = np.zeros(shape=(self.ni, ))
-        for a in self.net.agents:
-            if self.net.areNeighbours(a.index, agentIndex):
-                u += self.rule(self.net.agents[agentIndex], a)
+        for j in self.net.in_neighbours(agentIndex):
+            u += self.rule(self.net.agents[agentIndex], self.net.agents[j])
         return u
 
 # Create the Dcontroller instance:
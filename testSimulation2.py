@@ -75,9 +75,8 @@ class MyDcontroller(Dcontroller):
     
     def controlProtocol(self, agentIndex: int,  t): # Simple sigma protocol
         u = np.zeros(shape=(self.ni, ))
-        for a in self.net.agents:
-            if self.net.areNeighbours(a.index, agentIndex):
-                u += self.rule(self.net.agents[agentIndex], a)
+        for j in self.net.in_neighbours(agentIndex):
+            u += self.rule(self.net.agents[agentIndex], self.net.agents[j])
         return u
 
 # Create the Dcontroller instance: